@@ -2,21 +2,23 @@
 Clears content from temporary files after processing is complete.
 """
 import logging
-from pathlib import Path
-import os
-import glob
+from typing import Optional
 
 import config
 import utils
+from job import Job
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
-def clear_files() -> bool:
+def clear_files(job: Optional[Job] = None) -> bool:
     """
-    Clear the content of temporary files used in the workflow and delete
-    mp4 and jpg files leftover from Instagram uploads.
+    Clear the content of the debug text files used in the workflow and
+    delete the files a job created.
     
+    Args:
+        job: Job whose files are deleted, if any
+        
     Returns:
         True if all files were cleared successfully, False otherwise
     """
@@ -25,7 +27,8 @@ def clear_files() -> bool:
         config.VID_TITLE_FILE,
         config.HASHTAG_FILE,
         config.FINAL_TITLE_FILE,
-        config.DESC_FILE
+        config.DESC_FILE,
+        config.SUBMISSION_ID_FILE
     ]
     
     success = True
@@ -41,35 +44,11 @@ def clear_files() -> bool:
             success = False
             logger.error(f"Error clearing file {file_path}: {e}")
     
-    # Delete mp4 and jpg files in the current directory
-    try:
-        # Find all mp4 and jpg files in the current directory
-        mp4_files = glob.glob("*.mp4")
-        jpg_files = glob.glob("*.jpg")
-        
-        # Delete mp4 files
-        for file in mp4_files:
-            try:
-                os.remove(file)
-                logger.info(f"Deleted file: {file}")
-            except Exception as e:
-                success = False
-                logger.error(f"Error deleting file {file}: {e}")
-        
-        # Delete jpg files
-        for file in jpg_files:
-            try:
-                os.remove(file)
-                logger.info(f"Deleted file: {file}")
-            except Exception as e:
-                success = False
-                logger.error(f"Error deleting file {file}: {e}")
-                
-    except Exception as e:
+    # Delete the files the job created, leaving other jobs' files alone
+    if job is not None and not job.cleanup():
         success = False
-        logger.error(f"Error during file cleanup: {e}")
     
     return success
 
 if __name__ == "__main__":
-    clear_files()
+    clear_files(Job.from_debug_files())
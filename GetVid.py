@@ -1,160 +1,645 @@
 """
 Script to download video content from Reddit.
 """
-import praw
 import os
+import json
+import contextlib
+import shutil
+import threading
+import time
 import yt_dlp  # More reliable than youtube-dl
-from prawcore.exceptions import Redirect, NotFound, Forbidden
 import logging
 from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import config
+import ffmpeg_utils
 import utils
+from encoder_profiles import resolve_profile
+from reddit_discovery import Candidate, DiscoveryEngine, ListingCache
+from dedup_index import DedupIndex
+from job import Job
+from ledger import Ledger
+from subreddit_scheduler import SubredditScheduler
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
-def download_media(url: str, title: str, submission_id: str) -> bool:
+# yt-dlp protocols that ffmpeg can read directly from their URL
+STREAMABLE_PROTOCOLS = ('http', 'https', 'm3u8', 'm3u8_native')
+
+def max_source_duration() -> int:
+    """
+    Longest source video worth downloading, in seconds.
+    
+    Best-window trimming needs sources longer than the output to choose a
+    window from; otherwise anything longer than the output is skipped.
+    """
+    if config.TRIM_MODE == "best":
+        return max(config.MAX_SOURCE_DURATION, config.MAX_VIDEO_DURATION)
+    return config.MAX_VIDEO_DURATION
+
+def _duration_filter(info: Dict[str, Any]) -> Optional[str]:
+    """yt-dlp match filter that skips videos longer than max_source_duration() seconds."""
+    duration = info.get('duration')
+    if duration and duration > max_source_duration():
+        return f"Video duration exceeds {max_source_duration()} seconds."
+    return None
+
+def _has_video(fmt: Dict[str, Any]) -> bool:
+    """Return True if a yt-dlp format carries a video stream."""
+    return fmt.get('vcodec') not in (None, 'none')
+
+def _has_audio(fmt: Dict[str, Any]) -> bool:
+    """Return True if a yt-dlp format carries an audio stream."""
+    return fmt.get('acodec') not in (None, 'none')
+
+def _selection_size(selection: Tuple[Dict[str, Any], ...]) -> Optional[int]:
+    """Total known size of a format selection in bytes, or None if any part is unknown."""
+    sizes = [fmt.get('filesize') or fmt.get('filesize_approx') for fmt in selection]
+    return None if not all(sizes) else int(sum(sizes))
+
+class ShortsFormatSelector:
     """
-    Download the video using yt-dlp only if it meets the criteria (duration <= 120 sec).
+    yt-dlp format selector driven by the Shorts output size.
+    
+    Picks the smallest video stream whose 9:16 crop region reaches
+    VIDEO_HEIGHT when scaled up by at most max_upscale, paired with the best
+    audio stream, and keeps the selection under a size cap. Without the
+    allowance a landscape source would need 2160p to fill a 1920-pixel-high
+    crop. The bytes saved compared with
+    'bestvideo+bestaudio' are recorded on every selection.
+    """
+    
+    def __init__(self, max_bytes: int = config.MAX_DOWNLOAD_MB * 1024 * 1024,
+                 target_width: int = config.VIDEO_WIDTH,
+                 target_height: int = config.VIDEO_HEIGHT,
+                 max_upscale: float = config.FORMAT_MAX_UPSCALE):
+        """
+        Initialize the selector.
+        
+        Args:
+            max_bytes: Largest acceptable selection when its size is known
+            target_width: Width of the published video
+            target_height: Height of the published video
+            max_upscale: Largest factor the crop region may be scaled up by
+        """
+        self.max_bytes = max_bytes
+        self.target_width = target_width
+        self.target_height = target_height
+        self.max_upscale = max_upscale
+        self.selected_bytes: Optional[int] = None
+        self.bytes_saved: Optional[int] = None
+        
+    def covers_output(self, fmt: Dict[str, Any]) -> bool:
+        """Return True if the crop region of a format needs at most max_upscale."""
+        width, height = fmt.get('width'), fmt.get('height')
+        if not width or not height:
+            return False
+        window = utils.compute_crop_window(width, height, self.target_width, self.target_height)
+        return window.out_height <= window.height * self.max_upscale
+        
+    def choose(self, candidates: List[Tuple[Dict[str, Any], ...]]) -> Tuple[Dict[str, Any], ...]:
+        """
+        Choose a selection from candidates ordered worst to best.
+        
+        Args:
+            candidates: Tuples of formats to download together
+            
+        Returns:
+            The chosen tuple of formats
+        """
+        def within_cap(selection):
+            size = _selection_size(selection)
+            return size is None or size <= self.max_bytes
+        
+        def height(selection):
+            return selection[0].get('height') or 0
+        
+        affordable = [c for c in candidates if within_cap(c)]
+        covering = [c for c in affordable if self.covers_output(c[0])]
+        if covering:
+            # Smallest resolution that covers the crop, then fewest bytes
+            return min(covering, key=lambda c: (height(c), _selection_size(c) or float('inf')))
+        if affordable:
+            # Nothing covers the crop within the cap: take the sharpest affordable stream
+            return max(affordable, key=lambda c: (height(c), candidates.index(c)))
+        return min(candidates, key=lambda c: _selection_size(c) or float('inf'))
+        
+    def __call__(self, ctx: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Select formats from a yt-dlp format-selection context."""
+        formats = ctx.get('formats') or []
+        video_only = [f for f in formats if _has_video(f) and not _has_audio(f)]
+        audio_only = [f for f in formats if _has_audio(f) and not _has_video(f)]
+        muxed = [f for f in formats if _has_video(f) and _has_audio(f)]
+        
+        if video_only and audio_only:
+            # yt-dlp sorts formats worst to best, so the last audio stream is the best
+            candidates = [(video, audio_only[-1]) for video in video_only]
+        else:
+            candidates = [(f,) for f in muxed or video_only]
+        if not candidates:
+            if formats:
+                yield formats[-1]
+            return
+        
+        chosen = self.choose(candidates)
+        self.selected_bytes = _selection_size(chosen)
+        best_bytes = _selection_size(candidates[-1])
+        self.bytes_saved = (best_bytes - self.selected_bytes
+                            if best_bytes is not None and self.selected_bytes is not None else None)
+        
+        if len(chosen) == 1:
+            yield chosen[0]
+            return
+        video, audio = chosen
+        yield {
+            'format_id': f"{video['format_id']}+{audio['format_id']}",
+            'ext': video.get('ext'),
+            'requested_formats': [video, audio],
+            'protocol': f"{video.get('protocol')}+{audio.get('protocol')}",
+        }
+        
+    def describe_savings(self) -> str:
+        """Human-readable summary of the last selection."""
+        if self.bytes_saved is None:
+            return "size unknown"
+        return (f"{self.selected_bytes / 1024 / 1024:.1f} MB, "
+                f"{self.bytes_saved / 1024 / 1024:.1f} MB saved vs bestvideo+bestaudio")
+
+def _build_ydl_opts(**overrides: Any) -> Dict[str, Any]:
+    """
+    Build the yt-dlp options shared by probing and downloading.
     
     Args:
-        url: URL of the media to download
-        title: Title to use for the downloaded file
-        submission_id: Reddit submission ID for tracking
+        **overrides: Options to add or replace
         
     Returns:
-        True if download was successful, otherwise False
+        Dictionary of yt-dlp options
     """
-    sanitized_title = utils.sanitize_filename(title)
-    
-    # Define a filter to skip videos longer than MAX_VIDEO_DURATION seconds
-    def duration_filter(info):
-        duration = info.get('duration')
-        if duration and duration > config.MAX_VIDEO_DURATION:
-            return f"Video duration exceeds {config.MAX_VIDEO_DURATION} seconds."
-        return None
-
-    # yt-dlp options for merging video and audio
     ydl_opts = {
-        'format': 'bestvideo+bestaudio/best',
+        'format': ShortsFormatSelector(),
         'merge_output_format': 'mp4',
-        'outtmpl': f'{sanitized_title}.%(ext)s',
         'ffmpeg_location': config.FFMPEG_PATH,
         'quiet': True,
         'no_warnings': True,
-        'match_filter': duration_filter,  # Apply the duration filter
+        'match_filter': _duration_filter,  # Apply the duration filter
+        'concurrent_fragment_downloads': config.CONCURRENT_FRAGMENT_DOWNLOADS,
+        'continuedl': True,  # Resume .part files left by an interrupted run
     }
+    ydl_opts.update(overrides)
+    return ydl_opts
 
+def _load_probe_cache() -> Dict[str, Dict[str, Any]]:
+    """Load cached probe summaries keyed by submission ID."""
+    content = utils.read_file_content(config.PROBE_CACHE_FILE) if config.PROBE_CACHE_FILE.exists() else ""
+    if not content:
+        return {}
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
-        logger.info(f"Successfully downloaded: {title}")
+        cache = json.loads(content)
+    except ValueError as e:
+        logger.warning(f"Ignoring unreadable probe cache {config.PROBE_CACHE_FILE}: {e}")
+        return {}
+    
+    # Drop entries old enough that the submission has left the daily listings
+    cutoff = time.time() - config.PROBE_CACHE_MAX_AGE_DAYS * 86400
+    return {key: value for key, value in cache.items() if value.get('probed_at', 0) >= cutoff}
+
+def _save_probe_cache(cache: Dict[str, Dict[str, Any]]) -> None:
+    """Persist probe summaries keyed by submission ID."""
+    utils.write_file_content(config.PROBE_CACHE_FILE, json.dumps(cache))
+
+def _summarize_info(info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduce a yt-dlp info dict to the fields used to accept or reject a video.
+    
+    Args:
+        info: Info dict returned by extract_info(download=False)
         
-        # Append the video title to VidTitle.txt
-        utils.write_file_content(config.VID_TITLE_FILE, title)
-        return True
+    Returns:
+        Dictionary with duration, resolution, codecs, size and rejection reason
+    """
+    formats = info.get('requested_formats') or [info]
+    video_formats = [f for f in formats if f.get('vcodec') not in (None, 'none')]
+    audio_formats = [f for f in formats if f.get('acodec') not in (None, 'none')]
+    summary = {
+        'duration': info.get('duration'),
+        'width': max((f.get('width') or 0 for f in video_formats), default=0),
+        'height': max((f.get('height') or 0 for f in video_formats), default=0),
+        'vcodec': video_formats[0].get('vcodec') if video_formats else None,
+        'acodec': audio_formats[0].get('acodec') if audio_formats else None,
+        'filesize': sum(f.get('filesize') or f.get('filesize_approx') or 0 for f in formats),
+        'probed_at': time.time(),
+        'rejected': None,
+    }
+    
+    if info.get('_type') == 'playlist':
+        summary['rejected'] = "Link is a playlist, not a single video."
+    elif not video_formats and not info.get('vcodec'):
+        summary['rejected'] = "No usable video format."
+    elif summary['duration'] and summary['duration'] > max_source_duration():
+        summary['rejected'] = f"Video duration exceeds {max_source_duration()} seconds."
+    elif summary['filesize'] > config.MAX_DOWNLOAD_MB * 1024 * 1024:
+        summary['rejected'] = f"Selected formats exceed {config.MAX_DOWNLOAD_MB} MB."
+    return summary
+
+def probe_media(url: str, submission_id: str, cache: Dict[str, Dict[str, Any]],
+                lock: Optional[threading.Lock] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Gather duration, resolution, codecs and size for a candidate without downloading it.
+    
+    Rejections are cached by submission ID, so repeat runs skip known-bad
+    candidates without contacting the extractor again. Failures to reach the
+    extractor are not cached.
+    
+    Args:
+        url: URL of the media to probe
+        submission_id: Reddit submission ID used as the cache key
+        cache: Probe cache loaded with _load_probe_cache (updated in place)
+        lock: Held while the cache is read or written, but not during the
+            extractor request, when the cache is shared between threads
+        
+    Returns:
+        Tuple of (yt-dlp info dict to download from, rejection reason). Both are
+        None when probing failed in a way a later attempt may not.
+    """
+    with lock or contextlib.nullcontext():
+        cached = cache.get(submission_id)
+    if cached and cached.get('rejected'):
+        # A source rejected as too long is probed again once the limit allows it,
+        # e.g. after switching TRIM_MODE to best
+        too_long = cached['rejected'].startswith("Video duration exceeds")
+        if not (too_long and cached.get('duration') and cached['duration'] <= max_source_duration()):
+            return None, cached['rejected']
+    
+    start = time.perf_counter()
+    selector = ShortsFormatSelector()
+    try:
+        with yt_dlp.YoutubeDL(_build_ydl_opts(format=selector, match_filter=None)) as ydl:
+            info = ydl.extract_info(url, download=False)
     except Exception as e:
-        logger.error(f"Failed to download {title}: {str(e)}")
-        return False
+        logger.warning(f"Failed to probe {url}: {str(e)}")
+        return None, None
+    
+    summary = _summarize_info(info)
+    summary['bytes_saved'] = selector.bytes_saved
+    with lock or contextlib.nullcontext():
+        cache[submission_id] = summary
+        _save_probe_cache(cache)
+    logger.info(f"Probed {submission_id} in {time.perf_counter() - start:.2f}s: "
+                f"{summary['width']}x{summary['height']} {summary['vcodec']}/{summary['acodec']}, "
+                f"{summary['duration']}s, {summary['filesize'] / 1024 / 1024:.1f} MB")
+    
+    if summary['rejected']:
+        return None, summary['rejected']
+    return info, None
 
-def check_new_videos() -> bool:
+def evict_stale_partials(staging_dir: Path = config.DOWNLOAD_STAGING_DIR,
+                         max_age_hours: float = config.STAGING_MAX_AGE_HOURS,
+                         max_mb: float = config.STAGING_MAX_MB) -> int:
     """
-    Check for and download videos from selected subreddits.
-    Stops immediately after finding and downloading the first new video.
+    Delete partial downloads that are too old or exceed the staging size budget.
     
+    Args:
+        staging_dir: Directory holding one subdirectory per submission
+        max_age_hours: Partials untouched for longer than this are deleted
+        max_mb: Oldest partials are deleted until the total is under this size
+        
     Returns:
-        True if a video was successfully downloaded, otherwise False
+        Number of partial downloads deleted
     """
-    # Load the IDs of videos that have already been downloaded
-    downloaded_ids = set()
-    if config.DOWNLOADED_IDS_FILE.exists():
-        downloaded_ids = set(utils.read_file_content(config.DOWNLOADED_IDS_FILE).splitlines())
+    return utils.evict_stale_directories(staging_dir, max_age_hours, max_mb, "partial download")
 
-    # Read subreddit names from the subreddit list file
-    subreddit_content = utils.read_file_content(config.SUBREDDIT_LIST_FILE)
-    if not subreddit_content:
-        logger.error(f"Error: Subreddit list is empty or file does not exist: {config.SUBREDDIT_LIST_FILE}")
-        return False
+def stream_media(info: Dict[str, Any], title: str,
+                 dest_dir: Path = config.BASE_DIR) -> Optional[Path]:
+    """
+    Transcode a probed video to the Shorts format while it downloads.
+    
+    Args:
+        info: Info dict from probe_media with the selected formats
+        title: Title to use for the output file
+        dest_dir: Directory the output file is written to
+        
+    Returns:
+        Path of the Shorts video, or None if the selected formats cannot be
+        streamed or the transcode failed
+    """
+    formats = sorted(info.get('requested_formats') or [info], key=lambda f: not _has_video(f))
+    if any(f.get('protocol') not in STREAMABLE_PROTOCOLS or not f.get('url') for f in formats):
+        logger.info(f"Selected formats for {title} cannot be streamed; downloading instead")
+        return None
+    video = formats[0]
+    if not _has_video(video) or not video.get('width') or not video.get('height'):
+        return None
     
-    subreddit_names = [line.strip() for line in subreddit_content.splitlines() if line.strip()]
+    duration = min(info.get('duration') or config.MAX_VIDEO_DURATION, config.MAX_VIDEO_DURATION)
+    window = utils.compute_crop_window(video['width'], video['height'])
+    profile = resolve_profile(config.ENCODER_PROFILE, duration * (video.get('fps') or 30))
+    output_path = dest_dir / f"{utils.sanitize_filename(title)}.mp4"
     
-    # Initialize Reddit instance
+    start = time.perf_counter()
     try:
-        reddit = praw.Reddit(
-            client_id=config.REDDIT_CLIENT_ID,
-            client_secret=config.REDDIT_CLIENT_SECRET,
-            user_agent=config.REDDIT_USER_AGENT
+        ffmpeg_utils.stream_transcode(
+            [(f['url'], f.get('http_headers') or {}) for f in formats],
+            output_path, duration, window.to_ffmpeg_filter(), profile.ffmpeg_args(),
         )
     except Exception as e:
-        logger.error(f"Failed to initialize Reddit API: {str(e)}")
-        return False
+        logger.warning(f"Streaming transcode of {title} failed: {str(e)}")
+        output_path.unlink(missing_ok=True)
+        return None
+    logger.info(f"Streamed and transcoded {title} in {time.perf_counter() - start:.1f}s")
+    return output_path
 
-    # Process each subreddit in order until a video is successfully downloaded
-    for subreddit_name in subreddit_names:
-        logger.info(f"Processing subreddit: {subreddit_name}")
-        try:
-            subreddit = reddit.subreddit(subreddit_name)
-            # Verify subreddit exists by accessing its id
-            _ = subreddit.id
-        except NotFound:
-            logger.warning(f"Error: Subreddit '{subreddit_name}' does not exist")
-            continue
-        except Redirect:
-            logger.warning(f"Error: Subreddit '{subreddit_name}' is invalid")
-            continue
-        except Forbidden:
-            logger.warning(f"Error: Access to subreddit '{subreddit_name}' is forbidden")
-            continue
-        except Exception as e:
-            logger.warning(f"Error accessing subreddit '{subreddit_name}': {str(e)}")
-            continue
+def download_media(url: str, title: str, submission_id: str,
+                   info: Optional[Dict[str, Any]] = None,
+                   dest_dir: Path = config.BASE_DIR) -> Optional[Path]:
+    """
+    Download the video using yt-dlp only if it meets the criteria (duration <= max_source_duration() sec).
+    
+    Data is staged in a directory keyed by the submission ID so that a killed
+    run can resume it; the finished file is moved to dest_dir.
+    With STREAMING_DOWNLOAD enabled, probed media is transcoded as it arrives
+    instead, falling back to a regular download if that is not possible.
+    
+    Args:
+        url: URL of the media to download
+        title: Title to use for the downloaded file
+        submission_id: Reddit submission ID for tracking
+        info: Info dict from probe_media; reused so the extractor is not queried again
+        dest_dir: Directory the finished video is placed in, such as the job's
+            scratch directory
+        
+    Returns:
+        Path of the downloaded video if successful, otherwise None
+    """
+    sanitized_title = utils.sanitize_filename(title)
+    utils.ensure_directory_exists(dest_dir)
+    
+    # In streaming mode the Shorts transcode runs while the media downloads; the
+    # processing step then finds a conforming file and only remuxes it
+    if config.STREAMING_DOWNLOAD and info is not None:
+        streamed = stream_media(info, title, dest_dir)
+        if streamed:
+            return streamed
+    
+    staging_dir = config.DOWNLOAD_STAGING_DIR / submission_id
+    utils.ensure_directory_exists(staging_dir)
+    
+    # yt-dlp options for merging video and audio
+    selector = ShortsFormatSelector()
+    ydl_opts = _build_ydl_opts(format=selector,
+                               outtmpl=str(staging_dir / f'{sanitized_title}.%(ext)s'))
 
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            if info is not None:
+                ydl.process_ie_result(info, download=True)
+            else:
+                ydl.download([url])
+        
+        downloaded = staging_dir / f'{sanitized_title}.mp4'
+        if not downloaded.exists():
+            video_files = utils.get_video_files(staging_dir)
+            if not video_files:
+                logger.error(f"Download of {title} finished but no video file was produced")
+                return None
+            downloaded = video_files[0]
+        video_file = dest_dir / downloaded.name
+        shutil.move(str(downloaded), str(video_file))
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        logger.info(f"Successfully downloaded: {title} ({selector.describe_savings()})")
+        return video_file
+    except Exception as e:
+        logger.error(f"Failed to download {title}: {str(e)}")
+        return None
+
+class DiscoverySession:
+    """
+    One discovery pass over the configured subreddits and the state it updates.
+    
+    Candidates are screened cheaply (NSFW, ledger, dedup index) before they are
+    probed and downloaded. The evaluated submission IDs, scheduler statistics and
+    probe cache are saved when the session is closed. fetch may be called from
+    several threads at once.
+    """
+    
+    def __init__(self):
+        """Load the caches, statistics and indexes used during discovery."""
+        self.probe_cache = _load_probe_cache()
+        self.scheduler = SubredditScheduler()
+        self.listing_cache = ListingCache()
+        self.ledger = Ledger()
+        self.dedup_index = DedupIndex()
+        self.lock = threading.Lock()
+        
+    def close(self) -> None:
+        """Persist the listing cache and close the indexes."""
+        self.listing_cache.save()
+        self.ledger.close()
+        self.dedup_index.close()
+        
+    def discover(self) -> List[Candidate]:
+        """
+        Scan the subreddits concurrently and rank their video submissions.
+        
+        Returns:
+            Candidates in ranked order, empty if discovery failed
+        """
+        # Read subreddit names from the subreddit list file
+        subreddit_content = utils.read_file_content(config.SUBREDDIT_LIST_FILE)
+        if not subreddit_content:
+            logger.error(f"Error: Subreddit list is empty or file does not exist: {config.SUBREDDIT_LIST_FILE}")
+            return []
+        
+        subreddit_names = [line.strip() for line in subreddit_content.splitlines() if line.strip()]
+        evict_stale_partials()
+        
+        # Scan the subreddits most likely to yield a video first
+        subreddit_names = self.scheduler.schedule(subreddit_names)
+        
+        engine = DiscoveryEngine(cache=self.listing_cache)
         try:
-            # Check the top submission from today; adjust the limit as needed
-            for submission in subreddit.top(time_filter="day", limit=1):
-                # Skip NSFW posts
-                if submission.over_18:
-                    logger.info(f"Skipping NSFW post: {submission.title}")
-                    continue
-
-                # Skip if this submission has already been processed
-                if submission.id in downloaded_ids:
-                    logger.info(f"Skipping already downloaded video: {submission.title}")
-                    continue
-
-                # Process Reddit-hosted videos
-                if submission.is_video:
-                    video_url = submission.media['reddit_video']['fallback_url']
-                    # Remove DASH suffix if present
-                    if "v.redd.it" in video_url:
-                        parts = video_url.split('/')
-                        if len(parts) >= 4:
-                            video_url = f"https://v.redd.it/{parts[3]}"
-                    
-                    success = download_media(video_url, submission.title, submission.id)
-                    if success:
-                        # Record submission ID to avoid future downloads
-                        utils.append_to_file(config.DOWNLOADED_IDS_FILE, f"{submission.id}\n")
-                        downloaded_ids.add(submission.id)
-                        # Stop processing further subreddits once a video is downloaded
-                        return True
-                    else:
-                        continue
-
-                # Process external video links (e.g., YouTube)
-                if submission.url and any(ext in submission.url for ext in ['youtube.com', 'youtu.be', 'v.redd.it']):
-                    success = download_media(submission.url, submission.title, submission.id)
-                    if success:
-                        utils.append_to_file(config.DOWNLOADED_IDS_FILE, f"{submission.id}\n")
-                        downloaded_ids.add(submission.id)
-                        # Stop processing further subreddits once a video is downloaded
-                        return True
+            return engine.discover(subreddit_names)
         except Exception as e:
-            logger.error(f"Error fetching posts from {subreddit_name}: {str(e)}")
+            logger.error(f"Failed to discover videos on Reddit: {str(e)}")
+            return []
+        finally:
+            with self.lock:
+                self.scheduler.record_requests(engine.request_costs)
+                self.scheduler.save()
+                
+    def _skip(self, candidate: Candidate, reason: str) -> bool:
+        """Log why a candidate is skipped and remember it as evaluated."""
+        logger.info(f"Skipping {reason}: {candidate.title}")
+        self.listing_cache.mark_evaluated(candidate.submission_id)
+        return False
+        
+    def screen(self, candidate: Candidate) -> bool:
+        """
+        Check a candidate against everything known without contacting the host.
+        
+        Args:
+            candidate: Candidate to check
+            
+        Returns:
+            True if the candidate is worth probing
+        """
+        # Skip NSFW posts
+        if candidate.over_18:
+            return self._skip(candidate, "NSFW post")
+        
+        # Skip if this submission has already been processed
+        if self.ledger.has(candidate.submission_id):
+            return self._skip(candidate, "already downloaded video")
+        
+        # Skip crossposts and reposts of videos that were already downloaded
+        duplicate = self.dedup_index.find_duplicate(candidate)
+        if duplicate:
+            return self._skip(candidate, f"duplicate video ({duplicate})")
+        return True
+        
+    def probe(self, candidate: Candidate) -> Optional[Dict[str, Any]]:
+        """
+        Probe a screened candidate without downloading it.
+        
+        Args:
+            candidate: Candidate that passed screen
+            
+        Returns:
+            yt-dlp info dict to download from, or None if the candidate was
+            rejected or could not be probed
+        """
+        logger.info(f"Trying r/{candidate.subreddit} post: {candidate.title}")
+        info, reason = probe_media(candidate.media_url, candidate.submission_id,
+                                   self.probe_cache, self.lock)
+        # A probe that failed without a verdict is retried by a later run
+        if reason is not None:
+            self._skip(candidate, f"rejected video ({reason})")
+        return info
+        
+    def select(self) -> Optional[Tuple[Candidate, Dict[str, Any]]]:
+        """
+        Find the best-ranked candidate that passes screening and probing.
+        
+        Returns:
+            The candidate and its probe info, or None if no candidate qualifies
+        """
+        for candidate in self.discover():
+            if self.screen(candidate):
+                info = self.probe(candidate)
+                if info is not None:
+                    return candidate, info
+        logger.info("No new suitable videos found across all subreddits.")
+        return None
+        
+    def fetch(self, candidate: Candidate, info: Optional[Dict[str, Any]] = None,
+              dest_dir: Path = config.BASE_DIR) -> Optional[Path]:
+        """
+        Download a screened candidate and record the download.
+        
+        Args:
+            candidate: Candidate that passed screen
+            info: Probe info from probe; the candidate is probed first when None
+            dest_dir: Directory the video is downloaded to
+            
+        Returns:
+            Path of the downloaded video, or None if it was rejected or failed
+        """
+        if info is None:
+            info = self.probe(candidate)
+            if info is None:
+                return None
+        
+        # A failed download is not marked as evaluated, so a later run can resume it
+        video_file = download_media(candidate.media_url, candidate.title, candidate.submission_id,
+                                    info, dest_dir)
+        if video_file is None:
+            return None
+        
+        self.listing_cache.mark_evaluated(candidate.submission_id)
+        with self.lock:
+            self.scheduler.record_download(candidate.subreddit, candidate.submission_id)
+            self.scheduler.save()
+        # Record submission ID to avoid future downloads
+        self.ledger.record_download(candidate.submission_id, candidate.subreddit, candidate.title)
+        self.dedup_index.add(candidate)
+        return video_file
+
+def check_new_videos() -> Optional[Job]:
+    """
+    Check for and download videos from selected subreddits.
+    All subreddits are scanned concurrently; candidates are tried in ranked
+    order and the search stops after the first successful download.
+    
+    Returns:
+        Job of the downloaded video, or None if no video was downloaded
+    """
+    session = DiscoverySession()
+    try:
+        # Try candidates in ranked order until a video is successfully downloaded
+        for candidate in session.discover():
+            if not session.screen(candidate):
+                continue
+            job = Job.from_candidate(candidate)
+            if not job.claim():
+                continue
+            video_file = session.fetch(candidate, dest_dir=job.scratch_dir)
+            if video_file:
+                job.video_file = job.register_artifact(video_file)
+                job.write_debug_files()
+                return job
+    finally:
+        session.close()
     
     logger.info("No new suitable videos found across all subreddits.")
-    return False
+    return None
+
+def select_new_video(session: DiscoverySession, job: Job) -> bool:
+    """
+    Choose the video to download so that steps needing only its Reddit
+    title can start while it downloads.
+    
+    Args:
+        session: Discovery session of the workflow run
+        job: Empty job; receives the chosen submission and its probe info
+        
+    Returns:
+        True if a video was selected and its scratch directory claimed, otherwise False
+    """
+    selected = session.select()
+    if selected is None:
+        return False
+    
+    candidate, job.probe_info = selected
+    job.candidate = candidate
+    job.submission_id = candidate.submission_id
+    job.subreddit = candidate.subreddit
+    job.source_title = candidate.title
+    job.write_debug_files()
+    # Claim the scratch directory before any step writes to it
+    return job.claim()
+
+def download_selected_video(session: DiscoverySession, job: Job) -> bool:
+    """
+    Download the video chosen by select_new_video.
+    
+    A failed download is not retried with another candidate, because other
+    steps may already be working on this one; its partial data is kept so the
+    next run resumes it.
+    
+    Args:
+        session: Discovery session the video was selected in
+        job: Job filled in by select_new_video; receives the video file,
+            downloaded to its scratch directory
+        
+    Returns:
+        True if the video was downloaded, otherwise False
+    """
+    video_file = session.fetch(job.candidate, job.probe_info, job.scratch_dir)
+    if video_file is None:
+        return False
+    job.video_file = job.register_artifact(video_file)
+    return True
 
 if __name__ == '__main__':
     check_new_videos()
@@ -6,8 +6,7 @@ import os
 import logging
 from typing import Tuple, Optional
 
-import config
-import utils
+from job import Job
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -89,19 +88,21 @@ class ContentGenerator:
                 
         return title, description, hashtags
 
-def enhance_video_title() -> bool:
+def enhance_video_title(job: Job) -> bool:
     """
-    Read the most recently downloaded video title, enhance it with AI, and save the results.
+    Enhance a video's Reddit title with AI and store the results on its job.
     
+    Args:
+        job: Job of the video; receives the title, description and hashtags
+        
     Returns:
         True if successful, False otherwise
     """
     try:
-        # Read the title from VidTitle.txt
-        original_title = utils.read_file_content(config.VID_TITLE_FILE)
+        original_title = job.source_title
         
         if not original_title:
-            logger.warning("[WARNING] VidTitle.txt is empty! Please provide a valid title.")
+            logger.warning("[WARNING] The job has no Reddit title to enhance.")
             return False
             
         logger.info(f"Enhancing title: {original_title}")
@@ -114,10 +115,8 @@ def enhance_video_title() -> bool:
             logger.error(f"Failed to initialize ContentGenerator: {str(e)}")
             return False
             
-        # Save outputs to respective files
-        utils.write_file_content(config.FINAL_TITLE_FILE, title)
-        utils.write_file_content(config.DESC_FILE, description)
-        utils.write_file_content(config.HASHTAG_FILE, hashtags)
+        job.title, job.description, job.hashtags = title, description, hashtags
+        job.write_debug_files()
         
         logger.info("[SUCCESS] AI-generated content saved successfully!")
         logger.info(f"[INFO] Final Title: {title}")
@@ -131,4 +130,4 @@ def enhance_video_title() -> bool:
         return False
 
 if __name__ == '__main__':
-    enhance_video_title()
\ No newline at end of file
+    enhance_video_title(Job.from_debug_files())
\ No newline at end of file
@@ -1,7 +1,6 @@
 """
 Uploads processed videos to YouTube as Shorts.
 """
-import os
 import logging
 from pathlib import Path
 from typing import Optional, Dict, Any
@@ -10,6 +9,10 @@ import google_auth_oauthlib.flow
 
 import config
 import utils
+from dedup_index import DedupIndex
+from job import Job
+from ledger import Ledger
+from subreddit_scheduler import record_publish
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -41,6 +44,7 @@ class YouTubeUploader:
         self.api_version = api_version
         self.scopes = scopes
         self.project_id = project_id or config.YOUTUBE_PROJECT_ID
+        self.credentials = None
         self.youtube = None
         
     def authenticate(self) -> bool:
@@ -65,13 +69,13 @@ class YouTubeUploader:
                 },
                 scopes=self.scopes
             )
-            credentials = flow.run_local_server()
+            self.credentials = flow.run_local_server()
             
             # Build YouTube API client
             self.youtube = googleapiclient.discovery.build(
                 self.api_name, 
                 self.api_version, 
-                credentials=credentials
+                credentials=self.credentials
             )
             logger.info("Successfully authenticated with YouTube API")
             return True
@@ -80,7 +84,56 @@ class YouTubeUploader:
             logger.error(f"Authentication failed: {str(e)}")
             return False
     
-    def upload_video(self, video_file: Path, title: str, description: str, tags: list) -> Optional[str]:
+    def clone(self) -> "YouTubeUploader":
+        """
+        Create an uploader with its own API client that reuses these credentials.
+        
+        API clients are not thread-safe, so each thread needs its own, but
+        cloning one does not run the OAuth flow again.
+        
+        Returns:
+            Authenticated uploader
+            
+        Raises:
+            ValueError: If this uploader has not been authenticated
+        """
+        if self.credentials is None:
+            raise ValueError("Authenticate the uploader before cloning it")
+        uploader = YouTubeUploader(self.client_id, self.client_secret, self.api_name,
+                                   self.api_version, self.scopes, self.project_id)
+        uploader.credentials = self.credentials
+        uploader.youtube = googleapiclient.discovery.build(
+            self.api_name,
+            self.api_version,
+            credentials=self.credentials
+        )
+        return uploader
+    
+    def set_thumbnail(self, youtube_video_id: str, thumbnail: Path) -> bool:
+        """
+        Set the custom thumbnail of an uploaded video.
+        
+        Args:
+            youtube_video_id: ID of the uploaded video
+            thumbnail: JPEG thumbnail file
+            
+        Returns:
+            True if the thumbnail was set, False otherwise
+        """
+        try:
+            self.youtube.thumbnails().set(
+                videoId=youtube_video_id,
+                media_body=str(thumbnail)
+            ).execute()
+            logger.info(f"Thumbnail set for video {youtube_video_id}")
+            return True
+        except Exception as e:
+            # Custom thumbnails need a verified channel; the upload itself still counts
+            logger.warning(f"Could not set thumbnail for video {youtube_video_id}: {str(e)}")
+            return False
+    
+    def upload_video(self, video_file: Path, title: str, description: str, tags: list,
+                     thumbnail: Optional[Path] = None) -> Optional[str]:
         """
         Upload a video to YouTube.
         
@@ -89,6 +142,7 @@ class YouTubeUploader:
             title: Video title
             description: Video description
             tags: List of tags for the video
+            thumbnail: JPEG thumbnail to set after the upload, if any
             
         Returns:
             YouTube video ID if successful, None otherwise
@@ -132,35 +186,58 @@ class YouTubeUploader:
             youtube_video_id = response['id']
             
             logger.info(f"Video uploaded successfully with ID: {youtube_video_id}")
+            
+            if thumbnail and thumbnail.exists():
+                self.set_thumbnail(youtube_video_id, thumbnail)
             return youtube_video_id
             
         except Exception as e:
             logger.error(f"Error uploading video: {str(e)}")
             return None
 
-def upload_and_delete() -> bool:
+def record_youtube_upload(submission_id: str, youtube_video_id: str) -> None:
     """
-    Upload the most recently processed video to YouTube and delete it after successful upload.
+    Record a published video in the ledger, dedup index and scheduler statistics.
     
-    Returns:
-        True if upload was successful, False otherwise
+    Args:
+        submission_id: Reddit submission ID of the video
+        youtube_video_id: ID of the uploaded YouTube video
     """
-    upload_success = False
-    video_file = None
-    cleanup_success = True
+    try:
+        ledger = Ledger()
+        try:
+            ledger.record_youtube(submission_id, youtube_video_id)
+        finally:
+            ledger.close()
+        logger.info(f"Video ID {youtube_video_id} saved to ledger")
+        # Later reposts of this clip are now rejected before encoding
+        dedup_index = DedupIndex()
+        try:
+            dedup_index.mark_published(submission_id)
+        finally:
+            dedup_index.close()
+    except Exception as e:
+        logger.error(f"Failed to record video ID {youtube_video_id} in ledger: {str(e)}")
     
-    # Read content from files
-    title = utils.read_file_content(config.FINAL_TITLE_FILE)
-    description = utils.read_file_content(config.DESC_FILE)
-    hashtags = utils.read_file_content(config.HASHTAG_FILE)
+    # Credit the source subreddit for scheduling
+    record_publish(submission_id)
+
+def publish_video(uploader: YouTubeUploader, video_file: Path, submission_id: str,
+                  title: str, description: str, hashtags: str) -> Optional[str]:
+    """
+    Upload one processed video with its generated metadata and record the result.
     
-    # Validate content
-    if not title:
-        logger.error("No title found in FinalTitle.txt")
-        # Even if there's no title, clean up files before returning
-        cleanup_files()
-        return False
+    Args:
+        uploader: Authenticated uploader
+        video_file: Processed Shorts video
+        submission_id: Reddit submission ID of the video (may be empty)
+        title: Video title
+        description: Video description
+        hashtags: Comma-separated hashtags
         
+    Returns:
+        YouTube video ID if successful, None otherwise
+    """
     # Format description with hashtags
     full_description = description
     if hashtags:
@@ -169,92 +246,89 @@ def upload_and_delete() -> bool:
     # Get hashtags as a list (for tags parameter)
     tags_list = [tag.strip() for tag in hashtags.split(',') if tag.strip()]
     
-    try:
-        # Get the most recent video file
-        video_file = utils.get_most_recent_video()
+    youtube_video_id = uploader.upload_video(video_file, title, full_description, tags_list,
+                                             thumbnail=utils.get_thumbnail_path(video_file))
+    if youtube_video_id is None:
+        return None
+    
+    # Link the uploaded YouTube video ID to its source submission
+    if submission_id:
+        record_youtube_upload(submission_id, youtube_video_id)
+    else:
+        logger.warning(f"No submission ID found for uploaded video {youtube_video_id}")
+    return youtube_video_id
+
+def upload_to_youtube(job: Job) -> bool:
+    """
+    Upload a job's processed video to YouTube without deleting it.
+    
+    Falls back to the Reddit title when no generated title is available.
+    
+    Args:
+        job: Job of the processed video; receives the YouTube video ID
         
-        if not video_file:
-            logger.info("No video files found to upload.")
-            # Clean up any potential files that might still be there
-            cleanup_files()
+    Returns:
+        True if upload was successful, False otherwise
+    """
+    # Validate content
+    title = job.upload_title
+    if not title:
+        logger.error("The job has neither a generated nor a Reddit title")
+        return False
+    
+    try:
+        if job.video_file is None or not job.video_file.exists():
+            logger.info("No video file found to upload.")
             return False
             
-        logger.info(f"Found most recent video file: {video_file}")
+        logger.info(f"Uploading video file: {job.video_file}")
         
         # Initialize uploader and authenticate
         uploader = YouTubeUploader()
         if not uploader.authenticate():
-            # Clean up files even if authentication fails
-            cleanup_files()
             return False
             
         # Upload video
-        youtube_video_id = uploader.upload_video(video_file, title, full_description, tags_list)
-        
-        upload_success = youtube_video_id is not None
-        
-        if upload_success:
-            # Save the uploaded YouTube video ID to file
-            utils.append_to_file(config.YOUTUBE_VIDEO_IDS_FILE, f"{youtube_video_id}\n")
-            logger.info("Video ID saved to file")
+        job.youtube_id = publish_video(uploader, job.video_file, job.submission_id,
+                                       title, job.description, job.hashtags)
+        return job.youtube_id is not None
     
     except Exception as e:
         logger.error(f"Error in upload process: {str(e)}")
-        upload_success = False
+        return False
+
+def upload_and_delete(job: Job) -> bool:
+    """
+    Upload a job's processed video to YouTube and delete it after successful upload.
     
-    # Always clean up files regardless of what happened in the try block
-    if not cleanup_files():
+    Args:
+        job: Job of the processed video
+        
+    Returns:
+        True if upload was successful, False otherwise
+    """
+    cleanup_success = True
+    upload_success = upload_to_youtube(job)
+    
+    # Always clean up files regardless of what happened during the upload
+    if not cleanup_files(job):
         cleanup_success = False
     
     # Only return True if both upload and cleanup succeeded
     return upload_success and cleanup_success
 
-def cleanup_files() -> bool:
+def cleanup_files(job: Job) -> bool:
     """
-    Clean up MP4 and JPG files from the current directory.
+    Delete the files a job created and its scratch directory.
     This function will be called regardless of upload success or failure.
     
+    Args:
+        job: Job whose files are deleted
+        
     Returns:
         True if all files were cleaned up successfully, False otherwise
     """
-    cleanup_success = True
-    try:
-        # Find all mp4 and jpg files in the current directory
-        import glob
-        mp4_files = glob.glob("*.mp4")
-        jpg_files = glob.glob("*.jpg")
-        
-        logger.info(f"Found {len(mp4_files)} MP4 files and {len(jpg_files)} JPG files to clean up")
-        
-        # Close any potential file handles before deletion
-        import gc
-        gc.collect()
-        
-        # Delete mp4 files
-        for file in mp4_files:
-            try:
-                if os.path.exists(file):
-                    os.remove(file)
-                    logger.info(f"Deleted MP4 file: {file}")
-            except Exception as e:
-                cleanup_success = False
-                logger.error(f"Error deleting file {file}: {e}")
-        
-        # Delete jpg files
-        for file in jpg_files:
-            try:
-                if os.path.exists(file):
-                    os.remove(file)
-                    logger.info(f"Deleted JPG file: {file}")
-            except Exception as e:
-                cleanup_success = False
-                logger.error(f"Error deleting file {file}: {e}")
-                
-    except Exception as e:
-        cleanup_success = False
-        logger.error(f"Error during file cleanup: {e}")
-    
-    return cleanup_success
+    return job.cleanup()
 
 if __name__ == "__main__":
-    upload_and_delete()
+    upload_and_delete(Job.from_debug_files())
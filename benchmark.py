@@ -0,0 +1,369 @@
+"""
+Benchmarks for the video processing pipeline on synthetic clips.
+
+Usage:
+    python benchmark.py pipeline [--duration SECONDS] [--runs N]
+    python benchmark.py resize [--frames N]
+    python benchmark.py parallel [--duration SECONDS] [--workers N]
+    python benchmark.py backends [--duration SECONDS] [--profile NAME]
+    python benchmark.py discovery [--subreddits N] [--latency SECONDS] [--workers N] [--chunk-size N]
+"""
+import argparse
+import json
+import logging
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict
+
+import praw
+from moviepy.editor import VideoFileClip
+
+import config
+import ffmpeg_utils
+import utils
+from encoder_profiles import DEFAULT_PROFILE, get_profile
+from reddit_discovery import DiscoveryEngine
+from yt_shorts_processor import BACKENDS, MoviePyBackend, VideoProcessor
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+def make_synthetic_clip(path: Path, duration: float, width: int = 1920, height: int = 1080,
+                        fps: int = 30) -> Path:
+    """
+    Generate a synthetic landscape clip with moving video and a sine tone.
+
+    Args:
+        path: Destination file
+        duration: Clip length in seconds
+        width: Frame width
+        height: Frame height
+        fps: Frame rate
+
+    Returns:
+        The path of the generated clip
+    """
+    ffmpeg_utils.run_ffmpeg([
+        "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={fps}:duration={duration}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}",
+        "-c:v", "libx264", "-pix_fmt", "yuv420p",
+        "-c:a", "aac",
+        "-shortest",
+        str(path),
+    ])
+    return path
+
+def _cpu_seconds() -> float:
+    """Return user+system CPU time consumed by this process and its children."""
+    usage_self = resource.getrusage(resource.RUSAGE_SELF)
+    usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (usage_self.ru_utime + usage_self.ru_stime
+            + usage_children.ru_utime + usage_children.ru_stime)
+
+def _measure(func: Callable[[], None]) -> Dict[str, float]:
+    """Run a callable and return its wall-clock and CPU time."""
+    wall_start, cpu_start = time.perf_counter(), _cpu_seconds()
+    func()
+    return {
+        "wall": time.perf_counter() - wall_start,
+        "cpu": _cpu_seconds() - cpu_start,
+    }
+
+def legacy_process_video(file_path: Path, output_dir: Path) -> None:
+    """
+    Reference implementation of the original two-encode processing path.
+
+    Args:
+        file_path: Video to process in place
+        output_dir: Directory receiving the trimmed archive copy
+    """
+    clip = VideoFileClip(str(file_path))
+    if clip.duration > config.MAX_VIDEO_DURATION:
+        clip = clip.subclip(0, config.MAX_VIDEO_DURATION)
+    clip.write_videofile(str(output_dir / file_path.name), codec="libx264", audio_codec="aac",
+                         logger=None)
+    clip = clip.resize(height=config.VIDEO_HEIGHT)
+    clip = clip.crop(x_center=clip.w/2, width=config.VIDEO_WIDTH)
+    temp_output_path = file_path.parent / f"temp_{file_path.name}"
+    clip.write_videofile(str(temp_output_path), codec="libx264", audio_codec="aac", logger=None)
+    clip.close()
+    file_path.unlink()
+    temp_output_path.rename(file_path)
+
+def bench_pipeline(duration: float, runs: int) -> None:
+    """
+    Compare the legacy two-encode path with the current VideoProcessor.
+
+    Args:
+        duration: Length of the synthetic clip in seconds
+        runs: Number of runs per path
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        source = make_synthetic_clip(work_dir / "source.mp4", duration)
+        archive_dir = work_dir / "archive"
+        archive_dir.mkdir()
+        processor = VideoProcessor(input_dir=work_dir, output_dir=archive_dir)
+
+        results = {}
+        for name, run in (
+            ("legacy", lambda path: legacy_process_video(path, archive_dir)),
+            ("current", processor.process_video),
+        ):
+            timings = []
+            for i in range(runs):
+                clip_path = work_dir / f"{name}_{i}.mp4"
+                shutil.copy(source, clip_path)
+                timings.append(_measure(lambda: run(clip_path)))
+            results[name] = {
+                "wall": sum(t["wall"] for t in timings) / runs,
+                "cpu": sum(t["cpu"] for t in timings) / runs,
+            }
+
+    for name, result in results.items():
+        print(f"{name:>8}: wall {result['wall']:.2f}s  cpu {result['cpu']:.2f}s")
+    legacy, current = results["legacy"], results["current"]
+    print(f" speedup: wall {legacy['wall'] / current['wall']:.2f}x  "
+          f"cpu {legacy['cpu'] / current['cpu']:.2f}x")
+
+def bench_resize(frames: int) -> None:
+    """
+    Compare scale-then-crop with crop-then-scale on landscape frames.
+
+    Args:
+        frames: Number of frames to render per path
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        source = make_synthetic_clip(Path(tmp) / "source.mp4", duration=frames / 30 + 1)
+        clip = VideoFileClip(str(source))
+        legacy = clip.resize(height=config.VIDEO_HEIGHT)
+        legacy = legacy.crop(x_center=legacy.w/2, width=config.VIDEO_WIDTH)
+        current = MoviePyBackend().crop_and_scale(clip)
+
+        window = utils.compute_crop_window(clip.w, clip.h)
+        scaled_pixels = {
+            "legacy": round(clip.w * config.VIDEO_HEIGHT / clip.h) * config.VIDEO_HEIGHT,
+            "current": window.out_width * window.out_height,
+        }
+        for name, transformed in (("legacy", legacy), ("current", current)):
+            timing = _measure(lambda: [transformed.get_frame(i / 30) for i in range(frames)])
+            print(f"{name:>8}: {transformed.w}x{transformed.h}  "
+                  f"{timing['wall'] / frames * 1000:.1f} ms/frame  "
+                  f"{scaled_pixels[name] / 1e6:.2f} Mpx scaled/frame")
+        clip.close()
+
+def bench_parallel(duration: float, workers: int) -> None:
+    """
+    Compare serial and segment-parallel encoding of a long clip.
+
+    Args:
+        duration: Length of the synthetic clip in seconds
+        workers: Worker count for the parallel run
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        source = make_synthetic_clip(work_dir / "source.mp4", duration)
+        archive_dir = work_dir / "archive"
+        archive_dir.mkdir()
+
+        results = {}
+        for name, parallel in (("serial", False), ("parallel", True)):
+            processor = VideoProcessor(input_dir=work_dir, output_dir=archive_dir,
+                                       max_duration=duration, parallel=parallel,
+                                       workers=workers)
+            clip_path = work_dir / f"{name}.mp4"
+            shutil.copy(source, clip_path)
+            results[name] = _measure(lambda: processor.process_video(clip_path))
+
+    for name, result in results.items():
+        print(f"{name:>8}: wall {result['wall']:.2f}s  cpu {result['cpu']:.2f}s")
+    print(f" speedup: wall {results['serial']['wall'] / results['parallel']['wall']:.2f}x "
+          f"with {workers} workers")
+
+def render_once(backend_name: str, source: Path, dest: Path, duration: float,
+                profile_name: str = DEFAULT_PROFILE) -> None:
+    """
+    Render one clip with a backend and print wall time and peak RSS as JSON.
+
+    Meant to run in a fresh interpreter so peak RSS covers only this render.
+
+    Args:
+        backend_name: Key into yt_shorts_processor.BACKENDS
+        source: Source clip
+        dest: Destination for the Shorts video
+        duration: Length of the output in seconds
+        profile_name: Encoder profile used for the render
+    """
+    backend = BACKENDS[backend_name]()
+    info = ffmpeg_utils.probe_media(source)
+    profile = get_profile(profile_name)
+    timing = _measure(lambda: backend.render(source, dest, duration, info, profile))
+    # ru_maxrss is in kilobytes on Linux
+    print(json.dumps({
+        "wall": timing["wall"],
+        "cpu": timing["cpu"],
+        "python_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "ffmpeg_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }))
+
+def bench_backends(duration: float, profile_name: str = DEFAULT_PROFILE, fps: int = 30) -> None:
+    """
+    Compare throughput and peak RSS of the moviepy and ffmpeg backends.
+
+    Args:
+        duration: Length of the synthetic clip in seconds
+        profile_name: Encoder profile used by both backends
+        fps: Frame rate of the synthetic clip
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        source = make_synthetic_clip(work_dir / "source.mp4", duration, fps=fps)
+        for name in BACKENDS:
+            output = subprocess.run(
+                [sys.executable, __file__, "_render", name, str(source),
+                 str(work_dir / f"{name}.mp4"), str(duration), "--profile", profile_name],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{name:>8}: {duration * fps / result['wall']:.1f} fps  "
+                  f"wall {result['wall']:.2f}s  cpu {result['cpu']:.2f}s  "
+                  f"peak RSS python {result['python_rss_mb']:.0f} MB / "
+                  f"ffmpeg {result['ffmpeg_rss_mb']:.0f} MB")
+
+class FakeRedditHandler(BaseHTTPRequestHandler):
+    """Serves just enough of the Reddit API for discovery, with a fixed delay per request."""
+
+    latency = 0.1
+
+    def log_message(self, format, *args):
+        """Silence per-request logging."""
+
+    def _send_json(self, payload: dict) -> None:
+        """Write a JSON response."""
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        """Hand out an access token."""
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._send_json({"access_token": "fake", "token_type": "bearer",
+                         "expires_in": 3600, "scope": "*"})
+
+    def do_GET(self):
+        """Answer subreddit about pages and listings."""
+        time.sleep(self.latency)
+        match = re.match(r"^/r/([^/?]+)/(about|top)", self.path)
+        if not match:
+            self.send_error(404)
+            return
+        name, endpoint = match.groups()
+        if endpoint == "about":
+            self._send_json({"kind": "t5", "data": {"id": name[:6], "display_name": name}})
+            return
+        # Multireddit listings (r/a+b+c) hold posts from every member subreddit
+        posts = [{"kind": "t3", "data": {
+            "id": f"{sub}{i}", "title": f"Post {i} in {sub}", "subreddit": sub,
+            "score": hash((sub, i)) % 10000, "created_utc": time.time(), "over_18": False,
+            "is_video": False, "media": None, "url": f"https://youtu.be/{sub}{i}",
+            "permalink": f"/r/{sub}/comments/{sub}{i}/",
+        }} for sub in name.split("+") for i in range(3)]
+        self._send_json({"kind": "Listing", "data": {"children": posts, "after": None}})
+
+def bench_discovery(subreddits: int, latency: float, workers: int,
+                    chunk_size: int = config.MULTIREDDIT_CHUNK_SIZE) -> None:
+    """
+    Compare discovery strategies against a local fake Reddit server.
+
+    Args:
+        subreddits: Number of subreddits to scan
+        latency: Delay added to every API response, in seconds
+        workers: Worker count for the concurrent runs
+        chunk_size: Subreddits per multireddit request in the batched run
+    """
+    FakeRedditHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeRedditHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def reddit_factory() -> praw.Reddit:
+        return praw.Reddit(client_id="bench", client_secret="bench", user_agent="bench",
+                           oauth_url=base_url, reddit_url=base_url)
+
+    names = [f"sub{i}" for i in range(subreddits)]
+    results = {}
+    try:
+        for name, worker_count, chunk in (("serial", 1, 1),
+                                          ("concurrent", workers, 1),
+                                          ("batched", workers, chunk_size)):
+            engine = DiscoveryEngine(reddit_factory, workers=worker_count,
+                                     requests_per_minute=1_000_000, chunk_size=chunk)
+            results[name] = _measure(lambda: engine.discover(names))
+            print(f"{name:>10}: {results[name]['wall']:.2f}s for {subreddits} subreddits, "
+                  f"{engine.request_count} requests")
+    finally:
+        server.shutdown()
+    for name in ("concurrent", "batched"):
+        print(f"{name:>10} speedup: {results['serial']['wall'] / results[name]['wall']:.2f}x")
+
+def main() -> None:
+    """Parse command-line arguments and run the selected benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    pipeline_parser = subparsers.add_parser("pipeline", help="Legacy vs current processing path")
+    pipeline_parser.add_argument("--duration", type=float, default=20.0)
+    pipeline_parser.add_argument("--runs", type=int, default=3)
+
+    resize_parser = subparsers.add_parser("resize", help="Scale-then-crop vs crop-then-scale")
+    resize_parser.add_argument("--frames", type=int, default=150)
+
+    parallel_parser = subparsers.add_parser("parallel", help="Serial vs segment-parallel encoding")
+    parallel_parser.add_argument("--duration", type=float, default=120.0)
+    parallel_parser.add_argument("--workers", type=int, default=config.PARALLEL_WORKERS)
+
+    backends_parser = subparsers.add_parser("backends", help="moviepy vs ffmpeg render backend")
+    backends_parser.add_argument("--duration", type=float, default=30.0)
+    backends_parser.add_argument("--profile", default=DEFAULT_PROFILE, choices=list(config.ENCODER_PROFILES))
+
+    discovery_parser = subparsers.add_parser("discovery", help="Serial vs concurrent subreddit discovery")
+    discovery_parser.add_argument("--subreddits", type=int, default=100)
+    discovery_parser.add_argument("--latency", type=float, default=0.1)
+    discovery_parser.add_argument("--workers", type=int, default=config.DISCOVERY_WORKERS)
+    discovery_parser.add_argument("--chunk-size", type=int, default=config.MULTIREDDIT_CHUNK_SIZE)
+
+    render_parser = subparsers.add_parser("_render")
+    render_parser.add_argument("backend", choices=list(BACKENDS))
+    render_parser.add_argument("source", type=Path)
+    render_parser.add_argument("dest", type=Path)
+    render_parser.add_argument("duration", type=float)
+    render_parser.add_argument("--profile", default=DEFAULT_PROFILE)
+
+    args = parser.parse_args()
+    if args.command == "pipeline":
+        bench_pipeline(args.duration, args.runs)
+    elif args.command == "resize":
+        bench_resize(args.frames)
+    elif args.command == "parallel":
+        bench_parallel(args.duration, args.workers)
+    elif args.command == "backends":
+        bench_backends(args.duration, args.profile)
+    elif args.command == "discovery":
+        bench_discovery(args.subreddits, args.latency, args.workers, args.chunk_size)
+    elif args.command == "_render":
+        render_once(args.backend, args.source, args.dest, args.duration, args.profile)
+
+if __name__ == "__main__":
+    main()
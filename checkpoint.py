@@ -0,0 +1,178 @@
+"""
+Per-submission checkpoints that let a failed workflow run resume.
+
+After every step that succeeds, the job and the steps completed so far are
+written to checkpoint.json in the job's scratch directory. A failed run keeps
+that directory, so the next run picks the job up at its first incomplete step,
+e.g. retrying only the YouTube upload of an already processed video instead
+of downloading, titling and transcoding it again.
+
+A run owns its job's directory through a lock file in it (see Job.claim), so
+runs sharing a scratch directory never resume or evict a job that is still
+being worked on.
+"""
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Collection, List, Optional
+
+import config
+import utils
+from job import Job
+from ledger import STATE_REJECTED, Ledger
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FILE_NAME = "checkpoint.json"
+
+class Checkpoint:
+    """Steps a job has completed, saved in its scratch directory."""
+
+    def __init__(self, job: Job, completed: Collection[str] = (), attempts: int = 1):
+        """
+        Initialize the checkpoint.
+
+        Args:
+            job: Job being checkpointed
+            completed: Steps the job has already completed
+            attempts: Number of runs that have worked on the job, this one included
+        """
+        self.job = job
+        self.completed: List[str] = list(completed)
+        self.attempts = attempts
+
+    @property
+    def path(self) -> Path:
+        """Checkpoint file in the job's scratch directory."""
+        return self.job.scratch_dir / CHECKPOINT_FILE_NAME
+
+    def save(self) -> bool:
+        """
+        Write the checkpoint, replacing the previous one atomically.
+
+        Returns:
+            True if the checkpoint was written, False otherwise
+        """
+        try:
+            utils.ensure_directory_exists(self.job.scratch_dir)
+            data = {
+                "job": self.job.to_dict(),
+                "completed": self.completed,
+                "attempts": self.attempts,
+                "saved_at": time.time(),
+            }
+            temp_path = self.path.with_suffix(".tmp")
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(data, file, indent=2)
+            os.replace(temp_path, self.path)
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to save checkpoint of {self.job.submission_id}: {str(e)}")
+            return False
+
+    def mark_completed(self, step: str) -> None:
+        """Record that a step succeeded and save the job's outputs so far."""
+        if step not in self.completed:
+            self.completed.append(step)
+        if self.job.submission_id:
+            self.save()
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["Checkpoint"]:
+        """
+        Read the checkpoint in a job's scratch directory.
+
+        Args:
+            directory: Scratch directory of a job
+
+        Returns:
+            The checkpoint, or None if there is none or it cannot be read
+        """
+        path = directory / CHECKPOINT_FILE_NAME
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            return cls(Job.from_dict(data["job"]), data.get("completed", []),
+                       data.get("attempts", 1))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable checkpoint {path}: {str(e)}")
+            return None
+
+def evict_stale_checkpoints(scratch_dir: Path = config.JOB_SCRATCH_DIR,
+                            max_age_hours: float = config.CHECKPOINT_MAX_AGE_HOURS,
+                            max_mb: float = config.CHECKPOINT_MAX_MB) -> int:
+    """
+    Delete job directories that are too old or exceed the disk budget.
+
+    Directories owned by a live run are kept.
+
+    Args:
+        scratch_dir: Directory holding one scratch directory per job
+        max_age_hours: Job directories untouched for longer than this are deleted
+        max_mb: Oldest job directories are deleted until the total is under this size
+
+    Returns:
+        Number of job directories deleted
+    """
+    return utils.evict_stale_directories(scratch_dir, max_age_hours, max_mb, "checkpoint")
+
+def find_resumable(scratch_dir: Path = config.JOB_SCRATCH_DIR,
+                   max_attempts: int = config.CHECKPOINT_MAX_ATTEMPTS) -> Optional[Checkpoint]:
+    """
+    Find the most recent checkpoint worth resuming and count the new attempt.
+
+    Stale checkpoints are evicted first. Jobs owned by another live run are
+    skipped. Jobs that were rejected or have failed max_attempts times are
+    abandoned and their directories deleted. The returned job is owned by
+    this run.
+
+    Args:
+        scratch_dir: Directory holding one scratch directory per job
+        max_attempts: Runs allowed to work on one job
+
+    Returns:
+        Checkpoint to resume, or None to start a new job
+    """
+    evict_stale_checkpoints(scratch_dir)
+    if not scratch_dir.exists():
+        return None
+
+    directories = []
+    for directory in scratch_dir.iterdir():
+        try:
+            directories.append(((directory / CHECKPOINT_FILE_NAME).stat().st_mtime, directory))
+        except OSError:
+            continue
+    directories.sort(reverse=True)
+
+    ledger = Ledger()
+    try:
+        for _, directory in directories:
+            owner = utils.DirectoryLock(directory)
+            if not owner.acquire():
+                logger.info(f"Skipping checkpoint of {directory.name}: another run owns it")
+                continue
+            checkpoint = Checkpoint.load(directory)
+            if checkpoint is None:
+                owner.release()
+                continue
+            job = checkpoint.job
+            job.owner = owner
+            row = ledger.get(job.submission_id)
+            if row is not None and row["state"] == STATE_REJECTED:
+                logger.info(f"Abandoning checkpoint of rejected submission {job.submission_id}")
+            elif checkpoint.attempts >= max_attempts:
+                logger.warning(f"Abandoning {job.submission_id} after {checkpoint.attempts} failed runs")
+            else:
+                checkpoint.attempts += 1
+                checkpoint.save()
+                return checkpoint
+            job.cleanup()
+    finally:
+        ledger.close()
+    return None
@@ -16,12 +16,23 @@ def _get_env_setting(name: str, *, required: bool = False, default: Optional[str
 BASE_DIR = Path('.')
 CHANNEL_VIDEOS_DIR = BASE_DIR / 'ChannelVideos'
 CLIPS_DIR = CHANNEL_VIDEOS_DIR / 'Clips'
+# Partial downloads live here, one directory per submission, so they survive
+# cleanup and a killed run can resume them
+DOWNLOAD_STAGING_DIR = BASE_DIR / 'DownloadStaging'
+# Each job works in its own subdirectory, keyed by submission ID; point this
+# at a fast filesystem such as a tmpfs mount (e.g. /dev/shm/subreddit2yt)
+JOB_SCRATCH_DIR = Path(os.getenv("JOB_SCRATCH_DIR", str(BASE_DIR / 'Jobs')))
 
 # Ensure directories exist
 os.makedirs(CHANNEL_VIDEOS_DIR, exist_ok=True)
 os.makedirs(CLIPS_DIR, exist_ok=True)
+os.makedirs(DOWNLOAD_STAGING_DIR, exist_ok=True)
 
 # File paths
+# Steps pass each video's metadata in memory (job.py); the title, description,
+# hashtag and submission ID files are only written for debugging when
+# JOB_DEBUG_FILES=1, and are read when a single step script is run by hand
+JOB_DEBUG_FILES = os.getenv("JOB_DEBUG_FILES", "0") == "1"
 VID_TITLE_FILE = BASE_DIR / "VidTitle.txt"
 FINAL_TITLE_FILE = BASE_DIR / "FinalTitle.txt"
 DOWNLOADED_IDS_FILE = BASE_DIR / "downloaded_ids.txt"
@@ -29,6 +40,12 @@ SUBREDDIT_LIST_FILE = BASE_DIR / "AllReddit.txt"
 DESC_FILE = BASE_DIR / "Desc.txt"
 HASHTAG_FILE = BASE_DIR / "hashtag.txt"
 YOUTUBE_VIDEO_IDS_FILE = BASE_DIR / "youtube_video_ids.txt"
+SUBMISSION_ID_FILE = BASE_DIR / "SubmissionId.txt"
+PROBE_CACHE_FILE = BASE_DIR / "probe_cache.json"
+# Submission ledger (replaces downloaded_ids.txt and youtube_video_ids.txt,
+# which are only read by "python ledger.py migrate")
+LEDGER_DB_FILE = BASE_DIR / "ledger.db"
+PROBE_CACHE_MAX_AGE_DAYS = 30
 
 # External tools configuration
 FFMPEG_PATH = r"D:\Downloads\compressed\ffmpeg\bin"
@@ -38,9 +55,35 @@ REDDIT_CLIENT_ID = _get_env_setting("REDDIT_CLIENT_ID", required=True)
 REDDIT_CLIENT_SECRET = _get_env_setting("REDDIT_CLIENT_SECRET", required=True)
 REDDIT_USER_AGENT = _get_env_setting(
     "REDDIT_USER_AGENT",
-    default="VideoDownloader/1.0 (by /u/"your reddit username")",
+    default="VideoDownloader/1.0 (by /u/your_reddit_username)",
 )
 
+# Subreddit discovery
+DISCOVERY_WORKERS = int(os.getenv("DISCOVERY_WORKERS", "8"))  # subreddits fetched at once
+REDDIT_REQUESTS_PER_MINUTE = 90  # Reddit allows 100 per minute for OAuth clients
+LISTING_LIMIT = 1  # submissions checked from each subreddit's daily top
+# Subreddits combined into one r/a+b+c listing request; 1 fetches each separately
+MULTIREDDIT_CHUNK_SIZE = int(os.getenv("MULTIREDDIT_CHUNK_SIZE", "50"))
+# 100-submission pages read from a combined listing before the subreddits that
+# busier ones crowded out of it are fetched again on their own
+MULTIREDDIT_MAX_PAGES = 3
+LISTING_CACHE_FILE = BASE_DIR / "listing_cache.json"
+LISTING_CACHE_TTL_MINUTES = 30  # cached listings newer than this are not re-fetched
+INVALID_SUBREDDIT_TTL_HOURS = 168  # missing/banned/private subreddits are retried after this
+EVALUATED_SUBMISSION_TTL_HOURS = 48  # evaluated posts are remembered for longer than the daily top lasts
+SUBREDDIT_STATS_FILE = BASE_DIR / "subreddit_stats.json"
+# Subreddits scanned per run, picked by the scheduler; 0 scans all of them
+DISCOVERY_SUBREDDITS_PER_RUN = int(os.getenv("DISCOVERY_SUBREDDITS_PER_RUN", "25"))
+SCHEDULER_REWARD = os.getenv("SCHEDULER_REWARD", "download")  # "download" or "publish"
+
+# Crosspost/repost detection
+DEDUP_INDEX_FILE = BASE_DIR / "dedup_index.db"
+DEDUP_TITLE_SIMILARITY = 0.8  # estimated Jaccard similarity of titles treated as a repost
+DEDUP_MIN_TITLE_CHARS = 12  # shorter titles are too generic to compare
+DEDUP_SHINGLE_SIZE = 4  # characters per title shingle
+DEDUP_MINHASH_BANDS = 8  # LSH bands; bands * rows is the signature length
+DEDUP_MINHASH_ROWS = 4
+
 # YouTube API configuration (set via environment variables)
 YOUTUBE_CLIENT_ID = _get_env_setting("YOUTUBE_CLIENT_ID", required=True)
 YOUTUBE_CLIENT_SECRET = _get_env_setting("YOUTUBE_CLIENT_SECRET", required=True)
@@ -55,7 +98,77 @@ INSTAGRAM_PASSWORD = _get_env_setting("INSTAGRAM_PASSWORD", required=True)
 INSTAGRAM_SESSION_FILE = BASE_DIR / "instagram_session.json"
 
 # Video processing settings
-MAX_VIDEO_DURATION = 120  # seconds
+MAX_VIDEO_DURATION = 120  # seconds kept in the Shorts output
 VIDEO_HEIGHT = 1920
 VIDEO_WIDTH = 1080
-VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.avi', '.mov')
\ No newline at end of file
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.avi', '.mov')
+MAX_DOWNLOAD_MB = 500  # candidates whose selected formats are larger are skipped
+# Largest upscale of the 9:16 crop region accepted when choosing a source format;
+# 1.35 lets 16:9 sources stop at 1440p and portrait ones at 1080x1920
+FORMAT_MAX_UPSCALE = 1.35
+
+# Download settings
+CONCURRENT_FRAGMENT_DOWNLOADS = int(os.getenv("CONCURRENT_FRAGMENT_DOWNLOADS", "4"))  # DASH/HLS
+STAGING_MAX_AGE_HOURS = 48  # partial downloads older than this are evicted
+STAGING_MAX_MB = 2048  # oldest partial downloads are evicted beyond this total
+# A failed run keeps its job's scratch directory with a checkpoint of the steps
+# it completed, and the next run resumes it from the first incomplete step
+CHECKPOINT_MAX_AGE_HOURS = 48  # job directories untouched for longer are evicted
+CHECKPOINT_MAX_MB = 4096  # oldest job directories are evicted beyond this total
+CHECKPOINT_MAX_ATTEMPTS = 3  # a job is abandoned after this many failed runs
+# Pipe downloads straight into the Shorts transcoder so download and encode
+# overlap, and stop downloading once MAX_VIDEO_DURATION is reached
+STREAMING_DOWNLOAD = os.getenv("STREAMING_DOWNLOAD", "0") == "1"
+# Renderer for re-encodes: "ffmpeg" (single native filter graph) or "moviepy"
+VIDEO_BACKEND = os.getenv("VIDEO_BACKEND", "ffmpeg")
+
+# libx264 encoder profiles, ordered from best quality to highest throughput
+ENCODER_PROFILES = {
+    "archive": {"preset": "slow", "crf": 18},
+    "balanced": {"preset": "medium", "crf": 21},
+    "fast": {"preset": "veryfast", "crf": 23},
+}
+# A profile name, or "auto" to pick the best profile that fits ENCODE_TIME_BUDGET
+ENCODER_PROFILE = os.getenv("ENCODER_PROFILE", "auto")
+ENCODER_THREADS = int(os.getenv("ENCODER_THREADS", "0"))  # 0 lets the encoder decide
+ENCODE_TIME_BUDGET = float(os.getenv("ENCODE_TIME_BUDGET", "180"))  # seconds per video
+ENCODER_CALIBRATION_FILE = BASE_DIR / "encoder_calibration.json"
+
+# Segment-parallel encoding: split long clips at keyframes and encode the
+# segments concurrently, then concatenate them without another re-encode
+PARALLEL_ENCODING = os.getenv("PARALLEL_ENCODING", "0") == "1"
+PARALLEL_WORKERS = int(os.getenv("PARALLEL_WORKERS", str(os.cpu_count() or 1)))
+PARALLEL_MIN_SEGMENT_SECONDS = 10  # seconds
+
+# Sampled-frame analysis run before encoding
+ANALYSIS_WORKERS = 4  # frame seeks decoded at once
+VIDEO_FINGERPRINT_FRAMES = 8  # frames hashed into the 64-bit-per-frame fingerprint
+# Clips within this many fingerprint bits of a published clip are rejected as duplicates
+VIDEO_FINGERPRINT_MAX_DISTANCE = 32
+# Low-value content gate: clips failing any threshold are rejected before encoding
+CONTENT_GATE = os.getenv("CONTENT_GATE", "1") == "1"
+ANALYSIS_SAMPLES = 16  # frames sampled across the clip
+ANALYSIS_FRAME_SIZE = 64  # sampled frames are scaled to this many pixels square
+ANALYSIS_AUDIO_RATE = 8000  # Hz, audio is downmixed to mono at this rate
+MIN_MOTION = 0.003  # mean luma change between samples (0-1); grainy stills measure ~0.002, slow pans ~0.004
+BLACK_FRAME_LUMA = 16  # frames with a lower mean luma (0-255) count as black
+MAX_BLACK_FRACTION = 0.5  # of sampled frames
+MIN_LOUDNESS_DB = -50.0  # RMS dBFS; clips without an audio track are not checked
+THUMBNAIL_CANDIDATES = 8  # keyframes scored when choosing the upload thumbnail
+
+# Which MAX_VIDEO_DURATION seconds of a longer clip are kept: "start" keeps the
+# beginning, "best" keeps the window with the most motion and audio energy
+TRIM_MODE = os.getenv("TRIM_MODE", "start")
+# Longest source downloaded when TRIM_MODE is "best", so that there is a window
+# to choose from; otherwise sources longer than MAX_VIDEO_DURATION are skipped
+MAX_SOURCE_DURATION = int(os.getenv("MAX_SOURCE_DURATION", "600"))
+TRIM_PROXY_FPS = 2  # activity samples per second of the clip
+TRIM_PROXY_SIZE = 32  # proxy frames are scaled to this many pixels square
+TRIM_KEYFRAME_GAP = 2.0  # seconds; with keyframes at most this far apart only keyframes are decoded
+TRIM_DECODE_THREADS = 2  # decoder threads for the proxy, leaving the other cores to encodes
+TRIM_AUDIO_WEIGHT = 0.5  # share of the activity score taken from audio energy
+
+# Batch mode (python main.py --batch N): worker threads per pipeline stage,
+# and how many videos may wait between two stages
+PIPELINE_WORKERS = {"download": 2, "title": 2, "transcode": 1, "upload": 1}
+PIPELINE_QUEUE_SIZE = 2
@@ -0,0 +1,316 @@
+"""
+Pre-download duplicate detection for crossposts and reposts.
+
+Each downloaded submission is indexed by three keys: its normalized media URL,
+its Reddit ID (which crossposts reference as crosspost_parent), and a MinHash
+signature of its title bucketed with locality-sensitive hashing. Candidates
+are checked against the index before anything is probed or downloaded.
+
+Processed clips also get a perceptual video fingerprint. Fingerprints of
+published clips are kept in a multi-index hash: each fingerprint is split into
+max_distance + 1 chunks, and by the pigeonhole principle any fingerprint within
+max_distance bits matches at least one chunk exactly, so near-duplicates are
+found with indexed lookups and verified by their full Hamming distance.
+"""
+import hashlib
+import logging
+import re
+import sqlite3
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import config
+from media_analysis import hamming_distance
+from reddit_discovery import Candidate
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Universal hashing (a * x + b) mod p over 32-bit shingle hashes
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media_keys (
+    media_key TEXT PRIMARY KEY,
+    submission_id TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS title_signatures (
+    submission_id TEXT PRIMARY KEY,
+    signature BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS title_bands (
+    band_key INTEGER NOT NULL,
+    submission_id TEXT NOT NULL,
+    PRIMARY KEY (band_key, submission_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS video_fingerprints (
+    submission_id TEXT PRIMARY KEY,
+    fingerprint BLOB NOT NULL,
+    published INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS fingerprint_chunks (
+    chunk_key INTEGER NOT NULL,
+    submission_id TEXT NOT NULL,
+    PRIMARY KEY (chunk_key, submission_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS fingerprint_chunks_submission ON fingerprint_chunks (submission_id);
+"""
+
+def _permutations(count: int) -> List[tuple]:
+    """Derive deterministic (a, b) coefficients for the MinHash permutations."""
+    permutations = []
+    for index in range(count):
+        digest = hashlib.blake2b(f"minhash-{index}".encode(), digest_size=16).digest()
+        a, b = struct.unpack("<QQ", digest)
+        permutations.append((a % (MERSENNE_PRIME - 1) + 1, b % MERSENNE_PRIME))
+    return permutations
+
+PERMUTATIONS = _permutations(config.DEDUP_MINHASH_BANDS * config.DEDUP_MINHASH_ROWS)
+
+def normalize_media_url(url: str) -> str:
+    """
+    Reduce a media URL to a key shared by every link to the same video.
+
+    Args:
+        url: Media URL of a candidate
+
+    Returns:
+        "youtube:<id>" or "vreddit:<id>" for known hosts, otherwise the
+        lower-cased host and path without query string or trailing slash
+    """
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower().split(":")[0]
+    for prefix in ("www.", "m.", "old.", "new."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    path = parsed.path.rstrip("/")
+
+    if host == "youtu.be" and path:
+        return f"youtube:{path.lstrip('/')}"
+    if host.endswith("youtube.com"):
+        video_id = parse_qs(parsed.query).get("v", [""])[0]
+        match = re.match(r"^/(?:shorts|embed|live)/([^/]+)", path)
+        if match:
+            video_id = match.group(1)
+        if video_id:
+            return f"youtube:{video_id}"
+    if host == "v.redd.it" and path:
+        return f"vreddit:{path.lstrip('/').split('/')[0]}"
+    return f"{host}{path}"
+
+def normalize_title(title: str) -> str:
+    """Lower-case a title and strip everything but letters, digits and single spaces."""
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", title.lower()).split())
+
+def title_signature(title: str) -> Optional[List[int]]:
+    """
+    Compute the MinHash signature of a title's character shingles.
+
+    Args:
+        title: Submission title
+
+    Returns:
+        List of minimum hash values, or None if the title is too short to compare
+    """
+    text = normalize_title(title)
+    if len(text) < config.DEDUP_MIN_TITLE_CHARS:
+        return None
+    size = config.DEDUP_SHINGLE_SIZE
+    shingles = {zlib.crc32(text[i:i + size].encode()) for i in range(len(text) - size + 1)}
+    return [
+        min(((a * shingle + b) % MERSENNE_PRIME) & MAX_HASH for shingle in shingles)
+        for a, b in PERMUTATIONS
+    ]
+
+def estimated_similarity(first: List[int], second: List[int]) -> float:
+    """Estimate the Jaccard similarity of two titles from their signatures."""
+    return sum(x == y for x, y in zip(first, second)) / len(first)
+
+def _band_keys(signature: List[int]) -> List[int]:
+    """Hash each LSH band of a signature to a signed 64-bit bucket key."""
+    rows = config.DEDUP_MINHASH_ROWS
+    keys = []
+    for band in range(config.DEDUP_MINHASH_BANDS):
+        values = signature[band * rows:(band + 1) * rows]
+        digest = hashlib.blake2b(struct.pack(f"<B{rows}I", band, *values), digest_size=8).digest()
+        keys.append(struct.unpack("<q", digest)[0])
+    return keys
+
+def _fingerprint_chunk_keys(fingerprint: int) -> List[int]:
+    """Split a fingerprint into max_distance + 1 chunks keyed by position and value."""
+    total_bits = config.VIDEO_FINGERPRINT_FRAMES * 64
+    chunks = config.VIDEO_FINGERPRINT_MAX_DISTANCE + 1
+    bounds = [index * total_bits // chunks for index in range(chunks + 1)]
+    return [
+        (index << 32) | ((fingerprint >> bounds[index]) & ((1 << (bounds[index + 1] - bounds[index])) - 1))
+        for index in range(chunks)
+    ]
+
+def _reddit_key(submission_id: str) -> str:
+    """Media key that links a submission to its crossposts."""
+    return f"reddit:{submission_id.split('_', 1)[-1]}"
+
+class DedupIndex:
+    """SQLite-backed index of downloaded and processed submissions for duplicate detection."""
+
+    def __init__(self, path: Path = config.DEDUP_INDEX_FILE,
+                 similarity: float = config.DEDUP_TITLE_SIMILARITY):
+        """
+        Open the index, creating it if needed.
+
+        Args:
+            path: SQLite database file
+            similarity: Estimated title similarity at which a candidate is a repost
+        """
+        self.path = path
+        self.similarity = similarity
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self.connection.close()
+
+    def _lookup_media(self, media_key: str) -> Optional[str]:
+        """Return the submission indexed under a media key, if any."""
+        row = self.connection.execute(
+            "SELECT submission_id FROM media_keys WHERE media_key = ?", (media_key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def find_duplicate(self, candidate: Candidate) -> Optional[str]:
+        """
+        Check whether a candidate is likely a copy of an indexed submission.
+
+        Args:
+            candidate: Candidate to check
+
+        Returns:
+            Reason naming the matching submission, or None if no duplicate was found
+        """
+        with self.lock:
+            match = self._lookup_media(normalize_media_url(candidate.media_url))
+            if match and match != candidate.submission_id:
+                return f"same media as {match}"
+
+            if candidate.crosspost_parent:
+                match = self._lookup_media(_reddit_key(candidate.crosspost_parent))
+                if match:
+                    return f"crosspost of {match}"
+
+            signature = title_signature(candidate.title)
+            if signature is None:
+                return None
+            band_keys = _band_keys(signature)
+            rows = self.connection.execute(
+                "SELECT DISTINCT s.submission_id, s.signature FROM title_bands b "
+                "JOIN title_signatures s ON s.submission_id = b.submission_id "
+                f"WHERE b.band_key IN ({', '.join('?' for _ in band_keys)})",
+                band_keys,
+            ).fetchall()
+
+        for submission_id, blob in rows:
+            if submission_id == candidate.submission_id:
+                continue
+            stored = list(struct.unpack(f"<{len(blob) // 4}I", blob))
+            if len(stored) != len(signature):
+                continue
+            similarity = estimated_similarity(signature, stored)
+            if similarity >= self.similarity:
+                return f"title {similarity:.0%} similar to {submission_id}"
+        return None
+
+    def add(self, candidate: Candidate) -> None:
+        """
+        Index a downloaded candidate so later copies of it are detected.
+
+        Args:
+            candidate: Candidate that was downloaded
+        """
+        media_keys = [normalize_media_url(candidate.media_url), _reddit_key(candidate.submission_id)]
+        if candidate.crosspost_parent:
+            media_keys.append(_reddit_key(candidate.crosspost_parent))
+        signature = title_signature(candidate.title)
+
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO media_keys (media_key, submission_id) VALUES (?, ?)",
+                [(key, candidate.submission_id) for key in media_keys],
+            )
+            if signature is not None:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO title_signatures (submission_id, signature) VALUES (?, ?)",
+                    (candidate.submission_id, struct.pack(f"<{len(signature)}I", *signature)),
+                )
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO title_bands (band_key, submission_id) VALUES (?, ?)",
+                    [(key, candidate.submission_id) for key in _band_keys(signature)],
+                )
+
+    def find_similar_video(self, fingerprint: int,
+                           exclude: Optional[str] = None) -> Optional[Tuple[str, int]]:
+        """
+        Find a published clip whose fingerprint is within the configured distance.
+
+        Args:
+            fingerprint: Perceptual fingerprint of the clip being processed
+            exclude: Submission ID to ignore (the clip itself)
+
+        Returns:
+            (submission ID, Hamming distance) of the closest match, or None
+        """
+        chunk_keys = _fingerprint_chunk_keys(fingerprint)
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT DISTINCT f.submission_id, f.fingerprint FROM fingerprint_chunks c "
+                "JOIN video_fingerprints f ON f.submission_id = c.submission_id "
+                f"WHERE c.chunk_key IN ({', '.join('?' for _ in chunk_keys)}) AND f.published = 1",
+                chunk_keys,
+            ).fetchall()
+
+        best = None
+        for submission_id, blob in rows:
+            if submission_id == exclude:
+                continue
+            distance = hamming_distance(fingerprint, int.from_bytes(blob, "big"))
+            if distance <= config.VIDEO_FINGERPRINT_MAX_DISTANCE and (best is None or distance < best[1]):
+                best = (submission_id, distance)
+        return best
+
+    def add_video(self, submission_id: str, fingerprint: int) -> None:
+        """
+        Store the fingerprint of a processed clip until it is published.
+
+        Args:
+            submission_id: Reddit submission ID of the clip
+            fingerprint: Perceptual fingerprint of the clip
+        """
+        blob = fingerprint.to_bytes(config.VIDEO_FINGERPRINT_FRAMES * 8, "big")
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO video_fingerprints (submission_id, fingerprint) VALUES (?, ?) "
+                "ON CONFLICT (submission_id) DO UPDATE SET fingerprint = excluded.fingerprint",
+                (submission_id, blob),
+            )
+            self.connection.execute("DELETE FROM fingerprint_chunks WHERE submission_id = ?",
+                                    (submission_id,))
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO fingerprint_chunks (chunk_key, submission_id) VALUES (?, ?)",
+                [(key, submission_id) for key in _fingerprint_chunk_keys(fingerprint)],
+            )
+
+    def mark_published(self, submission_id: str) -> None:
+        """Make a processed clip's fingerprint count against future clips."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                "UPDATE video_fingerprints SET published = 1 WHERE submission_id = ?", (submission_id,)
+            )
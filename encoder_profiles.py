@@ -0,0 +1,180 @@
+"""
+Named libx264 encoder profiles and throughput-aware profile selection.
+
+Usage:
+    python encoder_profiles.py calibrate [--duration SECONDS]
+    python encoder_profiles.py show
+"""
+import argparse
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import config
+import ffmpeg_utils
+import utils
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Profile used when the configured one is unknown or no calibration exists
+DEFAULT_PROFILE = "balanced"
+
+@dataclass
+class EncoderProfile:
+    """A named set of libx264 encoder settings."""
+    name: str
+    preset: str
+    crf: int
+    threads: int = 0
+
+    def ffmpeg_args(self) -> List[str]:
+        """Return the ffmpeg output options for this profile."""
+        args = ["-preset", self.preset, "-crf", str(self.crf)]
+        if self.threads:
+            args += ["-threads", str(self.threads)]
+        return args
+
+def get_profiles() -> List[EncoderProfile]:
+    """
+    Get the configured profiles, best quality first.
+
+    Returns:
+        List of EncoderProfile objects in config.ENCODER_PROFILES order
+    """
+    return [
+        EncoderProfile(name, settings["preset"], settings["crf"], config.ENCODER_THREADS)
+        for name, settings in config.ENCODER_PROFILES.items()
+    ]
+
+def get_profile(name: str) -> EncoderProfile:
+    """
+    Look up a profile by name, falling back to the default profile.
+
+    Args:
+        name: Profile name from config.ENCODER_PROFILES
+
+    Returns:
+        The matching EncoderProfile
+    """
+    profiles = {profile.name: profile for profile in get_profiles()}
+    if name not in profiles:
+        logger.warning(f"Unknown encoder profile '{name}', using '{DEFAULT_PROFILE}'")
+        name = DEFAULT_PROFILE
+    return profiles[name]
+
+def load_calibration() -> Dict[str, float]:
+    """
+    Load measured encode throughput per profile.
+
+    Returns:
+        Mapping of profile name to frames per second, empty if not calibrated
+    """
+    content = utils.read_file_content(config.ENCODER_CALIBRATION_FILE)
+    if not content:
+        return {}
+    try:
+        return json.loads(content).get("fps", {})
+    except ValueError as e:
+        logger.error(f"Invalid calibration file {config.ENCODER_CALIBRATION_FILE}: {e}")
+        return {}
+
+def select_profile(frame_count: float, budget_seconds: float = config.ENCODE_TIME_BUDGET,
+                   calibration: Optional[Dict[str, float]] = None) -> EncoderProfile:
+    """
+    Pick the best-quality profile expected to encode a video within the time budget.
+
+    Args:
+        frame_count: Number of frames in the output video
+        budget_seconds: Time allowed for encoding the video
+        calibration: Measured fps per profile (loaded from disk when None)
+
+    Returns:
+        The chosen profile; the fastest one if none fits the budget
+    """
+    calibration = load_calibration() if calibration is None else calibration
+    if not calibration:
+        logger.warning("Encoder profiles are not calibrated; run 'python encoder_profiles.py calibrate'")
+        return get_profile(DEFAULT_PROFILE)
+
+    profiles = [profile for profile in get_profiles() if calibration.get(profile.name)]
+    for profile in profiles:
+        expected_seconds = frame_count / calibration[profile.name]
+        if expected_seconds <= budget_seconds:
+            logger.info(f"Encoder profile '{profile.name}': ~{expected_seconds:.0f}s expected "
+                        f"for {frame_count:.0f} frames (budget {budget_seconds:.0f}s)")
+            return profile
+
+    fastest = max(profiles, key=lambda profile: calibration[profile.name])
+    logger.warning(f"No encoder profile fits the {budget_seconds:.0f}s budget, "
+                   f"using fastest profile '{fastest.name}'")
+    return fastest
+
+def resolve_profile(name: str, frame_count: float,
+                    budget_seconds: float = config.ENCODE_TIME_BUDGET) -> EncoderProfile:
+    """
+    Resolve a configured profile setting for one video.
+
+    Args:
+        name: Profile name, or "auto" to select by calibrated throughput
+        frame_count: Number of frames in the output video
+        budget_seconds: Time allowed for encoding the video in "auto" mode
+
+    Returns:
+        The profile to encode the video with
+    """
+    if name != "auto":
+        return get_profile(name)
+    return select_profile(frame_count, budget_seconds)
+
+def calibrate(duration: float = 10.0, fps: int = 30) -> Dict[str, float]:
+    """
+    Measure encode throughput of every profile on this machine and save it.
+
+    A synthetic 1920x1080 source is cropped and scaled to the Shorts size and
+    encoded to a null muxer, so the measurement covers the same filter graph
+    and encoder work as a real run without touching the disk.
+
+    Args:
+        duration: Length of the synthetic source in seconds
+        fps: Frame rate of the synthetic source
+
+    Returns:
+        Mapping of profile name to measured frames per second
+    """
+    window = utils.compute_crop_window(1920, 1080)
+    results = {}
+    for profile in get_profiles():
+        start = time.perf_counter()
+        ffmpeg_utils.run_ffmpeg([
+            "-f", "lavfi", "-i", f"testsrc2=size=1920x1080:rate={fps}:duration={duration}",
+            "-vf", window.to_ffmpeg_filter(),
+            "-c:v", "libx264", "-pix_fmt", "yuv420p", *profile.ffmpeg_args(),
+            "-f", "null", "-",
+        ])
+        results[profile.name] = duration * fps / (time.perf_counter() - start)
+        logger.info(f"Profile '{profile.name}': {results[profile.name]:.1f} fps")
+
+    utils.write_file_content(config.ENCODER_CALIBRATION_FILE,
+                             json.dumps({"calibrated_at": time.time(), "fps": results}, indent=2))
+    return results
+
+def main() -> None:
+    """Parse command-line arguments and run the selected command."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    calibrate_parser = subparsers.add_parser("calibrate", help="Measure encode fps per profile")
+    calibrate_parser.add_argument("--duration", type=float, default=10.0)
+    subparsers.add_parser("show", help="Show profiles and calibration results")
+
+    args = parser.parse_args()
+    calibration = calibrate(args.duration) if args.command == "calibrate" else load_calibration()
+    for profile in get_profiles():
+        fps = calibration.get(profile.name)
+        measured = f"{fps:.1f} fps" if fps else "not calibrated"
+        print(f"{profile.name:>10}: preset={profile.preset} crf={profile.crf}  {measured}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Thin wrappers around the ffmpeg command-line tools used by the processing pipeline.
+"""
+import json
+import logging
+import shutil
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import config
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+@dataclass
+class MediaInfo:
+    """Container, stream and duration details reported by ffprobe."""
+    format_name: str
+    duration: float
+    video_codec: Optional[str] = None
+    width: int = 0
+    height: int = 0
+    pix_fmt: Optional[str] = None
+    frame_rate: float = 0.0
+    audio_codec: Optional[str] = None
+
+def get_executable(name: str = "ffmpeg") -> str:
+    """
+    Resolve the path of an ffmpeg tool, preferring the configured FFMPEG_PATH.
+
+    Args:
+        name: Name of the tool ("ffmpeg" or "ffprobe")
+
+    Returns:
+        Path to the executable, or the bare name so the OS PATH is searched
+    """
+    ffmpeg_dir = Path(config.FFMPEG_PATH)
+    for candidate in (ffmpeg_dir / name, ffmpeg_dir / f"{name}.exe"):
+        if candidate.is_file():
+            return str(candidate)
+    return shutil.which(name) or name
+
+def run_ffmpeg(args: Sequence[str], tool: str = "ffmpeg") -> subprocess.CompletedProcess:
+    """
+    Run an ffmpeg tool with quiet logging and raise if it fails.
+
+    Args:
+        args: Command-line arguments passed after the executable
+        tool: Name of the tool to run ("ffmpeg" or "ffprobe")
+
+    Returns:
+        The completed process with captured stdout and stderr
+
+    Raises:
+        RuntimeError: If the tool exits with a non-zero status
+    """
+    command = [get_executable(tool), "-hide_banner", "-loglevel", "error", *args]
+    logger.debug(f"Running: {' '.join(command)}")
+    result = subprocess.run(command, capture_output=True)
+    if result.returncode != 0:
+        stderr = result.stderr.decode("utf-8", errors="replace").strip()
+        raise RuntimeError(f"{tool} exited with code {result.returncode}: {stderr}")
+    return result
+
+def stream_copy_trim(src: Path, dest: Path, duration: float, start: float = 0.0) -> None:
+    """
+    Trim a media file without re-encoding by copying its streams.
+
+    Args:
+        src: Source media file
+        dest: Destination file (overwritten if it exists)
+        duration: Length of the trimmed output in seconds
+        start: Offset into the source in seconds
+    """
+    run_ffmpeg([
+        "-y",
+        "-ss", f"{start:.3f}",
+        "-i", str(src),
+        "-t", f"{duration:.3f}",
+        "-map", "0",
+        "-c", "copy",
+        "-avoid_negative_ts", "make_zero",
+        "-movflags", "+faststart",
+        str(dest),
+    ])
+
+def _parse_rate(rate: Optional[str]) -> float:
+    """Convert an ffprobe rational such as "30000/1001" to a float."""
+    try:
+        numerator, _, denominator = (rate or "0/1").partition("/")
+        return float(numerator) / float(denominator or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+def probe_media(path: Path) -> Optional[MediaInfo]:
+    """
+    Inspect a media file with ffprobe.
+
+    Args:
+        path: Media file to inspect
+
+    Returns:
+        MediaInfo for the first video and audio streams, or None if probing failed
+    """
+    try:
+        result = run_ffmpeg([
+            "-print_format", "json",
+            "-show_format",
+            "-show_streams",
+            str(path),
+        ], tool="ffprobe")
+        data = json.loads(result.stdout)
+    except Exception as e:
+        logger.warning(f"Could not probe {path}: {e}")
+        return None
+
+    fmt = data.get("format", {})
+    info = MediaInfo(format_name=fmt.get("format_name", ""),
+                     duration=float(fmt.get("duration") or 0.0))
+    for stream in data.get("streams", []):
+        codec_type = stream.get("codec_type")
+        if codec_type == "video" and info.video_codec is None:
+            info.video_codec = stream.get("codec_name")
+            info.width = int(stream.get("width") or 0)
+            info.height = int(stream.get("height") or 0)
+            info.pix_fmt = stream.get("pix_fmt")
+            info.frame_rate = _parse_rate(stream.get("avg_frame_rate"))
+        elif codec_type == "audio" and info.audio_codec is None:
+            info.audio_codec = stream.get("codec_name")
+    return info
+
+def keyframe_times(path: Path) -> List[float]:
+    """
+    List the timestamps of the video keyframes of a file.
+
+    Only packet headers are read, so nothing is decoded.
+
+    Args:
+        path: Media file to inspect
+
+    Returns:
+        Keyframe timestamps in seconds from the start of the stream, in ascending order
+    """
+    result = run_ffmpeg([
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags",
+        "-of", "csv=p=0",
+        str(path),
+    ], tool="ffprobe")
+    packets = []
+    for line in result.stdout.decode("utf-8", errors="replace").splitlines():
+        pts_time, _, flags = line.partition(",")
+        if pts_time not in ("", "N/A"):
+            packets.append((float(pts_time), "K" in flags))
+    if not packets:
+        return []
+    # Seeks are relative to the start of the stream, not to its first timestamp
+    first = min(pts for pts, _ in packets)
+    return sorted(pts - first for pts, keyframe in packets if keyframe)
+
+def transcode(src: Path, dest: Path, duration: float, video_filter: Optional[str] = None,
+              encode_audio: bool = True, include_audio: bool = True,
+              threads: Optional[int] = None, encoder_args: Sequence[str] = (),
+              start: float = 0.0) -> None:
+    """
+    Write the first video and audio streams of a file, re-encoding only what is asked for.
+
+    Args:
+        src: Source media file
+        dest: Destination MP4 file (overwritten if it exists)
+        duration: Maximum output duration in seconds
+        video_filter: ffmpeg filter chain for the video; the video stream is
+            copied when this is None
+        encode_audio: Re-encode audio to AAC if True, otherwise copy it
+        include_audio: Drop the audio stream entirely if False
+        threads: Encoder thread count, overriding encoder_args (ffmpeg picks one when None)
+        encoder_args: Extra libx264 options such as preset and CRF
+        start: Offset into the source in seconds
+    """
+    args = ["-y", "-ss", f"{start:.3f}", "-i", str(src), "-t", f"{duration:.3f}", "-map", "0:v:0"]
+    if video_filter:
+        args += ["-vf", video_filter, "-c:v", "libx264", "-pix_fmt", "yuv420p", *encoder_args]
+        if threads:
+            args += ["-threads", str(threads)]
+    else:
+        args += ["-c:v", "copy"]
+    if include_audio:
+        args += ["-map", "0:a:0?"]
+        args += ["-c:a", "aac"] if encode_audio else ["-c:a", "copy"]
+    args += ["-movflags", "+faststart", str(dest)]
+    run_ffmpeg(args)
+
+def split_at_keyframes(src: Path, out_dir: Path, duration: float,
+                       segment_seconds: float, start: float = 0.0) -> List[Path]:
+    """
+    Split the video stream of a file into segments without re-encoding.
+
+    Each segment starts on a keyframe, so segments are at least
+    segment_seconds long except for the last one.
+
+    Args:
+        src: Source media file
+        out_dir: Directory receiving the segments
+        duration: Length of the source to split, in seconds
+        segment_seconds: Target segment length in seconds
+        start: Offset into the source in seconds; should be a keyframe so the
+            first segment starts exactly there
+
+    Returns:
+        Segment files in playback order
+    """
+    run_ffmpeg([
+        "-y",
+        "-ss", f"{start:.3f}",
+        "-i", str(src),
+        "-t", f"{duration:.3f}",
+        "-map", "0:v:0",
+        "-c", "copy",
+        "-f", "segment",
+        "-segment_time", f"{segment_seconds:.3f}",
+        "-reset_timestamps", "1",
+        str(out_dir / "segment_%04d.mp4"),
+    ])
+    return sorted(out_dir.glob("segment_*.mp4"))
+
+def concat_segments(segments: Sequence[Path], audio_src: Path, dest: Path, duration: float,
+                    encode_audio: bool = True, audio_start: float = 0.0) -> None:
+    """
+    Join encoded video segments with stream copy and add the source audio.
+
+    Args:
+        segments: Encoded video-only segments in playback order
+        audio_src: File providing the audio track
+        dest: Destination MP4 file (overwritten if it exists)
+        duration: Maximum output duration in seconds
+        encode_audio: Re-encode audio to AAC if True, otherwise copy it
+        audio_start: Offset into audio_src where the audio track begins
+    """
+    list_file = dest.parent / f"{dest.stem}_segments.txt"
+    lines = [f"file '{segment.resolve().as_posix()}'" for segment in segments]
+    list_file.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    try:
+        run_ffmpeg([
+            "-y",
+            "-f", "concat", "-safe", "0", "-i", str(list_file),
+            "-ss", f"{audio_start:.3f}",
+            "-i", str(audio_src),
+            "-t", f"{duration:.3f}",
+            "-map", "0:v:0",
+            "-map", "1:a:0?",
+            "-c:v", "copy",
+            "-c:a", "aac" if encode_audio else "copy",
+            "-movflags", "+faststart",
+            str(dest),
+        ])
+    finally:
+        list_file.unlink(missing_ok=True)
+
+def stream_transcode(inputs: Sequence[Tuple[str, Dict[str, str]]], dest: Path, duration: float,
+                     video_filter: str, encoder_args: Sequence[str] = ()) -> None:
+    """
+    Transcode remote media straight from its URLs while it downloads.
+
+    ffmpeg reads the inputs progressively and stops reading once duration
+    seconds have been written, so nothing past the trim point is fetched.
+
+    Args:
+        inputs: (url, http_headers) pairs; the first carries the video and the
+            last carries the audio (they may be the same muxed stream)
+        dest: Destination MP4 file (overwritten if it exists)
+        duration: Maximum output duration in seconds
+        video_filter: ffmpeg filter chain for the video
+        encoder_args: Extra libx264 options such as preset and CRF
+    """
+    args = ["-y"]
+    for url, headers in inputs:
+        if headers:
+            args += ["-headers", "".join(f"{key}: {value}\r\n" for key, value in headers.items())]
+        args += ["-i", url]
+    args += [
+        "-t", f"{duration:.3f}",
+        "-map", "0:v:0",
+        "-map", f"{len(inputs) - 1}:a:0?",
+        "-vf", video_filter,
+        "-c:v", "libx264", "-pix_fmt", "yuv420p", *encoder_args,
+        "-c:a", "aac",
+        "-movflags", "+faststart",
+        str(dest),
+    ]
+    run_ffmpeg(args)
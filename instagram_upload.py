@@ -1,17 +1,10 @@
 from instagrapi import Client
-import glob
 from pathlib import Path
 
 import config
-
-def read_file_content(filename):
-    """Read and return the content of a file."""
-    try:
-        with open(filename, 'r', encoding='utf-8') as file:
-            return file.read().strip()
-    except FileNotFoundError:
-        print(f"Warning: {filename} not found")
-        return ""
+import utils
+from job import Job
+from ledger import Ledger
 
 def _initialize_client() -> Client:
     """Initialize Instagram client loading cached session if available."""
@@ -26,65 +19,94 @@ def _initialize_client() -> Client:
     return cl
 
 
-def upload_video_to_instagram():
-    """Upload video to Instagram with caption and hashtags.
-    
+def _record_upload(media, submission_id: str) -> None:
+    """Link the uploaded Instagram media ID to its source submission in the ledger."""
+    if not submission_id:
+        print("Warning: No submission ID found for uploaded video")
+        return
+    try:
+        ledger = Ledger()
+        try:
+            ledger.record_instagram(submission_id, str(media.pk))
+        finally:
+            ledger.close()
+    except Exception as e:
+        print(f"Warning: Failed to record Instagram media ID in ledger: {e}")
+
+
+def login() -> Client:
+    """Create an Instagram client and log in with the configured credentials."""
+    cl = _initialize_client()
+    print("Logging in to Instagram...")
+    cl.login(config.INSTAGRAM_USERNAME, config.INSTAGRAM_PASSWORD)
+    print("Login successful")
+    return cl
+
+
+def upload_clip(cl: Client, video_file, caption: str, hashtags: str, submission_id: str) -> bool:
+    """Upload one video as a clip with its caption and hashtags.
+
     Returns:
         bool: True if upload was successful, False otherwise
     """
-    # Instagram credentials sourced from environment variables
-    username = config.INSTAGRAM_USERNAME
-    password = config.INSTAGRAM_PASSWORD
+    # Format hashtags with line breaks for better compatibility
+    if " " in hashtags:
+        hashtag_list = hashtags.split()
+        hashtags = " ".join(hashtag_list)
+
+    full_caption = f"{caption}\n\n{hashtags}"
+    print(f"Uploading video: {video_file}")
 
-    # Initialize client
-    cl = _initialize_client()
-    
     try:
-        # Direct login
-        print("Logging in to Instagram...")
-        cl.login(username, password)
-        print("Login successful")
-
-        # Get video files
-        video_files = glob.glob("*.mp4")
-        if not video_files:
-            print("No video files found")
+        # Upload video with full caption
+        print("Attempting upload...")
+        # Pass the thumbnail from processing so instagrapi does not decode the video for one
+        thumbnail = utils.get_thumbnail_path(Path(video_file))
+        media = cl.clip_upload(Path(video_file), caption=full_caption,
+                               thumbnail=thumbnail if thumbnail.exists() else None)
+        if media:
+            print("Successfully uploaded video")
+            _record_upload(media, submission_id)
+            return True
+        else:
+            print("Upload failed: No media response")
             return False
 
-        video_file = video_files[0]
-        caption = read_file_content("FinalTitle.txt")
-        hashtags = read_file_content("hashtag.txt")
-        
-        # Format hashtags with line breaks for better compatibility
-        if " " in hashtags:
-            hashtag_list = hashtags.split()
-            hashtags = " ".join(hashtag_list)
+    except Exception as e:
+        print(f"Upload failed: {e}")
+        return False
 
-        full_caption = f"{caption}\n\n{hashtags}"
-        print(f"Uploading video: {video_file}")
 
-        try:
-            # Upload video with full caption
-            print("Attempting upload...")
-            media = cl.clip_upload(video_file, caption=full_caption)
-            if media:
-                print("Successfully uploaded video")
-                return True
-            else:
-                print("Upload failed: No media response")
-                return False
-        
-        except Exception as e:
-            print(f"Upload failed: {e}")
+def upload_video_to_instagram(job: Job):
+    """Upload a job's processed video to Instagram with caption and hashtags.
+    
+    Falls back to the Reddit title when no generated title is available.
+    
+    Args:
+        job (Job): Job of the processed video
+    
+    Returns:
+        bool: True if upload was successful, False otherwise
+    """
+    cl = None
+    try:
+        # Direct login with credentials sourced from environment variables
+        cl = login()
+
+        if job.video_file is None or not job.video_file.exists():
+            print("No video file found")
             return False
 
+        return upload_clip(cl, job.video_file, job.upload_title, job.hashtags, job.submission_id)
+
     except Exception as e:
         print(f"Error: {str(e)}")
         return False
     
     finally:
-        cl.logout()
-        print("Logged out of Instagram")
+        if cl is not None:
+            cl.logout()
+            print("Logged out of Instagram")
 
 if __name__ == "__main__":
-    upload_video_to_instagram()
\ No newline at end of file
+    upload_video_to_instagram(Job.from_debug_files())
\ No newline at end of file
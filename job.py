@@ -0,0 +1,220 @@
+"""
+In-memory record of one video moving through the workflow.
+
+Every step reads what it needs from the job and stores what it produces on
+it, so steps no longer hand data to each other through text files in the
+working directory. Each job's files live in its own scratch directory and
+are registered with the job, so cleaning up a job never touches another
+job's files.
+"""
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import config
+import utils
+from reddit_discovery import Candidate
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Deletes job files off the critical path; its thread is joined at interpreter exit
+_cleanup_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cleanup")
+
+class Job:
+    """Submission, file paths and metadata of one video, passed explicitly between steps."""
+
+    __slots__ = ("submission_id", "subreddit", "source_title", "candidate", "probe_info",
+                 "video_file", "title", "description", "hashtags", "youtube_id", "artifacts",
+                 "owner")
+
+    def __init__(self, submission_id: str = "", subreddit: str = "", source_title: str = "",
+                 candidate: Optional[Candidate] = None,
+                 probe_info: Optional[Dict[str, Any]] = None,
+                 video_file: Optional[Path] = None, title: str = "", description: str = "",
+                 hashtags: str = "", youtube_id: Optional[str] = None):
+        """
+        Initialize the job.
+
+        Args:
+            submission_id: Reddit submission ID of the video
+            subreddit: Subreddit the video was posted in
+            source_title: Title of the Reddit post
+            candidate: Discovery candidate the job was created from
+            probe_info: yt-dlp info dict from probing the candidate
+            video_file: Downloaded video, processed in place for Shorts
+            title: Generated title
+            description: Generated description
+            hashtags: Generated comma-separated hashtags
+            youtube_id: ID of the uploaded YouTube video
+        """
+        self.submission_id = submission_id
+        self.subreddit = subreddit
+        self.source_title = source_title
+        self.candidate = candidate
+        self.probe_info = probe_info
+        self.video_file = video_file
+        self.title = title
+        self.description = description
+        self.hashtags = hashtags
+        self.youtube_id = youtube_id
+        self.artifacts: List[Path] = []
+        self.owner: Optional[utils.DirectoryLock] = None
+
+    @classmethod
+    def from_candidate(cls, candidate: Candidate,
+                       probe_info: Optional[Dict[str, Any]] = None) -> "Job":
+        """Create the job of a discovered candidate."""
+        return cls(candidate.submission_id, candidate.subreddit, candidate.title,
+                   candidate=candidate, probe_info=probe_info)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Job":
+        """Rebuild a job saved with to_dict."""
+        job = cls(
+            submission_id=data["submission_id"],
+            subreddit=data.get("subreddit", ""),
+            source_title=data.get("source_title", ""),
+            candidate=Candidate(**data["candidate"]) if data.get("candidate") else None,
+            video_file=Path(data["video_file"]) if data.get("video_file") else None,
+            title=data.get("title", ""),
+            description=data.get("description", ""),
+            hashtags=data.get("hashtags", ""),
+            youtube_id=data.get("youtube_id"),
+        )
+        job.artifacts = [Path(path) for path in data.get("artifacts", [])]
+        return job
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Serialize the job to JSON-compatible values.
+
+        The probe info is left out: it is large and its media URLs expire, so
+        a resumed download probes again.
+        """
+        return {
+            "submission_id": self.submission_id,
+            "subreddit": self.subreddit,
+            "source_title": self.source_title,
+            "candidate": asdict(self.candidate) if self.candidate else None,
+            "video_file": str(self.video_file) if self.video_file else None,
+            "title": self.title,
+            "description": self.description,
+            "hashtags": self.hashtags,
+            "youtube_id": self.youtube_id,
+            "artifacts": [str(path) for path in self.artifacts],
+        }
+
+    @classmethod
+    def from_debug_files(cls) -> "Job":
+        """
+        Rebuild a job from the debug files and the newest video in its scratch
+        directory, for running a single step script by hand.
+
+        Returns:
+            Job with whatever the debug files contain
+        """
+        job = cls(
+            submission_id=utils.read_file_content(config.SUBMISSION_ID_FILE),
+            source_title=utils.read_file_content(config.VID_TITLE_FILE),
+            title=utils.read_file_content(config.FINAL_TITLE_FILE),
+            description=utils.read_file_content(config.DESC_FILE),
+            hashtags=utils.read_file_content(config.HASHTAG_FILE),
+        )
+        if job.submission_id and job.scratch_dir.exists():
+            job.video_file = utils.get_most_recent_video(job.scratch_dir)
+            if job.video_file is not None:
+                job.register_artifact(job.video_file)
+                job.register_artifact(utils.get_thumbnail_path(job.video_file))
+        return job
+
+    @property
+    def scratch_dir(self) -> Path:
+        """Directory holding the job's working files, keyed by its submission ID."""
+        if not self.submission_id:
+            raise ValueError("A job needs a submission ID before it has a scratch directory")
+        return config.JOB_SCRATCH_DIR / self.submission_id
+
+    @property
+    def upload_title(self) -> str:
+        """Generated title, or the Reddit title when none was generated."""
+        return self.title or self.source_title
+
+    def write_debug_files(self) -> None:
+        """Write the job's metadata to the legacy text files if JOB_DEBUG_FILES is set."""
+        if not config.JOB_DEBUG_FILES:
+            return
+        for file_path, content in ((config.SUBMISSION_ID_FILE, self.submission_id),
+                                   (config.VID_TITLE_FILE, self.source_title),
+                                   (config.FINAL_TITLE_FILE, self.title),
+                                   (config.DESC_FILE, self.description),
+                                   (config.HASHTAG_FILE, self.hashtags)):
+            utils.write_file_content(file_path, content)
+
+    def claim(self) -> bool:
+        """
+        Take ownership of the job's scratch directory, creating it if needed.
+        
+        While a run owns the directory no other run resumes, evicts or cleans
+        up the job. Ownership ends with cleanup or when the process exits.
+        
+        Returns:
+            True if this run owns the directory, False if another run does
+        """
+        if self.owner is None:
+            self.owner = utils.DirectoryLock(self.scratch_dir)
+        utils.ensure_directory_exists(self.scratch_dir)
+        if self.owner.acquire():
+            return True
+        logger.warning(f"Submission {self.submission_id} is owned by another run")
+        return False
+    
+    def register_artifact(self, path: Path) -> Path:
+        """Record a file the job created so that cleanup deletes it."""
+        self.artifacts.append(path)
+        return path
+
+    def cleanup(self) -> bool:
+        """
+        Delete the job's registered files and its scratch directory.
+
+        Nothing is deleted while another run owns the scratch directory.
+
+        Returns:
+            True if everything was deleted, False otherwise
+        """
+        has_directory = bool(self.submission_id) and self.scratch_dir.exists()
+        if has_directory and not self.claim():
+            return False
+        
+        success = True
+        for path in self.artifacts:
+            try:
+                if path.exists():
+                    path.unlink()
+                    logger.info(f"Deleted {path.name}")
+            except Exception as e:
+                success = False
+                logger.error(f"Error deleting file {path}: {e}")
+        self.artifacts.clear()
+
+        # Anything else left in the scratch directory, such as the temporary
+        # files of a failed encode, was also written by this job
+        if has_directory:
+            try:
+                self.owner.delete_directory()
+            except Exception as e:
+                success = False
+                logger.error(f"Error deleting scratch directory {self.scratch_dir}: {e}")
+        elif self.owner is not None:
+            self.owner.release()
+        return success
+
+    def cleanup_async(self) -> Future:
+        """Run cleanup in the background and return its future."""
+        return _cleanup_executor.submit(self.cleanup)
+
+    def __repr__(self) -> str:
+        return f"Job({self.submission_id!r}, video_file={self.video_file!r})"
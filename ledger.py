@@ -0,0 +1,210 @@
+"""
+Indexed SQLite ledger of every Reddit submission the workflow has handled.
+
+Replaces downloaded_ids.txt and youtube_video_ids.txt: each submission has one
+row recording its download, processing and publish state, looked up by its
+primary key without loading the whole history.
+
+Usage:
+    python ledger.py migrate
+    python ledger.py show SUBMISSION_ID
+"""
+import argparse
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import config
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Submission states, in workflow order
+STATE_DOWNLOADED = "downloaded"
+STATE_PROCESSED = "processed"
+STATE_PUBLISHED = "published"
+STATE_REJECTED = "rejected"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    submission_id TEXT PRIMARY KEY,
+    subreddit TEXT,
+    title TEXT,
+    state TEXT NOT NULL,
+    reason TEXT,
+    downloaded_at REAL,
+    processed_at REAL,
+    youtube_id TEXT,
+    youtube_at REAL,
+    instagram_id TEXT,
+    instagram_at REAL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS submissions_youtube_id ON submissions (youtube_id);
+CREATE TABLE IF NOT EXISTS legacy_youtube_uploads (
+    youtube_id TEXT PRIMARY KEY
+) WITHOUT ROWID;
+"""
+
+class Ledger:
+    """Thread-safe access to the submissions ledger."""
+
+    def __init__(self, path: Path = config.LEDGER_DB_FILE):
+        """
+        Open the ledger, creating it if needed.
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self.connection.row_factory = sqlite3.Row
+        with self.lock, self.connection:
+            # WAL lets readers proceed while a writer commits
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self.connection.close()
+
+    def _upsert(self, submission_id: str, **fields: Any) -> None:
+        """Insert a submission row or update the given fields of an existing one."""
+        fields["updated_at"] = time.time()
+        columns = ", ".join(fields)
+        placeholders = ", ".join("?" for _ in fields)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in fields)
+        with self.lock, self.connection:
+            self.connection.execute(
+                f"INSERT INTO submissions (submission_id, {columns}) VALUES (?, {placeholders}) "
+                f"ON CONFLICT (submission_id) DO UPDATE SET {updates}",
+                (submission_id, *fields.values()),
+            )
+
+    def has(self, submission_id: str) -> bool:
+        """Return True if the submission has been handled before."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM submissions WHERE submission_id = ?", (submission_id,)
+            ).fetchone()
+        return row is not None
+
+    def get(self, submission_id: str) -> Optional[Dict[str, Any]]:
+        """Return the ledger row of a submission, or None if unknown."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT * FROM submissions WHERE submission_id = ?", (submission_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def record_download(self, submission_id: str, subreddit: str = "", title: str = "") -> None:
+        """Record that a submission's video was downloaded."""
+        self._upsert(submission_id, subreddit=subreddit, title=title,
+                     state=STATE_DOWNLOADED, downloaded_at=time.time())
+
+    def record_processed(self, submission_id: str) -> None:
+        """Record that a submission's video was processed for Shorts."""
+        self._upsert(submission_id, state=STATE_PROCESSED, processed_at=time.time())
+
+    def record_youtube(self, submission_id: str, youtube_id: str) -> None:
+        """Record the YouTube video ID a submission was published as."""
+        self._upsert(submission_id, state=STATE_PUBLISHED, youtube_id=youtube_id,
+                     youtube_at=time.time())
+
+    def record_instagram(self, submission_id: str, instagram_id: str) -> None:
+        """Record the Instagram media ID a submission was published as."""
+        self._upsert(submission_id, state=STATE_PUBLISHED, instagram_id=instagram_id,
+                     instagram_at=time.time())
+
+    def record_rejected(self, submission_id: str, reason: str) -> None:
+        """Record that a submission was rejected and why."""
+        self._upsert(submission_id, state=STATE_REJECTED, reason=reason)
+
+    def _insert_batches(self, sql: str, values: Iterator[tuple], batch_size: int = 10000) -> int:
+        """Run an INSERT for every value in batches, returning the number of rows inserted."""
+        inserted = 0
+        batch: List[tuple] = []
+        for value in values:
+            batch.append(value)
+            if len(batch) >= batch_size:
+                inserted += self._insert_batch(sql, batch)
+                batch = []
+        if batch:
+            inserted += self._insert_batch(sql, batch)
+        return inserted
+
+    def _insert_batch(self, sql: str, batch: List[tuple]) -> int:
+        """Insert one batch in a single transaction."""
+        with self.lock, self.connection:
+            before = self.connection.total_changes
+            self.connection.executemany(sql, batch)
+            return self.connection.total_changes - before
+
+    def migrate_text_files(self, downloaded_ids_file: Path = config.DOWNLOADED_IDS_FILE,
+                           youtube_ids_file: Path = config.YOUTUBE_VIDEO_IDS_FILE) -> Dict[str, int]:
+        """
+        Import the legacy downloaded_ids.txt and youtube_video_ids.txt files.
+
+        The files are streamed line by line, so their size does not matter.
+        Legacy YouTube IDs have no link to a submission and are kept in their
+        own table. Running the migration again skips rows already imported.
+
+        Args:
+            downloaded_ids_file: File with one downloaded submission ID per line
+            youtube_ids_file: File with one uploaded YouTube video ID per line
+
+        Returns:
+            Number of rows imported from each file
+        """
+        def read_ids(path: Path) -> Iterator[str]:
+            if not path.exists():
+                return
+            with open(path, "r", encoding="utf-8") as file:
+                for line in file:
+                    if line.strip():
+                        yield line.strip()
+
+        now = time.time()
+        return {
+            "submissions": self._insert_batches(
+                "INSERT OR IGNORE INTO submissions (submission_id, state, updated_at) VALUES (?, ?, ?)",
+                ((submission_id, STATE_DOWNLOADED, now) for submission_id in read_ids(downloaded_ids_file)),
+            ),
+            "youtube_ids": self._insert_batches(
+                "INSERT OR IGNORE INTO legacy_youtube_uploads (youtube_id) VALUES (?)",
+                ((youtube_id,) for youtube_id in read_ids(youtube_ids_file)),
+            ),
+        }
+
+def main() -> None:
+    """Parse command-line arguments and run the selected command."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("migrate", help="Import downloaded_ids.txt and youtube_video_ids.txt")
+    show_parser = subparsers.add_parser("show", help="Show the ledger row of a submission")
+    show_parser.add_argument("submission_id")
+
+    args = parser.parse_args()
+    ledger = Ledger()
+    try:
+        if args.command == "migrate":
+            counts = ledger.migrate_text_files()
+            print(f"Imported {counts['submissions']} submission IDs and "
+                  f"{counts['youtube_ids']} YouTube video IDs into {ledger.path}")
+        elif args.command == "show":
+            row = ledger.get(args.submission_id)
+            if row is None:
+                print(f"No ledger entry for {args.submission_id}")
+            else:
+                for key, value in row.items():
+                    print(f"{key:>14}: {value}")
+    finally:
+        ledger.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,22 @@
 """
 Main script for Reddit to YouTube Shorts automation workflow.
 """
+import argparse
 import logging
 import sys
 from pathlib import Path
-import time
 
 import config
 import utils
-from GetVid import check_new_videos
+from checkpoint import Checkpoint, find_resumable
+from GetVid import DiscoverySession, download_selected_video, select_new_video
+from job import Job
+from step_graph import OPTIONAL, REQUIRED, SUCCEEDED, Step, StepGraph
 from Title import enhance_video_title
 from yt_shorts_processor import process_videos
-from YTUpload import upload_and_delete, cleanup_files
+from YTUpload import upload_to_youtube
 from instagram_upload import upload_video_to_instagram
-from ClearTitle import clear_files
+from pipeline import run_batch
 
 # Set up logger
 logging.basicConfig(
@@ -26,81 +29,105 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def build_workflow(session: DiscoverySession) -> StepGraph:
+    """
+    Build the workflow as a graph of steps and the edges between them.
+    
+    Every step receives the run's Job. Title generation only needs the Reddit
+    title, so it runs while the video downloads and is processed. Both uploads
+    need the processed video and wait for the title step, but fall back to the
+    Reddit title if it failed.
+    
+    Args:
+        session: Discovery session the video is selected and downloaded in
+        
+    Returns:
+        Workflow step graph
+    """
+    return StepGraph([
+        Step("select", lambda job: select_new_video(session, job)),
+        Step("download", lambda job: download_selected_video(session, job), {"select": REQUIRED}),
+        Step("title", enhance_video_title, {"select": REQUIRED}),
+        Step("process", process_videos, {"download": REQUIRED}),
+        Step("instagram", upload_video_to_instagram, {"process": REQUIRED, "title": OPTIONAL}),
+        Step("youtube", upload_to_youtube, {"process": REQUIRED, "title": OPTIONAL}),
+    ])
+
 def run_workflow() -> bool:
     """
     Run the complete Reddit to YouTube workflow:
-    1. Find and download ONE new video from Reddit
-    2. Generate an enhanced title using AI
+    1. Select ONE new video from Reddit
+    2. Download it while an enhanced title is generated using AI
     3. Process the video for YouTube Shorts format
-    4. Upload the video to Instagram
-    5. Upload the video to YouTube
-    6. Clean up temporary files
+    4. Upload the video to Instagram and YouTube in parallel
+    5. Delete the job's files in the background
+    
+    The workflow processes only one video at a time. Steps that depend on a
+    failed step are skipped, except that the uploads go ahead with the Reddit
+    title if title generation fails.
     
-    The workflow processes only one video at a time and stops if any step fails.
+    Every completed step is checkpointed. If a run fails, its files are kept
+    and the next run resumes that video from its first incomplete step.
     
     Returns:
-        True if the workflow completed successfully, False otherwise
+        True if every step completed successfully, False otherwise
     """
     success = True
+    status = {}
+    checkpoint = find_resumable()
+    if checkpoint is not None:
+        logger.info(f"Resuming {checkpoint.job.submission_id} (attempt {checkpoint.attempts}), "
+                    f"completed steps: {', '.join(checkpoint.completed) or 'none'}")
+    else:
+        checkpoint = Checkpoint(Job())
+    job = checkpoint.job
     
     try:
-        steps = [
-            ("Downloading video from Reddit", check_new_videos),
-            ("Enhancing video title", enhance_video_title),
-            ("Processing video for YouTube Shorts", process_videos),
-            ("Uploading video to Instagram", upload_video_to_instagram),
-            ("Uploading video to YouTube", upload_and_delete),
-        ]
-        
-        for i, (step_name, step_function) in enumerate(steps):
-            step_number = i + 1
-            logger.info(f"Step {step_number}/{len(steps)}: {step_name}")
-            
-            try:
-                result = step_function()
-                if result:
-                    logger.info(f"[SUCCESS] Step {step_number} completed successfully!")
-                else:
-                    logger.error(f"[FAILED] Step {step_number} failed. Stopping workflow.")
-                    success = False
-                    break
-            except Exception as e:
-                logger.error(f"[ERROR] Step {step_number} failed with error: {str(e)}")
-                success = False
-                break
-                
-            # Short pause between steps for better logging readability
-            time.sleep(1)
+        session = DiscoverySession()
+        try:
+            status = build_workflow(session).run(job, checkpoint.completed,
+                                                 checkpoint.mark_completed)
+        finally:
+            session.close()
+        success = all(outcome == SUCCEEDED for outcome in status.values())
         
         if success:
             logger.info("[SUCCESS] Complete workflow executed successfully!")
+        else:
+            summary = ", ".join(f"{name}: {outcome}" for name, outcome in status.items())
+            logger.error(f"[FAILED] Workflow did not complete ({summary})")
     
     except Exception as e:
         logger.error(f"[ERROR] Unexpected error in workflow: {str(e)}")
         success = False
     
     finally:
-        # Always ensure cleanup is performed, regardless of workflow outcome
-        logger.info("Running final cleanup to ensure no files are left over...")
-        try:
-            # First try using our dedicated cleanup function
-            cleanup_result = cleanup_files()
-            if not cleanup_result:
-                logger.warning("First cleanup attempt was not fully successful, trying backup cleanup...")
-                # If that doesn't fully succeed, try the backup method
-                clear_files()
-            
-            logger.info("Cleanup complete")
-        except Exception as e:
-            logger.error(f"Error during final cleanup: {str(e)}")
+        # The job is finished once both uploads are done, even if its title had to fall back
+        published = all(status.get(step) == SUCCEEDED for step in ("instagram", "youtube"))
+        if published or not job.submission_id:
+            # Delete only the files this run created, off the critical path; the
+            # interpreter waits for the cleanup thread before it exits
+            logger.info("Cleaning up the job's files in the background...")
+            job.cleanup_async()
+        else:
+            logger.info(f"Keeping {job.scratch_dir} so the next run resumes "
+                        f"{job.submission_id} from its first incomplete step")
     
     return success
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reddit to YouTube Shorts automation")
+    parser.add_argument("--batch", type=int, default=0, metavar="N",
+                        help="publish N videos through the pipelined batch mode")
+    args = parser.parse_args()
+    
     # Ensure all necessary directories exist
     for directory in [config.BASE_DIR, config.CHANNEL_VIDEOS_DIR, config.CLIPS_DIR]:
         utils.ensure_directory_exists(directory)
     
     # Run the workflow and return appropriate exit code
-    success = run_workflow()
+    if args.batch > 0:
+        success = run_batch(args.batch) > 0
+    else:
+        success = run_workflow()
     sys.exit(0 if success else 1)
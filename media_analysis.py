@@ -0,0 +1,458 @@
+"""
+Cheap analysis of downloaded clips from a sparse sample of low-resolution frames.
+"""
+import bisect
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import config
+import ffmpeg_utils
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# dHash compares each pixel with its right-hand neighbour on a 9x8 grayscale frame
+HASH_WIDTH = 9
+HASH_HEIGHT = 8
+
+# Keyframe seeks go this far past the requested time, so that a keyframe's own
+# timestamp, rounded to milliseconds, does not seek to the keyframe before it
+KEYFRAME_SEEK_MARGIN = 0.005
+
+@dataclass
+class ContentMetrics:
+    """Cheap signals of whether a clip is worth encoding and uploading."""
+    motion: float  # mean absolute luma change between successive samples (0-1)
+    black_fraction: float  # fraction of sampled frames that are black
+    loudness_db: Optional[float]  # RMS level in dBFS, None without an audio track
+
+def sample_times(duration: float, count: int) -> List[float]:
+    """
+    Spread sample timestamps evenly over a clip, avoiding its first and last frames.
+
+    Args:
+        duration: Length of the clip in seconds
+        count: Number of timestamps
+
+    Returns:
+        Timestamps in seconds at the middle of count equal intervals
+    """
+    return [(index + 0.5) * duration / count for index in range(count)]
+
+def keyframe_sample_times(path: Path, duration: float, count: int) -> List[float]:
+    """
+    Spread sample timestamps evenly over a clip and move each back to the
+    keyframe at or before it.
+
+    Encoders place keyframes seconds apart (x264 every 250 frames by default),
+    and a keyframe-only seek after the last keyframe decodes nothing, so
+    keyframe samples are taken at the keyframes themselves. Clips with few
+    keyframes repeat the same keyframe.
+
+    Args:
+        path: Video file
+        duration: Length of the clip in seconds
+        count: Number of timestamps
+
+    Returns:
+        count keyframe timestamps in ascending order (the start of the clip if
+        its keyframes cannot be listed)
+    """
+    try:
+        keyframes = [time for time in ffmpeg_utils.keyframe_times(path) if time < duration]
+    except Exception as e:
+        logger.warning(f"Could not list the keyframes of {path.name}: {str(e)}")
+        keyframes = []
+    if not keyframes:
+        keyframes = [0.0]
+    return [keyframes[max(0, bisect.bisect_right(keyframes, time) - 1)]
+            for time in sample_times(duration, count)]
+
+def _keyframe_seek_args(timestamp: float) -> List[str]:
+    """Input options that decode only the keyframe at or before a timestamp."""
+    return ["-skip_frame", "nokey", "-noaccurate_seek",
+            "-ss", f"{timestamp + KEYFRAME_SEEK_MARGIN:.3f}"]
+
+def _read_frames(path: Path, timestamp: float, width: int, height: int, count: int,
+                 keyframe_only: bool = False) -> np.ndarray:
+    """
+    Decode count consecutive grayscale frames starting at a timestamp.
+
+    Raises:
+        RuntimeError: If no frame could be decoded, so that an undecodable clip
+            is not mistaken for a black one (two such clips would otherwise
+            get the same fingerprint)
+    """
+    seek_args = _keyframe_seek_args(timestamp) if keyframe_only else ["-ss", f"{timestamp:.3f}"]
+    result = ffmpeg_utils.run_ffmpeg([
+        *seek_args,
+        "-i", str(path),
+        "-frames:v", str(count),
+        "-vf", f"scale={width}:{height}:flags=area,format=gray",
+        "-an", "-f", "rawvideo", "-",
+    ])
+    frame_size = width * height
+    frames = np.frombuffer(result.stdout, dtype=np.uint8)
+    frames = frames[:len(frames) // frame_size * frame_size].reshape(-1, height, width)
+    if len(frames) == 0:
+        raise RuntimeError(f"No frames decoded from {path.name} at {timestamp:.3f}s")
+    # Near the end of a clip fewer frames may be decoded; repeat the last one
+    if len(frames) < count:
+        frames = np.concatenate([frames, np.repeat(frames[-1:], count - len(frames), axis=0)])
+    return frames
+
+def decode_samples(path: Path, duration: float, count: int, width: int, height: int) -> np.ndarray:
+    """
+    Decode small grayscale frames at sample_times(duration, count) in a single pass.
+
+    Seeking to each sample would decode from the keyframe before it every
+    time, which costs more than decoding the clip once. The pass skips frames
+    no other frame references, as well as the loop filter, and each sample is
+    the nearest decoded frame. Unlike keyframe-only sampling, the samples do
+    not depend on where the encoder placed keyframes, so re-encodes of a clip
+    yield the same frames.
+
+    Args:
+        path: Video file
+        duration: Length of the clip in seconds
+        count: Number of frames
+        width: Width the frames are scaled to
+        height: Height the frames are scaled to
+
+    Returns:
+        uint8 array of shape (count, height, width)
+
+    Raises:
+        RuntimeError: If no frame could be decoded
+    """
+    result = ffmpeg_utils.run_ffmpeg([
+        "-skip_frame", "noref",
+        "-skip_loop_filter", "all",
+        "-ss", f"{duration / count / 2:.3f}",
+        "-i", str(path),
+        "-an", "-vf", f"fps={count}/{duration:.3f},scale={width}:{height}:flags=area,format=gray",
+        "-frames:v", str(count),
+        "-f", "rawvideo", "-",
+    ])
+    frame_size = width * height
+    frames = np.frombuffer(result.stdout, dtype=np.uint8)
+    frames = frames[:len(frames) // frame_size * frame_size].reshape(-1, height, width)
+    if len(frames) == 0:
+        raise RuntimeError(f"No frames decoded from {path.name}")
+    # The last sample may fall after the last decoded frame; repeat it
+    if len(frames) < count:
+        frames = np.concatenate([frames, np.repeat(frames[-1:], count - len(frames), axis=0)])
+    return frames
+
+def sample_keyframes(path: Path, timestamps: Sequence[float], width: int,
+                     height: int) -> Tuple[List[float], np.ndarray]:
+    """
+    Decode the keyframes at the given timestamps, dropping any that fail.
+
+    Args:
+        path: Video file
+        timestamps: Keyframe timestamps, e.g. from keyframe_sample_times
+        width: Width the frames are scaled to
+        height: Height the frames are scaled to
+
+    Returns:
+        Tuple of (distinct timestamps that decoded, uint8 array of shape
+        (len(timestamps), height, width))
+
+    Raises:
+        RuntimeError: If none of the keyframes could be decoded
+    """
+    def read(timestamp: float) -> Optional[np.ndarray]:
+        try:
+            return _read_frames(path, timestamp, width, height, 1, keyframe_only=True)[0]
+        except Exception as e:
+            logger.debug(f"Skipping keyframe of {path.name} at {timestamp:.3f}s: {str(e)}")
+            return None
+
+    times = sorted(set(timestamps))
+    with ThreadPoolExecutor(max_workers=config.ANALYSIS_WORKERS) as executor:
+        frames = list(executor.map(read, times))
+    decoded = [(time, frame) for time, frame in zip(times, frames) if frame is not None]
+    if not decoded:
+        raise RuntimeError(f"No keyframes decoded from {path.name}")
+    return [time for time, _ in decoded], np.stack([frame for _, frame in decoded])
+
+def video_fingerprint(path: Path, duration: float,
+                      frame_count: int = config.VIDEO_FINGERPRINT_FRAMES) -> int:
+    """
+    Compute a perceptual fingerprint from difference hashes of sampled frames.
+
+    Re-encodes, rescales and mild recolouring of the same clip produce
+    fingerprints a small Hamming distance apart. The frames come from one
+    cheap decoding pass (see decode_samples).
+
+    Args:
+        path: Video file
+        duration: Length of the clip in seconds
+        frame_count: Number of frames hashed (64 bits each)
+
+    Returns:
+        Fingerprint of frame_count * 64 bits as an integer
+
+    Raises:
+        RuntimeError: If the clip cannot be decoded; it must then be left out
+            of fingerprint deduplication
+    """
+    frames = decode_samples(path, duration, frame_count, HASH_WIDTH, HASH_HEIGHT)
+    bits = frames[:, :, 1:] > frames[:, :, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def hamming_distance(first: int, second: int) -> int:
+    """Number of differing bits between two fingerprints."""
+    return bin(first ^ second).count("1")
+
+def sample_audio(path: Path, duration: float,
+                 sample_rate: int = config.ANALYSIS_AUDIO_RATE) -> np.ndarray:
+    """
+    Decode the audio of a clip downmixed to mono at a low sample rate.
+
+    Args:
+        path: Media file
+        duration: Seconds of audio to decode from the start
+        sample_rate: Output sample rate in Hz
+
+    Returns:
+        float32 samples in the range -1 to 1
+    """
+    result = ffmpeg_utils.run_ffmpeg([
+        "-i", str(path),
+        "-t", f"{duration:.3f}",
+        "-vn", "-ac", "1", "-ar", str(sample_rate),
+        "-f", "f32le", "-",
+    ])
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+def analyze_content(path: Path, duration: float, has_audio: bool) -> ContentMetrics:
+    """
+    Measure motion, black frames and loudness from a sparse sample of the clip.
+
+    The frames come from one cheap decoding pass (see decode_samples) and the
+    audio from one low-rate pass, so the check costs less than decoding the
+    clip once.
+
+    Args:
+        path: Video file
+        duration: Length of the clip in seconds
+        has_audio: Whether the clip has an audio track
+
+    Returns:
+        ContentMetrics for the clip
+    """
+    size = config.ANALYSIS_FRAME_SIZE
+    frames = decode_samples(path, duration, config.ANALYSIS_SAMPLES, size, size).astype(np.float32)
+    motion = float(np.abs(np.diff(frames, axis=0)).mean() / 255) if len(frames) > 1 else 0.0
+    black_fraction = float((frames.mean(axis=(1, 2)) < config.BLACK_FRAME_LUMA).mean())
+
+    loudness_db = None
+    if has_audio:
+        audio = sample_audio(path, duration)
+        rms = float(np.sqrt(np.mean(np.square(audio, dtype=np.float64)))) if audio.size else 0.0
+        loudness_db = 20 * math.log10(max(rms, 1e-10))
+    return ContentMetrics(motion, black_fraction, loudness_db)
+
+def content_rejection_reason(metrics: ContentMetrics) -> Optional[str]:
+    """
+    Check content metrics against the configured thresholds.
+
+    Args:
+        metrics: Metrics from analyze_content
+
+    Returns:
+        Why the clip is low-value, or None if it passes every threshold
+    """
+    if metrics.black_fraction > config.MAX_BLACK_FRACTION:
+        return f"mostly black ({metrics.black_fraction:.0%} of sampled frames)"
+    if metrics.motion < config.MIN_MOTION:
+        return f"mostly static (motion {metrics.motion:.4f} < {config.MIN_MOTION})"
+    if metrics.loudness_db is not None and metrics.loudness_db < config.MIN_LOUDNESS_DB:
+        return f"silent ({metrics.loudness_db:.1f} dBFS < {config.MIN_LOUDNESS_DB} dBFS)"
+    return None
+
+def _normalize(signal: np.ndarray) -> np.ndarray:
+    """Scale a signal to 0-1 by its 95th percentile so single spikes do not dominate."""
+    scale = float(np.percentile(signal, 95)) if signal.size else 0.0
+    return np.clip(signal / scale, 0.0, 1.0) if scale > 0 else np.zeros_like(signal)
+
+def decode_proxy(path: Path, duration: float, rate: float, size: int) -> np.ndarray:
+    """
+    Decode a tiny low-frame-rate grayscale proxy of a clip in one pass.
+
+    B-frames and the loop filter are skipped, which does not matter at a
+    few frames per second, and the decoder is held to TRIM_DECODE_THREADS
+    threads so that scoring does not crowd out encodes running alongside it.
+
+    Args:
+        path: Video file
+        duration: Seconds to decode from the start
+        rate: Proxy frames per second
+        size: Proxy frames are scaled to this many pixels square
+
+    Returns:
+        uint8 array of shape (frames, size, size)
+    """
+    result = ffmpeg_utils.run_ffmpeg([
+        # P-frames only reference I- and P-frames, so skipping B-frames breaks nothing
+        "-skip_frame", "bidir",
+        "-skip_loop_filter", "all",
+        "-threads", str(config.TRIM_DECODE_THREADS),
+        "-i", str(path),
+        "-t", f"{duration:.3f}",
+        "-an", "-vf", f"fps={rate},scale={size}:{size}:flags=area,format=gray",
+        "-f", "rawvideo", "-",
+    ])
+    frames = np.frombuffer(result.stdout, dtype=np.uint8)
+    return frames[:len(frames) // (size * size) * size * size].reshape(-1, size, size)
+
+def decode_keyframe_proxy(path: Path, size: int) -> np.ndarray:
+    """
+    Decode a tiny grayscale proxy of every keyframe of a clip in one pass.
+
+    Args:
+        path: Video file
+        size: Proxy frames are scaled to this many pixels square
+
+    Returns:
+        uint8 array of shape (keyframes, size, size)
+    """
+    result = ffmpeg_utils.run_ffmpeg([
+        "-skip_frame", "nokey",
+        "-threads", str(config.TRIM_DECODE_THREADS),
+        "-i", str(path),
+        # One output frame per decoded keyframe, none duplicated or dropped
+        "-an", "-fps_mode", "passthrough",
+        "-vf", f"scale={size}:{size}:flags=area,format=gray",
+        "-f", "rawvideo", "-",
+    ])
+    frames = np.frombuffer(result.stdout, dtype=np.uint8)
+    return frames[:len(frames) // (size * size) * size * size].reshape(-1, size, size)
+
+def motion_profile(path: Path, duration: float, rate: float,
+                   keyframes: Sequence[float]) -> np.ndarray:
+    """
+    Measure frame-difference motion over a clip in bins of 1/rate seconds.
+
+    When no two keyframes are more than TRIM_KEYFRAME_GAP seconds apart, only
+    the keyframes are decoded and each bin takes the change between the
+    keyframes around it. Otherwise a proxy is decoded at the bin rate.
+
+    Args:
+        path: Video file
+        duration: Length of the clip in seconds
+        rate: Bins per second
+        keyframes: Keyframe timestamps of the clip, as from ffmpeg_utils.keyframe_times
+
+    Returns:
+        Mean absolute luma change per bin (0-255)
+    """
+    gaps = np.diff([*keyframes, duration])
+    if len(keyframes) > 1 and gaps.max() <= config.TRIM_KEYFRAME_GAP:
+        frames = decode_keyframe_proxy(path, config.TRIM_PROXY_SIZE).astype(np.float32)
+        if len(frames) == len(keyframes):
+            change = np.abs(np.diff(frames, axis=0)).mean(axis=(1, 2))
+            centres = (np.arange(int(duration * rate)) + 0.5) / rate
+            interval = np.searchsorted(keyframes[1:], centres)
+            return change[np.minimum(interval, len(change) - 1)]
+        logger.debug(f"Decoded {len(frames)} of {len(keyframes)} keyframes of {path.name}; "
+                     f"decoding a proxy instead")
+
+    frames = decode_proxy(path, duration, rate, config.TRIM_PROXY_SIZE).astype(np.float32)
+    motion = np.zeros(len(frames))
+    motion[1:] = np.abs(np.diff(frames, axis=0)).mean(axis=(1, 2))
+    return motion
+
+def best_window_start(path: Path, duration: float, window: float, has_audio: bool,
+                      keyframes: Optional[Sequence[float]] = None) -> float:
+    """
+    Find the start of the most active window of a clip.
+
+    Activity combines motion_profile with audio energy, both binned at
+    TRIM_PROXY_FPS, and the window with the highest total is chosen.
+
+    Args:
+        path: Video file
+        duration: Length of the clip in seconds
+        window: Length of the window in seconds
+        has_audio: Whether the clip has an audio track
+        keyframes: Keyframe timestamps of the clip, read from it when None
+
+    Returns:
+        Start of the best window in seconds (0 if the clip fits in the window)
+    """
+    rate = config.TRIM_PROXY_FPS
+    window_bins = int(window * rate)
+    if duration <= window:
+        return 0.0
+
+    if keyframes is None:
+        keyframes = ffmpeg_utils.keyframe_times(path)
+    motion = motion_profile(path, duration, rate, keyframes)
+    bins = len(motion)
+    if bins <= window_bins:
+        return 0.0
+    score = (1 - config.TRIM_AUDIO_WEIGHT) * _normalize(motion)
+
+    if has_audio:
+        audio = sample_audio(path, duration)
+        hop = int(round(config.ANALYSIS_AUDIO_RATE / rate))
+        usable = min(bins, len(audio) // hop)
+        energy = np.zeros(bins)
+        energy[:usable] = np.sqrt(np.mean(
+            np.square(audio[:usable * hop].reshape(usable, hop), dtype=np.float64), axis=1))
+        score += config.TRIM_AUDIO_WEIGHT * _normalize(energy)
+
+    window_scores = np.convolve(score, np.ones(window_bins), mode="valid")
+    return float(np.argmax(window_scores)) / rate
+
+def extract_thumbnail(path: Path, duration: float, dest: Path,
+                      candidates: int = config.THUMBNAIL_CANDIDATES) -> float:
+    """
+    Save the sharpest well-exposed keyframe of a clip as a JPEG thumbnail.
+
+    Candidates are keyframes spread over the clip, scored on tiny
+    keyframe-only decodes, and only the chosen keyframe is decoded at full
+    resolution, so the clip is never decoded in full. Candidates that fail to
+    decode are left out.
+
+    Args:
+        path: Video file
+        duration: Length of the clip in seconds
+        dest: JPEG file to write (overwritten if it exists)
+        candidates: Number of keyframes considered
+
+    Returns:
+        Timestamp of the chosen keyframe in seconds
+
+    Raises:
+        RuntimeError: If no keyframe could be decoded
+    """
+    times, frames = sample_keyframes(path, keyframe_sample_times(path, duration, candidates), 72, 128)
+    frames = frames.astype(np.float32)
+    luma = frames.mean(axis=(1, 2))
+    sharpness = (np.abs(np.diff(frames, axis=1)).mean(axis=(1, 2))
+                 + np.abs(np.diff(frames, axis=2)).mean(axis=(1, 2)))
+    score = sharpness * frames.std(axis=(1, 2))
+    # Avoid black fades and blown-out frames unless nothing else is available
+    exposed = (luma >= config.BLACK_FRAME_LUMA) & (luma <= 255 - config.BLACK_FRAME_LUMA)
+    score = np.where(exposed, score, score - score.max() - 1)
+    timestamp = times[int(np.argmax(score))]
+
+    ffmpeg_utils.run_ffmpeg([
+        "-y",
+        *_keyframe_seek_args(timestamp),
+        "-i", str(path),
+        "-frames:v", "1",
+        "-q:v", "2",
+        str(dest),
+    ])
+    return timestamp
@@ -0,0 +1,269 @@
+"""
+Batch mode: moves several videos through the workflow as a staged pipeline.
+
+Discovery, download, title generation, transcoding and upload each run in
+their own worker threads and hand videos to the next stage through bounded
+queues, so while one video uploads the next is transcoded and a third is
+downloaded. Throughput is set by the slowest stage rather than by the sum of
+all of them.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Set
+
+import config
+import utils
+from GetVid import DiscoverySession
+from instagram_upload import login as instagram_login, upload_clip
+from job import Job
+from Title import ContentGenerator
+from YTUpload import YouTubeUploader, publish_video
+from yt_shorts_processor import VideoProcessor
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Stages in pipeline order, after discovery
+STAGES = ("download", "title", "transcode", "upload")
+
+# Queue marker telling a worker that no more videos will arrive
+_DONE = object()
+
+class PublishQuota:
+    """
+    Lets only as many videos into the pipeline as are needed to reach the batch size.
+
+    A video holds a slot from its download until it leaves the pipeline, and
+    only a published video counts towards the quota, so a video rejected or
+    failed at any stage frees its slot for another candidate.
+    """
+
+    def __init__(self, count: int):
+        """
+        Initialize the quota.
+
+        Args:
+            count: Number of published videos wanted
+        """
+        self.count = count
+        self.in_flight = 0
+        self.done = 0
+        self.condition = threading.Condition()
+
+    def acquire(self) -> bool:
+        """
+        Wait for a slot for a new video.
+
+        Returns:
+            True if a video may be downloaded, False once the quota has been met
+        """
+        with self.condition:
+            while self.done < self.count and self.in_flight + self.done >= self.count:
+                self.condition.wait()
+            if self.done >= self.count:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, success: bool) -> None:
+        """Return a slot, counting it towards the quota if its video was published."""
+        with self.condition:
+            self.in_flight -= 1
+            self.done += int(success)
+            self.condition.notify_all()
+
+    @property
+    def met(self) -> bool:
+        """True once enough videos have been published."""
+        with self.condition:
+            return self.done >= self.count
+
+class BatchPipeline:
+    """Runs discovery, download, title, transcode and upload as concurrent stages."""
+
+    def __init__(self, count: int, workers: Dict[str, int] = config.PIPELINE_WORKERS,
+                 queue_size: int = config.PIPELINE_QUEUE_SIZE):
+        """
+        Initialize the pipeline.
+
+        Args:
+            count: Number of videos to publish
+            workers: Worker threads per stage, keyed by stage name
+            queue_size: Videos that may wait between two stages
+        """
+        self.count = count
+        self.workers = {stage: max(1, workers.get(stage, 1)) for stage in STAGES}
+        self.queues = {stage: queue.Queue(maxsize=queue_size) for stage in STAGES}
+        self.quota = PublishQuota(count)
+        self.slots: Set[str] = set()  # submission IDs of the videos holding a quota slot
+        self.session = DiscoverySession()
+        self.processor = VideoProcessor()
+        self.youtube = YouTubeUploader()
+        self.local = threading.local()
+        self.instagram_clients: List = []
+        self.lock = threading.Lock()
+        self.remaining = dict(self.workers)
+        self.stage_seconds = {stage: 0.0 for stage in STAGES}
+
+    def discover(self) -> None:
+        """Feed screened candidates to the download stage until the quota is met."""
+        try:
+            for candidate in self.session.discover():
+                if self.quota.met:
+                    break
+                if self.session.screen(candidate):
+                    self.queues["download"].put(Job.from_candidate(candidate))
+        finally:
+            for _ in range(self.workers["download"]):
+                self.queues["download"].put(_DONE)
+
+    def download(self, job: Job) -> bool:
+        """Probe and download a candidate if the batch still needs videos."""
+        if not self.quota.acquire():
+            return False
+        with self.lock:
+            self.slots.add(job.submission_id)
+        if not job.claim():
+            return False
+        job.video_file = self.session.fetch(job.candidate, dest_dir=job.scratch_dir)
+        if job.video_file is None:
+            return False
+        job.register_artifact(job.video_file)
+        return True
+
+    def enhance_title(self, job: Job) -> bool:
+        """Generate the title, description and hashtags of a video."""
+        if not hasattr(self.local, "generator"):
+            self.local.generator = ContentGenerator()
+        job.title, job.description, job.hashtags = \
+            self.local.generator.generate_enhanced_content(job.source_title)
+        return bool(job.title)
+
+    def transcode(self, job: Job) -> bool:
+        """Convert a video to the Shorts format in place."""
+        job.register_artifact(utils.get_thumbnail_path(job.video_file))
+        return self.processor.process_video(job.video_file, job.submission_id)
+
+    def upload(self, job: Job) -> bool:
+        """Upload a processed video to Instagram and YouTube at the same time."""
+        if not hasattr(self.local, "instagram"):
+            self.local.instagram = instagram_login()
+            with self.lock:
+                self.instagram_clients.append(self.local.instagram)
+        if not hasattr(self.local, "youtube"):
+            self.local.youtube = self.youtube.clone()
+
+        # The two uploads are independent, so they run side by side
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            instagram = executor.submit(upload_clip, self.local.instagram, job.video_file,
+                                        job.title, job.hashtags, job.submission_id)
+            job.youtube_id = publish_video(self.local.youtube, job.video_file, job.submission_id,
+                                           job.title, job.description, job.hashtags)
+            instagram_success = instagram.result()
+        return instagram_success and job.youtube_id is not None
+
+    def cleanup(self, job: Job) -> None:
+        """
+        Release the quota slot of a video that left the pipeline and delete its
+        working files in the background.
+        """
+        with self.lock:
+            held = job.submission_id in self.slots
+            self.slots.discard(job.submission_id)
+        if held:
+            self.quota.release(job.youtube_id is not None)
+        job.cleanup_async()
+
+    def _run_worker(self, stage: str, function: Callable[[Job], bool]) -> None:
+        """Process videos from a stage's queue until the previous stage is finished."""
+        index = STAGES.index(stage)
+        next_stage = STAGES[index + 1] if index + 1 < len(STAGES) else None
+        inbox = self.queues[stage]
+        while True:
+            job = inbox.get()
+            if job is _DONE:
+                break
+            start = time.perf_counter()
+            try:
+                success = function(job)
+            except Exception as e:
+                logger.error(f"[{stage}] {job.submission_id} failed with error: {str(e)}")
+                success = False
+            with self.lock:
+                self.stage_seconds[stage] += time.perf_counter() - start
+
+            if success and next_stage:
+                self.queues[next_stage].put(job)
+            else:
+                if not success and job.video_file is not None:
+                    logger.warning(f"[{stage}] Dropping {job.submission_id} from the batch")
+                self.cleanup(job)
+
+        # The last worker of a stage tells every worker of the next stage to stop
+        with self.lock:
+            self.remaining[stage] -= 1
+            last = self.remaining[stage] == 0
+        if last and next_stage:
+            for _ in range(self.workers[next_stage]):
+                self.queues[next_stage].put(_DONE)
+
+    def run(self) -> int:
+        """
+        Run the pipeline until the batch is published or no candidates are left.
+
+        Returns:
+            Number of videos published to YouTube
+        """
+        functions = {
+            "download": self.download,
+            "title": self.enhance_title,
+            "transcode": self.transcode,
+            "upload": self.upload,
+        }
+        # Every upload worker shares one OAuth consent instead of prompting per thread
+        if not self.youtube.authenticate():
+            logger.error("YouTube authentication failed; not starting the batch")
+            self.session.close()
+            return 0
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=self.discover, name="discover")]
+        for stage in STAGES:
+            for index in range(self.workers[stage]):
+                threads.append(threading.Thread(target=self._run_worker,
+                                                args=(stage, functions[stage]),
+                                                name=f"{stage}-{index}"))
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            self.session.close()
+            for client in self.instagram_clients:
+                try:
+                    client.logout()
+                except Exception as e:
+                    logger.warning(f"Failed to log out of Instagram: {e}")
+
+        elapsed = time.perf_counter() - start
+        published = self.quota.done
+        busy = ", ".join(f"{stage} {seconds:.0f}s" for stage, seconds in self.stage_seconds.items())
+        logger.info(f"Published {published}/{self.count} videos in {elapsed:.0f}s "
+                    f"({published * 3600 / elapsed:.1f} per hour); stage busy time: {busy}")
+        return published
+
+def run_batch(count: int) -> int:
+    """
+    Download, process and publish up to count videos as a pipelined batch.
+
+    Args:
+        count: Number of videos to publish
+
+    Returns:
+        Number of videos published to YouTube
+    """
+    return BatchPipeline(count).run()
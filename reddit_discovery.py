@@ -0,0 +1,482 @@
+"""
+Concurrent discovery of candidate videos across many subreddits.
+"""
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import praw
+from prawcore.exceptions import Redirect, NotFound, Forbidden
+
+import config
+import utils
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Hosts whose links are downloaded as external videos
+EXTERNAL_VIDEO_HOSTS = ('youtube.com', 'youtu.be', 'v.redd.it')
+
+# Reddit serves at most this many submissions per listing request
+LISTING_PAGE_SIZE = 100
+
+@dataclass
+class Candidate:
+    """A Reddit submission that links to a downloadable video."""
+    submission_id: str
+    subreddit: str
+    title: str
+    media_url: str
+    score: int
+    created_utc: float
+    over_18: bool
+    crosspost_parent: Optional[str] = None
+    link_url: str = ""
+
+def get_media_url(submission: Any) -> Optional[str]:
+    """
+    Work out the URL to download for a submission.
+
+    Args:
+        submission: PRAW submission
+
+    Returns:
+        URL of the video, or None if the submission is not a supported video
+    """
+    # Process Reddit-hosted videos
+    if submission.is_video and submission.media:
+        video_url = submission.media['reddit_video']['fallback_url']
+        # Remove DASH suffix if present
+        if "v.redd.it" in video_url:
+            parts = video_url.split('/')
+            if len(parts) >= 4:
+                video_url = f"https://v.redd.it/{parts[3]}"
+        return video_url
+
+    # Process external video links (e.g., YouTube)
+    if submission.url and any(host in submission.url for host in EXTERNAL_VIDEO_HOSTS):
+        return submission.url
+    return None
+
+def candidate_from_submission(submission: Any, subreddit_name: str) -> Optional[Candidate]:
+    """
+    Build a Candidate from a PRAW submission.
+
+    Args:
+        submission: PRAW submission
+        subreddit_name: Subreddit the submission was listed in
+
+    Returns:
+        Candidate, or None if the submission does not link to a supported video
+    """
+    media_url = get_media_url(submission)
+    if not media_url:
+        return None
+    return Candidate(
+        submission_id=submission.id,
+        subreddit=subreddit_name,
+        title=submission.title,
+        media_url=media_url,
+        score=submission.score,
+        created_utc=submission.created_utc,
+        over_18=submission.over_18,
+        # PRAW fetches the whole submission when an attribute is missing, and
+        # listings only include crosspost_parent on crossposts
+        crosspost_parent=vars(submission).get('crosspost_parent'),
+        link_url=submission.url or "",
+    )
+
+def create_reddit() -> praw.Reddit:
+    """Create a Reddit client from the configured credentials."""
+    return praw.Reddit(
+        client_id=config.REDDIT_CLIENT_ID,
+        client_secret=config.REDDIT_CLIENT_SECRET,
+        user_agent=config.REDDIT_USER_AGENT
+    )
+
+class RateLimiter:
+    """Thread-safe token bucket that spaces requests to stay under a per-minute limit."""
+
+    def __init__(self, requests_per_minute: float, burst: int = 1):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            requests_per_minute: Sustained request rate allowed
+            burst: Number of requests that may be made back to back
+        """
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a request may be made."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class ListingCache:
+    """
+    Persistent per-subreddit listing cache.
+
+    Holds three things: recent listing results and a negative cache of
+    subreddits that do not exist, are banned or are private, both keyed by
+    lower-cased subreddit name, and the IDs of submissions that have already
+    been evaluated.
+
+    Listings are ordered by score, so an older post can climb into one after
+    newer posts were evaluated; evaluated posts are therefore remembered by ID
+    rather than by a created_utc high-water mark. An ID is forgotten once it
+    is older than evaluated_ttl_hours, by which time it has dropped out of the
+    daily listing.
+    """
+
+    def __init__(self, path: Path = config.LISTING_CACHE_FILE,
+                 ttl_minutes: float = config.LISTING_CACHE_TTL_MINUTES,
+                 invalid_ttl_hours: float = config.INVALID_SUBREDDIT_TTL_HOURS,
+                 evaluated_ttl_hours: float = config.EVALUATED_SUBMISSION_TTL_HOURS):
+        """
+        Initialize the cache, loading it from disk if present.
+
+        Args:
+            path: JSON file backing the cache
+            ttl_minutes: Age after which a cached listing is fetched again
+            invalid_ttl_hours: Age after which an invalid subreddit is retried
+            evaluated_ttl_hours: Age after which an evaluated submission ID is forgotten
+        """
+        self.path = path
+        self.ttl = ttl_minutes * 60
+        self.invalid_ttl = invalid_ttl_hours * 3600
+        self.evaluated_ttl = evaluated_ttl_hours * 3600
+        self.lock = threading.Lock()
+        self.listings: Dict[str, Dict[str, Any]] = {}
+        self.evaluated: Dict[str, float] = {}  # submission ID -> when it was evaluated
+        self.invalid: Dict[str, Dict[str, Any]] = {}
+        self.load()
+
+    def load(self) -> None:
+        """Load the cache from disk, starting empty if it is missing or unreadable."""
+        content = utils.read_file_content(self.path) if self.path.exists() else ""
+        if not content:
+            return
+        try:
+            data = json.loads(content)
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable listing cache {self.path}: {e}")
+            return
+        self.listings = data.get("listings", {})
+        self.evaluated = data.get("evaluated", {})
+        self.invalid = data.get("invalid", {})
+
+    def save(self) -> None:
+        """Write the cache to disk, dropping expired evaluated submission IDs."""
+        with self.lock:
+            cutoff = time.time() - self.evaluated_ttl
+            self.evaluated = {submission_id: at for submission_id, at in self.evaluated.items()
+                              if at >= cutoff}
+            content = json.dumps({
+                "listings": self.listings,
+                "evaluated": self.evaluated,
+                "invalid": self.invalid,
+            })
+        utils.write_file_content(self.path, content)
+
+    def is_invalid(self, subreddit_name: str) -> bool:
+        """Return True if the subreddit recently failed validation."""
+        entry = self.invalid.get(subreddit_name.lower())
+        return bool(entry) and time.time() - entry["at"] < self.invalid_ttl
+
+    def mark_invalid(self, subreddit_name: str, reason: str) -> None:
+        """Remember that a subreddit failed validation."""
+        with self.lock:
+            self.invalid[subreddit_name.lower()] = {"reason": reason, "at": time.time()}
+
+    def get_listing(self, subreddit_name: str) -> Optional[List[Candidate]]:
+        """Return the cached candidates of a subreddit, or None if not cached or expired."""
+        entry = self.listings.get(subreddit_name.lower())
+        if not entry or time.time() - entry["fetched_at"] >= self.ttl:
+            return None
+        return [Candidate(**candidate) for candidate in entry["candidates"]]
+
+    def store_listing(self, subreddit_name: str, candidates: List[Candidate]) -> None:
+        """Cache the candidates fetched for a subreddit."""
+        with self.lock:
+            self.listings[subreddit_name.lower()] = {
+                "fetched_at": time.time(),
+                "candidates": [asdict(candidate) for candidate in candidates],
+            }
+
+    def is_evaluated(self, submission_id: str) -> bool:
+        """Return True if the submission was evaluated within the TTL."""
+        evaluated_at = self.evaluated.get(submission_id)
+        return evaluated_at is not None and time.time() - evaluated_at < self.evaluated_ttl
+
+    def mark_evaluated(self, submission_id: str) -> None:
+        """Remember that a submission has been evaluated."""
+        with self.lock:
+            self.evaluated[submission_id] = time.time()
+
+class DiscoveryEngine:
+    """
+    Fetches subreddit listings concurrently and ranks the candidates they contain.
+
+    Subreddits are combined into r/a+b+c multireddit listings of chunk_size
+    communities, so one request covers many of them.
+    """
+
+    def __init__(self, reddit_factory: Callable[[], praw.Reddit] = create_reddit,
+                 workers: int = config.DISCOVERY_WORKERS,
+                 requests_per_minute: float = config.REDDIT_REQUESTS_PER_MINUTE,
+                 listing_limit: int = config.LISTING_LIMIT,
+                 chunk_size: int = config.MULTIREDDIT_CHUNK_SIZE,
+                 max_pages: int = config.MULTIREDDIT_MAX_PAGES,
+                 cache: Optional[ListingCache] = None):
+        """
+        Initialize the discovery engine.
+
+        Args:
+            reddit_factory: Creates a Reddit client; one is made per worker
+                thread because PRAW clients are not thread-safe
+            workers: Number of listing requests made at once
+            requests_per_minute: Request budget shared by all workers
+            listing_limit: Submissions fetched from each subreddit's daily top
+            chunk_size: Subreddits combined into one multireddit listing request
+            max_pages: Listing pages read from one multireddit listing
+            cache: Listing cache consulted before and updated after fetching
+        """
+        self.reddit_factory = reddit_factory
+        self.workers = max(1, workers)
+        self.limiter = RateLimiter(requests_per_minute, burst=self.workers)
+        self.listing_limit = listing_limit
+        self.chunk_size = max(1, chunk_size)
+        self.max_pages = max(1, max_pages)
+        self.cache = cache
+        self.local = threading.local()
+        self.request_count = 0
+        self.request_costs: Dict[str, float] = {}
+        self.count_lock = threading.Lock()
+
+    def _reddit(self) -> praw.Reddit:
+        """Return the Reddit client for the current thread."""
+        if not hasattr(self.local, 'reddit'):
+            self.local.reddit = self.reddit_factory()
+        return self.local.reddit
+
+    def _request(self, subreddit_names: Sequence[str] = (), count: int = 1) -> None:
+        """
+        Wait for the rate limiter and count the requests about to be made.
+
+        Args:
+            subreddit_names: Subreddits the requests are made for; the cost is
+                split evenly between them in request_costs. Leave empty to
+                attribute it later with _charge.
+            count: Number of requests
+        """
+        for _ in range(count):
+            self.limiter.acquire()
+        with self.count_lock:
+            self.request_count += count
+        self._charge(subreddit_names, count)
+
+    def _charge(self, subreddit_names: Sequence[str], count: float) -> None:
+        """Split the cost of requests evenly between subreddits in request_costs."""
+        with self.count_lock:
+            for name in subreddit_names:
+                self.request_costs[name] = self.request_costs.get(name, 0.0) + count / len(subreddit_names)
+
+    def _evaluate(self, submission: Any, subreddit_name: str) -> Optional[Candidate]:
+        """Build a candidate, remembering submissions that are not one as evaluated."""
+        candidate = candidate_from_submission(submission, subreddit_name)
+        if candidate is None and self.cache:
+            self.cache.mark_evaluated(submission.id)
+        return candidate
+
+    def _reject_subreddit(self, subreddit_name: str, error: Exception) -> None:
+        """Record a subreddit that failed validation in the negative cache."""
+        if self.cache:
+            self.cache.mark_invalid(subreddit_name, type(error).__name__)
+
+    def fetch_subreddit(self, subreddit_name: str) -> List[Candidate]:
+        """
+        Validate a subreddit and fetch candidates from its daily top listing.
+
+        Args:
+            subreddit_name: Name of the subreddit
+
+        Returns:
+            Candidates found in the listing, empty if the subreddit is unusable
+        """
+        try:
+            subreddit = self._reddit().subreddit(subreddit_name)
+            # Verify subreddit exists by accessing its id
+            self._request([subreddit_name])
+            _ = subreddit.id
+        except NotFound as e:
+            logger.warning(f"Error: Subreddit '{subreddit_name}' does not exist")
+            self._reject_subreddit(subreddit_name, e)
+            return []
+        except Redirect as e:
+            logger.warning(f"Error: Subreddit '{subreddit_name}' is invalid")
+            self._reject_subreddit(subreddit_name, e)
+            return []
+        except Forbidden as e:
+            logger.warning(f"Error: Access to subreddit '{subreddit_name}' is forbidden")
+            self._reject_subreddit(subreddit_name, e)
+            return []
+        except Exception as e:
+            logger.warning(f"Error accessing subreddit '{subreddit_name}': {str(e)}")
+            return []
+
+        candidates = []
+        try:
+            self._request([subreddit_name])
+            for submission in subreddit.top(time_filter="day", limit=self.listing_limit):
+                candidate = self._evaluate(submission, subreddit_name)
+                if candidate:
+                    candidates.append(candidate)
+        except Exception as e:
+            logger.error(f"Error fetching posts from {subreddit_name}: {str(e)}")
+        return candidates
+
+    def fetch_chunk(self, subreddit_names: Sequence[str]) -> List[Candidate]:
+        """
+        Fetch the daily top listing of several subreddits as one multireddit.
+
+        Submissions are attributed back to the subreddit they were posted in and
+        each subreddit keeps at most listing_limit of them. The combined listing
+        is ranked across all subreddits, so busy subreddits fill it first; pages
+        are read until every subreddit has its share, the listing ends or
+        max_pages is reached. Subreddits still missing at that point were crowded
+        out rather than empty, so they are fetched again as a chunk of their own.
+        The requests are charged only to the subreddits that appeared, unless the
+        listing ended, in which case the missing ones had nothing to list and
+        share the cost. If the combined request fails, for example because one
+        subreddit is banned or private, each subreddit is fetched and validated
+        separately.
+
+        Args:
+            subreddit_names: Subreddits to combine
+
+        Returns:
+            Candidates found in the listing
+        """
+        if len(subreddit_names) == 1:
+            return self.fetch_subreddit(subreddit_names[0])
+
+        limit = LISTING_PAGE_SIZE * self.max_pages
+        names_by_key = {name.lower(): name for name in subreddit_names}
+        kept = {name: 0 for name in subreddit_names}
+        unfilled = len(subreddit_names)
+        candidates = []
+        pages = 0
+        seen = 0
+        try:
+            multireddit = self._reddit().subreddit("+".join(subreddit_names))
+            # PRAW requests the next page only once the previous one is used up
+            self._request()
+            pages = 1
+            for seen, submission in enumerate(multireddit.top(time_filter="day", limit=limit), 1):
+                name = names_by_key.get(submission.subreddit.display_name.lower())
+                if name is not None and kept[name] < self.listing_limit:
+                    kept[name] += 1
+                    if kept[name] == self.listing_limit:
+                        unfilled -= 1
+                    candidate = self._evaluate(submission, name)
+                    if candidate:
+                        candidates.append(candidate)
+                if not unfilled:
+                    break
+                if seen % LISTING_PAGE_SIZE == 0 and seen < limit:
+                    self._request()
+                    pages += 1
+        except (NotFound, Redirect, Forbidden) as e:
+            self._charge(subreddit_names, pages)
+            logger.warning(f"Multireddit listing failed ({type(e).__name__}); "
+                           f"fetching {len(subreddit_names)} subreddits separately")
+            return [candidate for name in subreddit_names for candidate in self.fetch_subreddit(name)]
+        except Exception as e:
+            self._charge(subreddit_names, pages)
+            logger.error(f"Error fetching multireddit listing: {str(e)}")
+            return candidates
+
+        missing = [name for name in subreddit_names if not kept[name]]
+        if not missing or seen < limit or len(missing) == len(subreddit_names):
+            self._charge(subreddit_names, pages)
+            return candidates
+        self._charge([name for name in subreddit_names if kept[name]], pages)
+        logger.debug(f"{len(missing)} of {len(subreddit_names)} subreddits were crowded out "
+                     f"of a {seen}-submission multireddit listing; fetching them again")
+        return candidates + self.fetch_chunk(missing)
+
+    def discover(self, subreddit_names: Sequence[str]) -> List[Candidate]:
+        """
+        Fetch every subreddit concurrently and rank the candidates found.
+
+        Subreddits keep the order they were given in, which is the scheduler's
+        order of promise; candidates are ranked by score only within their
+        subreddit.
+
+        With a cache, subreddits known to be invalid are skipped, fresh cached
+        listings are reused without a request, and submissions that were
+        already evaluated are dropped.
+
+        Args:
+            subreddit_names: Subreddits to scan
+
+        Returns:
+            Candidates in subreddit order, each subreddit's highest score first
+        """
+        start = time.perf_counter()
+        by_subreddit: Dict[str, List[Candidate]] = {}
+        to_fetch = []
+        skipped_invalid = 0
+        for name in subreddit_names:
+            if self.cache and self.cache.is_invalid(name):
+                skipped_invalid += 1
+                continue
+            cached = self.cache.get_listing(name) if self.cache else None
+            if cached is None:
+                to_fetch.append(name)
+            else:
+                by_subreddit[name] = cached
+
+        chunks = [to_fetch[i:i + self.chunk_size]
+                  for i in range(0, len(to_fetch), self.chunk_size)]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(self.fetch_chunk, chunks))
+
+        fetched: Dict[str, List[Candidate]] = {name: [] for name in to_fetch}
+        for candidate in (candidate for result in results for candidate in result):
+            fetched[candidate.subreddit].append(candidate)
+        if self.cache:
+            for name, candidates in fetched.items():
+                if not self.cache.is_invalid(name):
+                    self.cache.store_listing(name, candidates)
+        by_subreddit.update(fetched)
+
+        ranked = [
+            candidate
+            for name in subreddit_names
+            for candidate in sorted(by_subreddit.get(name, []), key=lambda c: -c.score)
+            if not self.cache or not self.cache.is_evaluated(candidate.submission_id)
+        ]
+        if self.cache:
+            self.cache.save()
+        logger.info(f"Discovered {len(ranked)} candidates in {len(subreddit_names)} subreddits "
+                    f"({len(to_fetch)} fetched, {skipped_invalid} known invalid) "
+                    f"with {self.request_count} requests in {time.perf_counter() - start:.1f}s")
+        return ranked
@@ -0,0 +1,135 @@
+"""
+Dependency-aware executor for workflow steps.
+
+Steps declare the steps they depend on and what a failure of each dependency
+means for them, and every step starts as soon as its dependencies have
+finished, so independent steps run concurrently.
+"""
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Collection, Dict, List, Optional, Sequence
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Edge policies: what a dependency's failure means for the step that depends on it
+REQUIRED = "required"  # the step is skipped unless the dependency succeeded
+OPTIONAL = "optional"  # the step runs once the dependency has finished, whatever its outcome
+
+# Step outcomes
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+@dataclass
+class Step:
+    """A workflow step and the steps it waits for."""
+    name: str
+    function: Callable[[Any], bool]  # called with the state shared by all steps
+    depends_on: Dict[str, str] = field(default_factory=dict)  # dependency name -> edge policy
+
+class StepGraph:
+    """Runs a DAG of steps, overlapping every step whose dependencies allow it."""
+
+    def __init__(self, steps: Sequence[Step]):
+        """
+        Initialize the graph and check that it is a valid DAG.
+
+        Args:
+            steps: Steps in any order
+
+        Raises:
+            ValueError: If a dependency is unknown, an edge policy is invalid
+                or the dependencies form a cycle
+        """
+        self.steps = {step.name: step for step in steps}
+        for step in steps:
+            for dependency, policy in step.depends_on.items():
+                if dependency not in self.steps:
+                    raise ValueError(f"Step '{step.name}' depends on unknown step '{dependency}'")
+                if policy not in (REQUIRED, OPTIONAL):
+                    raise ValueError(f"Invalid policy '{policy}' on edge {dependency} -> {step.name}")
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        """Order the steps so every step follows its dependencies."""
+        order: List[str] = []
+        remaining = dict(self.steps)
+        while remaining:
+            ready = [name for name, step in remaining.items()
+                     if all(dependency in order for dependency in step.depends_on)]
+            if not ready:
+                raise ValueError(f"Steps form a cycle: {', '.join(remaining)}")
+            for name in ready:
+                order.append(name)
+                del remaining[name]
+        return order
+
+    def _run_step(self, step: Step, context: Any) -> bool:
+        """Run one step, logging its outcome and duration."""
+        logger.info(f"Starting step: {step.name}")
+        start = time.perf_counter()
+        try:
+            result = bool(step.function(context))
+        except Exception as e:
+            logger.error(f"[ERROR] Step '{step.name}' failed with error: {str(e)}")
+            result = False
+        elapsed = time.perf_counter() - start
+        if result:
+            logger.info(f"[SUCCESS] Step '{step.name}' completed in {elapsed:.1f}s")
+        else:
+            logger.error(f"[FAILED] Step '{step.name}' failed after {elapsed:.1f}s")
+        return result
+
+    def run(self, context: Any, completed: Collection[str] = (),
+            on_success: Optional[Callable[[str], None]] = None) -> Dict[str, str]:
+        """
+        Run every step as soon as its dependencies allow.
+
+        Args:
+            context: State passed to every step function, such as a Job
+            completed: Steps that already succeeded in an earlier run; they
+                count as succeeded without running again
+            on_success: Called with the name of each step that succeeds, one
+                step at a time, e.g. to checkpoint its outputs
+
+        Returns:
+            Outcome of each step (SUCCEEDED, FAILED or SKIPPED), keyed by name
+        """
+        status: Dict[str, str] = {}
+        for name in self.order:
+            if name in completed:
+                logger.info(f"Step '{name}' already completed in an earlier run")
+                status[name] = SUCCEEDED
+        pending = [name for name in self.order if name not in status]
+        running: Dict[Future, str] = {}
+
+        with ThreadPoolExecutor(max_workers=len(self.steps) or 1) as pool:
+            while pending or running:
+                # Start or skip every step whose dependencies have all finished
+                for name in list(pending):
+                    step = self.steps[name]
+                    if not all(dependency in status for dependency in step.depends_on):
+                        continue
+                    pending.remove(name)
+                    blocked = [dependency for dependency, policy in step.depends_on.items()
+                               if policy == REQUIRED and status[dependency] != SUCCEEDED]
+                    if blocked:
+                        logger.warning(f"Skipping step '{name}': {', '.join(blocked)} did not succeed")
+                        status[name] = SKIPPED
+                    else:
+                        running[pool.submit(self._run_step, step, context)] = name
+
+                if not running:
+                    # Skips may have unblocked further steps (pending is in
+                    # topological order, so the next pass resolves them)
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    status[name] = SUCCEEDED if future.result() else FAILED
+                    if status[name] == SUCCEEDED and on_success is not None:
+                        on_success(name)
+        return status
@@ -0,0 +1,223 @@
+"""
+Yield-driven subreddit scheduling.
+
+Records how many Reddit API requests each subreddit costs and how many
+downloadable (and optionally published) videos it yields, then orders and
+samples subreddits with Thompson sampling so that requests go where they are
+most likely to produce a published video.
+
+Usage:
+    python subreddit_scheduler.py report [--top N]
+"""
+import argparse
+import json
+import logging
+import random
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import config
+import utils
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Gamma prior on videos per request: optimistic enough that new subreddits get tried
+PRIOR_SUCCESSES = 1.0
+PRIOR_REQUESTS = 1.0
+
+class SubredditScheduler:
+    """Persists per-subreddit yield statistics and schedules subreddits by them."""
+
+    def __init__(self, path: Path = config.SUBREDDIT_STATS_FILE,
+                 reward: str = config.SCHEDULER_REWARD,
+                 rng: Optional[random.Random] = None):
+        """
+        Initialize the scheduler, loading statistics from disk if present.
+
+        Args:
+            path: JSON file backing the statistics
+            reward: "download" to reward downloadable videos, or "publish" to
+                reward only videos that were uploaded successfully
+            rng: Random generator used for sampling
+        """
+        self.path = path
+        self.reward = reward
+        self.rng = rng or random.Random()
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        self.pending: Dict[str, str] = {}
+        self.load()
+
+    def load(self) -> None:
+        """Load statistics from disk, starting empty if missing or unreadable."""
+        content = utils.read_file_content(self.path) if self.path.exists() else ""
+        if not content:
+            return
+        try:
+            data = json.loads(content)
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable subreddit stats {self.path}: {e}")
+            return
+        self.stats = data.get("subreddits", {})
+        self.pending = data.get("pending", {})
+
+    def save(self) -> None:
+        """Write statistics to disk."""
+        utils.write_file_content(self.path, json.dumps({
+            "subreddits": self.stats,
+            "pending": self.pending,
+        }, indent=2))
+
+    def _entry(self, subreddit_name: str) -> Dict[str, Any]:
+        """Return the statistics of a subreddit, creating them if needed."""
+        return self.stats.setdefault(subreddit_name.lower(), {
+            "name": subreddit_name,
+            "requests": 0.0,
+            "downloads": 0,
+            "publishes": 0,
+            "last_scanned": 0.0,
+        })
+
+    def successes(self, subreddit_name: str) -> float:
+        """Rewarded outcomes recorded for a subreddit."""
+        entry = self.stats.get(subreddit_name.lower(), {})
+        return entry.get("publishes" if self.reward == "publish" else "downloads", 0)
+
+    def expected_yield(self, subreddit_name: str) -> float:
+        """Posterior mean of rewarded videos per request."""
+        entry = self.stats.get(subreddit_name.lower(), {})
+        return ((PRIOR_SUCCESSES + self.successes(subreddit_name))
+                / (PRIOR_REQUESTS + entry.get("requests", 0.0)))
+
+    def sample_yield(self, subreddit_name: str) -> float:
+        """Draw a plausible videos-per-request rate from the posterior."""
+        entry = self.stats.get(subreddit_name.lower(), {})
+        shape = PRIOR_SUCCESSES + self.successes(subreddit_name)
+        rate = PRIOR_REQUESTS + entry.get("requests", 0.0)
+        return self.rng.gammavariate(shape, 1.0 / rate)
+
+    def schedule(self, subreddit_names: Sequence[str],
+                 budget: int = config.DISCOVERY_SUBREDDITS_PER_RUN) -> List[str]:
+        """
+        Order subreddits by a Thompson sample of their yield and keep the best.
+
+        Args:
+            subreddit_names: All configured subreddits
+            budget: Number of subreddits to scan this run (0 scans all of them)
+
+        Returns:
+            Subreddits to scan, most promising first
+        """
+        samples = {name: self.sample_yield(name) for name in subreddit_names}
+        ordered = sorted(subreddit_names, key=lambda name: -samples[name])
+        return ordered[:budget] if budget > 0 else ordered
+
+    def record_requests(self, request_costs: Mapping[str, float]) -> None:
+        """Add the API requests spent on each subreddit during discovery."""
+        now = time.time()
+        for name, cost in request_costs.items():
+            entry = self._entry(name)
+            entry["requests"] += cost
+            entry["last_scanned"] = now
+
+    def record_download(self, subreddit_name: str, submission_id: str) -> None:
+        """Credit a subreddit with a downloaded video awaiting upload."""
+        self._entry(subreddit_name)["downloads"] += 1
+        self.pending[submission_id] = subreddit_name
+
+    def record_publish(self, submission_id: str) -> bool:
+        """
+        Credit the source subreddit of a submission with a published video.
+
+        Args:
+            submission_id: Reddit submission ID of the uploaded video
+
+        Returns:
+            True if the submission was known and credited
+        """
+        subreddit_name = self.pending.pop(submission_id, None)
+        if subreddit_name is None:
+            return False
+        self._entry(subreddit_name)["publishes"] += 1
+        return True
+
+    def record_rejection(self, submission_id: str) -> bool:
+        """
+        Withdraw the download credit of a video that was rejected before upload.
+
+        Args:
+            submission_id: Reddit submission ID of the rejected video
+
+        Returns:
+            True if the submission was known and its credit withdrawn
+        """
+        subreddit_name = self.pending.pop(submission_id, None)
+        if subreddit_name is None:
+            return False
+        entry = self._entry(subreddit_name)
+        entry["downloads"] = max(0, entry["downloads"] - 1)
+        return True
+
+def record_publish(submission_id: str) -> None:
+    """Credit a published video to its subreddit and persist the statistics."""
+    if not submission_id:
+        return
+    try:
+        scheduler = SubredditScheduler()
+        if scheduler.record_publish(submission_id):
+            scheduler.save()
+    except Exception as e:
+        logger.warning(f"Failed to record publish for {submission_id}: {str(e)}")
+
+def record_rejection(submission_id: str) -> None:
+    """Withdraw a rejected video's credit from its subreddit and persist the statistics."""
+    if not submission_id:
+        return
+    try:
+        scheduler = SubredditScheduler()
+        if scheduler.record_rejection(submission_id):
+            scheduler.save()
+    except Exception as e:
+        logger.warning(f"Failed to record rejection for {submission_id}: {str(e)}")
+
+def print_report(top: int = 0) -> None:
+    """
+    Print per-subreddit statistics, highest expected yield first.
+
+    Args:
+        top: Number of subreddits to show (0 shows all)
+    """
+    scheduler = SubredditScheduler()
+    names = sorted((entry["name"] for entry in scheduler.stats.values()),
+                   key=lambda name: -scheduler.expected_yield(name))
+    if top > 0:
+        names = names[:top]
+
+    print(f"{'subreddit':<30} {'requests':>9} {'downloads':>9} {'published':>9} "
+          f"{'yield/req':>9} {'last scanned':>17}")
+    for name in names:
+        entry = scheduler.stats[name.lower()]
+        scanned = (time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["last_scanned"]))
+                   if entry["last_scanned"] else "never")
+        print(f"{name:<30} {entry['requests']:>9.1f} {entry['downloads']:>9} "
+              f"{entry['publishes']:>9} {scheduler.expected_yield(name):>9.3f} {scanned:>17}")
+
+    total_requests = sum(entry["requests"] for entry in scheduler.stats.values())
+    total_publishes = sum(entry["publishes"] for entry in scheduler.stats.values())
+    if total_publishes:
+        print(f"\n{total_requests / total_publishes:.1f} API requests per published video")
+
+def main() -> None:
+    """Parse command-line arguments and run the selected command."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    report_parser = subparsers.add_parser("report", help="Show per-subreddit yield statistics")
+    report_parser.add_argument("--top", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == "report":
+        print_report(args.top)
+
+if __name__ == "__main__":
+    main()
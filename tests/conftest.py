@@ -0,0 +1,56 @@
+"""
+Shared test setup.
+
+config reads credentials from the environment and, like utils, creates its
+files relative to the working directory, so the tests run with dummy
+credentials in a temporary directory.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+for name in ("REDDIT_CLIENT_ID", "REDDIT_CLIENT_SECRET", "YOUTUBE_CLIENT_ID",
+             "YOUTUBE_CLIENT_SECRET", "YOUTUBE_PROJECT_ID", "INSTAGRAM_USERNAME",
+             "INSTAGRAM_PASSWORD"):
+    os.environ.setdefault(name, "test")
+os.chdir(tempfile.mkdtemp(prefix="subreddit2yt-tests-"))
+
+import config  # noqa: E402
+from job import Job  # noqa: E402
+from reddit_discovery import Candidate  # noqa: E402
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Run every test in its own directory with its own job scratch directory."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "JOB_SCRATCH_DIR", tmp_path / "Jobs")
+    return tmp_path
+
+@pytest.fixture
+def make_candidate():
+    """Factory for discovery candidates with a v.redd.it link unless one is given."""
+    def make(submission_id: str = "abc123", subreddit: str = "videos", title: str = "",
+             score: int = 10, media_url: str = "", crosspost_parent=None) -> Candidate:
+        return Candidate(submission_id, subreddit, title or f"Title of {submission_id}",
+                         media_url or f"https://v.redd.it/{submission_id}", score,
+                         1700000000.0, False, crosspost_parent, f"https://redd.it/{submission_id}")
+    return make
+
+@pytest.fixture
+def make_job(make_candidate):
+    """Factory for jobs of a candidate, with generated metadata and a registered video."""
+    def make(submission_id: str = "abc123") -> Job:
+        job = Job.from_candidate(make_candidate(submission_id, score=42, title="A title"))
+        job.video_file = job.register_artifact(job.scratch_dir / "clip.mp4")
+        job.title = "Generated title"
+        job.description = "Description"
+        job.hashtags = "#a, #b"
+        job.youtube_id = "yt1"
+        return job
+    return make
@@ -0,0 +1,102 @@
+"""Tests for checkpoint.py."""
+import os
+import subprocess
+import sys
+
+import config
+from checkpoint import Checkpoint, evict_stale_checkpoints, find_resumable
+from job import Job
+from ledger import Ledger
+
+from conftest import ROOT
+
+def save_checkpoint(submission_id: str = "abc123", completed=("select",), attempts: int = 1) -> Checkpoint:
+    checkpoint = Checkpoint(Job(submission_id, "videos", "A title"), completed, attempts)
+    assert checkpoint.save()
+    return checkpoint
+
+def test_mark_completed_saves():
+    checkpoint = Checkpoint(Job("abc123"))
+    checkpoint.mark_completed("select")
+    checkpoint.mark_completed("download")
+    checkpoint.mark_completed("download")
+    loaded = Checkpoint.load(checkpoint.job.scratch_dir)
+    assert loaded.completed == ["select", "download"]
+    assert loaded.job.submission_id == "abc123"
+
+def test_load_without_checkpoint(tmp_path):
+    assert Checkpoint.load(tmp_path) is None
+
+def test_load_ignores_corrupt_checkpoint():
+    checkpoint = save_checkpoint()
+    checkpoint.path.write_text("{not json")
+    assert Checkpoint.load(checkpoint.job.scratch_dir) is None
+
+def test_find_resumable_counts_attempt():
+    save_checkpoint()
+    resumed = find_resumable(config.JOB_SCRATCH_DIR)
+    assert resumed.job.submission_id == "abc123"
+    assert resumed.attempts == 2
+    assert resumed.completed == ["select"]
+    assert resumed.job.owner.held
+    assert Checkpoint.load(resumed.job.scratch_dir).attempts == 2
+
+def test_find_resumable_picks_newest():
+    old = save_checkpoint("old")
+    os.utime(old.path, (1, 1))
+    save_checkpoint("new")
+    assert find_resumable(config.JOB_SCRATCH_DIR).job.submission_id == "new"
+
+def test_find_resumable_abandons_exhausted_job():
+    checkpoint = save_checkpoint(attempts=config.CHECKPOINT_MAX_ATTEMPTS)
+    assert find_resumable(config.JOB_SCRATCH_DIR) is None
+    assert not checkpoint.job.scratch_dir.exists()
+
+def test_find_resumable_abandons_rejected_job():
+    checkpoint = save_checkpoint()
+    ledger = Ledger()
+    ledger.record_rejected("abc123", "duplicate")
+    ledger.close()
+    assert find_resumable(config.JOB_SCRATCH_DIR) is None
+    assert not checkpoint.job.scratch_dir.exists()
+
+def test_eviction_skips_owned_directory():
+    owned = save_checkpoint("owned")
+    stale = save_checkpoint("stale")
+    assert owned.job.claim()
+    assert evict_stale_checkpoints(config.JOB_SCRATCH_DIR, max_age_hours=0, max_mb=0) == 1
+    assert owned.job.scratch_dir.exists()
+    assert not stale.job.scratch_dir.exists()
+
+RESUME_AND_WAIT = """
+import sys
+from pathlib import Path
+
+from checkpoint import find_resumable
+
+checkpoint = find_resumable(Path(sys.argv[1]))
+print(checkpoint.job.submission_id if checkpoint else "none", flush=True)
+sys.stdin.readline()
+"""
+
+def test_two_processes_share_scratch_root(tmp_path):
+    """A job resumed by a live process is neither resumed nor evicted by another one."""
+    checkpoint = save_checkpoint()
+    scratch_dir = config.JOB_SCRATCH_DIR
+    env = dict(os.environ, PYTHONPATH=str(ROOT), JOB_SCRATCH_DIR=str(scratch_dir))
+    other = subprocess.Popen([sys.executable, "-c", RESUME_AND_WAIT, str(scratch_dir)],
+                             cwd=tmp_path, env=env, stdin=subprocess.PIPE,
+                             stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        assert other.stdout.readline().strip() == "abc123"
+
+        assert find_resumable(scratch_dir) is None
+        assert evict_stale_checkpoints(scratch_dir, max_age_hours=0, max_mb=0) == 0
+        assert checkpoint.job.scratch_dir.exists()
+    finally:
+        other.communicate("\n", timeout=30)
+
+    # The other process has exited, so its job can be taken over
+    resumed = find_resumable(scratch_dir)
+    assert resumed.job.submission_id == "abc123"
+    assert resumed.attempts == 3
@@ -0,0 +1,121 @@
+"""Tests for dedup_index.py."""
+import subprocess
+
+import pytest
+
+import config
+import ffmpeg_utils
+import media_analysis
+from dedup_index import (DedupIndex, _fingerprint_chunk_keys, estimated_similarity,
+                         normalize_media_url, normalize_title, title_signature)
+
+@pytest.fixture
+def index(tmp_path):
+    index = DedupIndex(tmp_path / "dedup_index.db")
+    yield index
+    index.close()
+
+@pytest.mark.parametrize("url", [
+    "https://youtu.be/abc",
+    "https://www.youtube.com/watch?v=abc&t=10",
+    "https://m.youtube.com/shorts/abc/",
+    "https://youtube.com/embed/abc",
+])
+def test_youtube_links_share_a_key(url):
+    assert normalize_media_url(url) == "youtube:abc"
+
+def test_vreddit_and_other_hosts():
+    assert normalize_media_url("https://v.redd.it/xyz/DASH_720.mp4") == "vreddit:xyz"
+    assert normalize_media_url("https://www.Example.com/clip/?s=1") == "example.com/clip"
+
+def test_title_signature():
+    assert normalize_title("  Dog DOES a   backflip!!! ") == "dog does a backflip"
+    assert title_signature("short") is None
+    signature = title_signature("Dog does a backflip off the couch")
+    assert len(signature) == config.DEDUP_MINHASH_BANDS * config.DEDUP_MINHASH_ROWS
+    assert signature == title_signature("DOG does a backflip, off the couch!")
+    assert estimated_similarity(signature, signature) == 1.0
+
+def test_similar_titles_score_higher_than_unrelated_ones():
+    base = title_signature("Dog does a backflip off the couch")
+    close = title_signature("Dog does a backflip off the couch again")
+    unrelated = title_signature("Sunset timelapse over the mountains")
+    assert estimated_similarity(base, close) > estimated_similarity(base, unrelated)
+    assert estimated_similarity(base, unrelated) < 0.3
+
+def test_same_media_is_duplicate(index, make_candidate):
+    index.add(make_candidate("a1", title="Dog does a backflip off the couch", media_url="https://youtu.be/abc"))
+    repost = make_candidate("b2", title="Totally different words here", media_url="https://www.youtube.com/watch?v=abc")
+    assert index.find_duplicate(repost) == "same media as a1"
+
+def test_submission_is_not_its_own_duplicate(index, make_candidate):
+    original = make_candidate("a1", title="Dog does a backflip off the couch")
+    index.add(original)
+    assert index.find_duplicate(original) is None
+
+def test_crosspost_is_duplicate(index, make_candidate):
+    index.add(make_candidate("a1", title="Dog does a backflip off the couch"))
+    crosspost = make_candidate("b2", title="Look at this", crosspost_parent="t3_a1")
+    assert index.find_duplicate(crosspost) == "crosspost of a1"
+
+def test_reposted_title_is_found_through_lsh(index, make_candidate):
+    index.add(make_candidate("a1", title="Dog does a backflip off the couch"))
+    repost = make_candidate("b2", title="dog does a backflip off the couch!!")
+    assert index.find_duplicate(repost).endswith("similar to a1")
+
+def test_unrelated_title_is_not_duplicate(index, make_candidate):
+    index.add(make_candidate("a1", title="Dog does a backflip off the couch"))
+    assert index.find_duplicate(make_candidate("b2", title="Sunset timelapse over the mountains")) is None
+
+FINGERPRINT_BITS = config.VIDEO_FINGERPRINT_FRAMES * 64
+
+def flip_bits(fingerprint: int, count: int, step: int = 7) -> int:
+    """Flip count bits spread over the whole fingerprint."""
+    for index in range(count):
+        fingerprint ^= 1 << (index * step % FINGERPRINT_BITS)
+    return fingerprint
+
+FINGERPRINT = int.from_bytes(bytes(range(FINGERPRINT_BITS // 8)), "big")
+
+def test_fingerprint_chunks_cover_every_bit():
+    keys = _fingerprint_chunk_keys(FINGERPRINT)
+    assert len(keys) == config.VIDEO_FINGERPRINT_MAX_DISTANCE + 1
+    assert len(set(keys)) == len(keys)
+    assert _fingerprint_chunk_keys(0) != _fingerprint_chunk_keys(1 << (FINGERPRINT_BITS - 1))
+
+def test_pigeonhole_keeps_a_chunk_within_max_distance():
+    near = flip_bits(FINGERPRINT, config.VIDEO_FINGERPRINT_MAX_DISTANCE)
+    assert set(_fingerprint_chunk_keys(FINGERPRINT)) & set(_fingerprint_chunk_keys(near))
+
+def test_only_published_fingerprints_match(index):
+    index.add_video("a1", FINGERPRINT)
+    near = flip_bits(FINGERPRINT, 5)
+    assert index.find_similar_video(near) is None
+    index.mark_published("a1")
+    assert index.find_similar_video(near) == ("a1", 5)
+    assert index.find_similar_video(near, exclude="a1") is None
+
+def test_distant_fingerprint_does_not_match(index):
+    index.add_video("a1", FINGERPRINT)
+    index.mark_published("a1")
+    far = flip_bits(FINGERPRINT, config.VIDEO_FINGERPRINT_MAX_DISTANCE + 1)
+    assert index.find_similar_video(far) is None
+
+def test_closest_match_wins(index):
+    index.add_video("a1", flip_bits(FINGERPRINT, 10))
+    index.add_video("b2", flip_bits(FINGERPRINT, 3))
+    index.mark_published("a1")
+    index.mark_published("b2")
+    assert index.find_similar_video(FINGERPRINT) == ("b2", 3)
+
+def test_add_video_replaces_fingerprint(index):
+    index.add_video("a1", FINGERPRINT)
+    index.add_video("a1", ~FINGERPRINT & ((1 << FINGERPRINT_BITS) - 1))
+    index.mark_published("a1")
+    assert index.find_similar_video(FINGERPRINT) is None
+
+def test_undecodable_clip_raises(monkeypatch, tmp_path):
+    monkeypatch.setattr(ffmpeg_utils, "run_ffmpeg",
+                        lambda args: subprocess.CompletedProcess(args, 0, stdout=b"", stderr=b""))
+    with pytest.raises(RuntimeError):
+        media_analysis.video_fingerprint(tmp_path / "clip.mp4", 10.0)
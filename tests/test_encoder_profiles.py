@@ -0,0 +1,42 @@
+"""Tests for encoder_profiles.py."""
+import json
+
+import config
+import encoder_profiles
+from encoder_profiles import DEFAULT_PROFILE, resolve_profile, select_profile
+
+CALIBRATION = {"archive": 20.0, "balanced": 60.0, "fast": 200.0}
+
+def test_select_profile_takes_best_quality_within_budget():
+    # 3600 frames: archive needs 180s, balanced 60s, fast 18s
+    assert select_profile(3600, 200, CALIBRATION).name == "archive"
+    assert select_profile(3600, 100, CALIBRATION).name == "balanced"
+    assert select_profile(3600, 30, CALIBRATION).name == "fast"
+
+def test_select_profile_falls_back_to_fastest_over_budget():
+    assert select_profile(3600, 1, CALIBRATION).name == "fast"
+
+def test_select_profile_skips_uncalibrated_profiles():
+    assert select_profile(3600, 200, {"balanced": 60.0, "fast": 200.0}).name == "balanced"
+
+def test_select_profile_uses_default_without_calibration():
+    assert select_profile(3600, 200, {}).name == DEFAULT_PROFILE
+
+def test_resolve_profile_by_name_ignores_calibration(monkeypatch):
+    def unexpected(*args, **kwargs):
+        raise AssertionError("a named profile needs no calibration")
+    monkeypatch.setattr(encoder_profiles, "select_profile", unexpected)
+    profile = resolve_profile("fast", 3600)
+    assert (profile.name, profile.preset, profile.crf) == ("fast", "veryfast", 23)
+    assert resolve_profile("no-such-profile", 3600).name == DEFAULT_PROFILE
+
+def test_resolve_auto_reads_calibration_file(monkeypatch, tmp_path):
+    calibration_file = tmp_path / "encoder_calibration.json"
+    calibration_file.write_text(json.dumps({"fps": CALIBRATION}), encoding="utf-8")
+    monkeypatch.setattr(config, "ENCODER_CALIBRATION_FILE", calibration_file)
+    assert resolve_profile("auto", 3600, budget_seconds=100).name == "balanced"
+
+def test_profile_threads_reach_ffmpeg_args(monkeypatch):
+    monkeypatch.setattr(config, "ENCODER_THREADS", 2)
+    assert resolve_profile("balanced", 0).ffmpeg_args() == ["-preset", "medium", "-crf", "21",
+                                                             "-threads", "2"]
@@ -0,0 +1,87 @@
+"""Tests for the probing and format selection in GetVid.py, without contacting any host."""
+import pytest
+
+import GetVid
+
+class FakeYoutubeDL:
+    """Stand-in for yt_dlp.YoutubeDL whose extract_info runs a given function."""
+
+    extract = None
+
+    def __init__(self, options):
+        self.options = options
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def extract_info(self, url, download=False):
+        return FakeYoutubeDL.extract(url)
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(GetVid.yt_dlp, "YoutubeDL", FakeYoutubeDL)
+    session = GetVid.DiscoverySession()
+    yield session
+    session.close()
+
+def video_info(duration: float = 30, filesize: int = 1024) -> dict:
+    return {"duration": duration, "vcodec": "avc1", "acodec": "mp4a", "width": 1080,
+            "height": 1920, "filesize": filesize}
+
+def test_probe_does_not_hold_the_session_lock_during_extraction(session, make_candidate):
+    def extract(url):
+        assert not session.lock.locked()
+        return video_info()
+    FakeYoutubeDL.extract = extract
+    candidate = make_candidate("clip1")
+    assert session.probe(candidate) is not None
+    assert "clip1" in session.probe_cache
+
+def test_failed_probe_is_retried_later(session, make_candidate):
+    def extract(url):
+        raise ConnectionError("timed out")
+    FakeYoutubeDL.extract = extract
+    candidate = make_candidate("clip1")
+    assert session.probe(candidate) is None
+    assert not session.listing_cache.is_evaluated("clip1")
+    assert "clip1" not in session.probe_cache
+
+@pytest.mark.parametrize("info", [video_info(duration=100000),
+                                  video_info(filesize=10 ** 12)])
+def test_rejected_probe_is_remembered(session, make_candidate, info):
+    FakeYoutubeDL.extract = lambda url: info
+    candidate = make_candidate("clip1")
+    assert session.probe(candidate) is None
+    assert session.listing_cache.is_evaluated("clip1")
+    assert session.probe_cache["clip1"]["rejected"]
+
+def video_format(width: int, height: int, megabytes: float) -> dict:
+    return {"format_id": f"{height}p", "width": width, "height": height, "vcodec": "avc1",
+            "acodec": "none", "filesize": int(megabytes * 1024 * 1024), "protocol": "https"}
+
+AUDIO = {"format_id": "audio", "vcodec": "none", "acodec": "mp4a", "filesize": 1024 * 1024,
+         "protocol": "https"}
+
+def select(selector: GetVid.ShortsFormatSelector, formats: list) -> list:
+    chosen = next(selector({"formats": [*formats, AUDIO]}))
+    return [fmt["format_id"] for fmt in chosen["requested_formats"]]
+
+LANDSCAPE = [video_format(640, 360, 2), video_format(1280, 720, 5), video_format(1920, 1080, 10),
+             video_format(2560, 1440, 20), video_format(3840, 2160, 60)]
+
+def test_selector_stops_landscape_sources_at_1440p():
+    selector = GetVid.ShortsFormatSelector(max_bytes=500 * 1024 * 1024)
+    assert select(selector, LANDSCAPE) == ["1440p", "audio"]
+    assert selector.bytes_saved == 40 * 1024 * 1024
+
+def test_selector_takes_full_height_portrait_sources():
+    portrait = [video_format(720, 1280, 5), video_format(1080, 1920, 10), video_format(1440, 2560, 20)]
+    selector = GetVid.ShortsFormatSelector(max_bytes=500 * 1024 * 1024)
+    assert select(selector, portrait) == ["1920p", "audio"]
+
+def test_selector_takes_sharpest_affordable_source_over_budget():
+    selector = GetVid.ShortsFormatSelector(max_bytes=15 * 1024 * 1024)
+    assert select(selector, LANDSCAPE) == ["1080p", "audio"]
@@ -0,0 +1,49 @@
+"""Tests for job.py."""
+import config
+from job import Job
+
+def test_dict_round_trip(make_job):
+    job = make_job()
+    restored = Job.from_dict(job.to_dict())
+    assert restored.to_dict() == job.to_dict()
+    assert restored.candidate == job.candidate
+    assert restored.video_file == job.video_file
+    assert restored.artifacts == [job.video_file]
+
+def test_to_dict_leaves_out_probe_info(make_job):
+    job = make_job()
+    job.probe_info = {"url": "https://expiring"}
+    assert "probe_info" not in job.to_dict()
+    assert Job.from_dict(job.to_dict()).probe_info is None
+
+def test_from_dict_without_optional_fields():
+    job = Job.from_dict({"submission_id": "abc123"})
+    assert job.candidate is None and job.video_file is None and job.artifacts == []
+
+def test_scratch_dir_needs_submission_id(make_job):
+    job = make_job()
+    assert job.scratch_dir == config.JOB_SCRATCH_DIR / "abc123"
+    try:
+        Job().scratch_dir
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("scratch_dir of a job without submission ID")
+
+def test_cleanup_deletes_owned_scratch_dir(make_job):
+    job = make_job()
+    assert job.claim()
+    job.video_file.write_bytes(b"video")
+    (job.scratch_dir / "encode.tmp").write_bytes(b"partial")
+    assert job.cleanup()
+    assert not job.scratch_dir.exists()
+
+def test_cleanup_keeps_scratch_dir_owned_by_another_job(make_job):
+    owner, other = make_job(), make_job()
+    assert owner.claim()
+    assert not other.claim()
+    owner.video_file.write_bytes(b"video")
+    assert not other.cleanup()
+    assert owner.video_file.exists()
+    assert owner.cleanup()
+    assert not owner.scratch_dir.exists()
@@ -0,0 +1,74 @@
+"""Tests for ledger.py."""
+import threading
+
+import pytest
+
+from ledger import STATE_DOWNLOADED, STATE_PROCESSED, STATE_PUBLISHED, STATE_REJECTED, Ledger
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = Ledger(tmp_path / "ledger.db")
+    yield ledger
+    ledger.close()
+
+def test_unknown_submission(ledger):
+    assert not ledger.has("abc123")
+    assert ledger.get("abc123") is None
+
+def test_state_transitions_keep_earlier_fields(ledger):
+    ledger.record_download("abc123", "videos", "A title")
+    assert ledger.get("abc123")["state"] == STATE_DOWNLOADED
+
+    ledger.record_processed("abc123")
+    ledger.record_youtube("abc123", "yt1")
+    ledger.record_instagram("abc123", "ig1")
+    row = ledger.get("abc123")
+    assert ledger.has("abc123")
+    assert row["state"] == STATE_PUBLISHED
+    assert (row["subreddit"], row["title"]) == ("videos", "A title")
+    assert (row["youtube_id"], row["instagram_id"]) == ("yt1", "ig1")
+    assert row["downloaded_at"] and row["processed_at"]
+
+def test_record_processed_state(ledger):
+    ledger.record_processed("abc123")
+    assert ledger.get("abc123")["state"] == STATE_PROCESSED
+
+def test_record_rejected_keeps_reason(ledger):
+    ledger.record_download("abc123")
+    ledger.record_rejected("abc123", "Clip is mostly static")
+    row = ledger.get("abc123")
+    assert row["state"] == STATE_REJECTED
+    assert row["reason"] == "Clip is mostly static"
+
+def test_reopen_keeps_rows(ledger, tmp_path):
+    ledger.record_download("abc123")
+    reopened = Ledger(tmp_path / "ledger.db")
+    try:
+        assert reopened.has("abc123")
+    finally:
+        reopened.close()
+
+def test_concurrent_writes(ledger):
+    def download(start):
+        for index in range(start, start + 50):
+            ledger.record_download(f"id{index}")
+    threads = [threading.Thread(target=download, args=(start,)) for start in range(0, 200, 50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(ledger.has(f"id{index}") for index in range(200))
+
+def test_migrate_text_files_is_idempotent(ledger, tmp_path):
+    downloaded = tmp_path / "downloaded_ids.txt"
+    downloaded.write_text("a1\n\nb2\na1\n", encoding="utf-8")
+    youtube = tmp_path / "youtube_video_ids.txt"
+    youtube.write_text("yt1\nyt2\n", encoding="utf-8")
+
+    assert ledger.migrate_text_files(downloaded, youtube) == {"submissions": 2, "youtube_ids": 2}
+    assert ledger.migrate_text_files(downloaded, youtube) == {"submissions": 0, "youtube_ids": 0}
+    assert ledger.get("a1")["state"] == STATE_DOWNLOADED
+
+def test_migrate_missing_files(ledger, tmp_path):
+    counts = ledger.migrate_text_files(tmp_path / "none.txt", tmp_path / "none2.txt")
+    assert counts == {"submissions": 0, "youtube_ids": 0}
@@ -0,0 +1,133 @@
+"""Tests for media_analysis.py."""
+import shutil
+import subprocess
+
+import pytest
+
+import config
+import ffmpeg_utils
+import media_analysis
+
+needs_ffmpeg = pytest.mark.skipif(
+    shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None,
+    reason="ffmpeg and ffprobe are needed to encode and inspect test clips",
+)
+
+def encode_clip(path, duration: float, source: str = "testsrc2=size=360x640:rate=30",
+                keyint: int = 250):
+    """Encode a synthetic clip with x264's default keyframe interval."""
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                    "-f", "lavfi", "-i", source, "-t", str(duration),
+                    "-c:v", "libx264", "-preset", "ultrafast", "-g", str(keyint),
+                    "-pix_fmt", "yuv420p", str(path)], check=True)
+    return path
+
+def test_keyframe_sample_times_clamp_to_preceding_keyframe(monkeypatch, tmp_path):
+    monkeypatch.setattr(ffmpeg_utils, "keyframe_times", lambda path: [0.0, 8.333, 16.667])
+    times = media_analysis.keyframe_sample_times(tmp_path / "clip.mp4", 10.0, 8)
+    assert times == [0.0] * 7 + [8.333]
+
+def test_keyframe_sample_times_fall_back_to_start(monkeypatch, tmp_path):
+    def fail(path):
+        raise RuntimeError("ffprobe failed")
+    monkeypatch.setattr(ffmpeg_utils, "keyframe_times", fail)
+    assert media_analysis.keyframe_sample_times(tmp_path / "clip.mp4", 10.0, 3) == [0.0] * 3
+
+def test_sample_keyframes_drops_failed_candidates(monkeypatch, tmp_path):
+    def read(path, timestamp, width, height, count, keyframe_only=False):
+        if timestamp > 5:
+            raise RuntimeError("No frames decoded")
+        return media_analysis.np.full((count, height, width), int(timestamp), dtype="uint8")
+    monkeypatch.setattr(media_analysis, "_read_frames", read)
+    times, frames = media_analysis.sample_keyframes(tmp_path / "clip.mp4", [0.0, 2.0, 2.0, 9.0], 4, 2)
+    assert times == [0.0, 2.0]
+    assert frames.shape == (2, 2, 4)
+    with pytest.raises(RuntimeError):
+        media_analysis.sample_keyframes(tmp_path / "clip.mp4", [9.0], 4, 2)
+
+@needs_ffmpeg
+def test_thumbnail_of_clip_with_few_keyframes(tmp_path):
+    """Samples after the last keyframe (8.33s of 10s) used to decode nothing."""
+    clip = encode_clip(tmp_path / "clip.mp4", 10)
+    assert len(ffmpeg_utils.keyframe_times(clip)) == 2
+    thumbnail = tmp_path / "clip.jpg"
+    timestamp = media_analysis.extract_thumbnail(clip, 10.0, thumbnail)
+    assert timestamp in (0.0, pytest.approx(8.333, abs=0.01))
+    assert thumbnail.stat().st_size > 0
+
+@needs_ffmpeg
+def test_fingerprint_survives_reencode_with_other_keyframes(tmp_path):
+    """Fingerprints must not depend on where the encoder placed keyframes."""
+    clip = encode_clip(tmp_path / "clip.mp4", 12, source="mandelbrot=size=320x180:rate=30")
+    reencoded = tmp_path / "reencoded.mp4"
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", str(clip),
+                    "-vf", "scale=240:136", "-c:v", "libx264", "-preset", "ultrafast",
+                    "-crf", "30", "-g", "45", str(reencoded)], check=True)
+    other = encode_clip(tmp_path / "other.mp4", 12)
+
+    fingerprint = media_analysis.video_fingerprint(clip, 12.0)
+    distance = media_analysis.hamming_distance(
+        fingerprint, media_analysis.video_fingerprint(reencoded, 12.0))
+    assert distance <= config.VIDEO_FINGERPRINT_MAX_DISTANCE
+    assert media_analysis.hamming_distance(
+        fingerprint, media_analysis.video_fingerprint(other, 12.0)) > config.VIDEO_FINGERPRINT_MAX_DISTANCE
+
+def test_content_rejection_reasons():
+    passing = media_analysis.ContentMetrics(motion=0.02, black_fraction=0.0, loudness_db=-20.0)
+    assert media_analysis.content_rejection_reason(passing) is None
+    assert media_analysis.content_rejection_reason(
+        media_analysis.ContentMetrics(0.02, 0.9, -20.0)).startswith("mostly black")
+    assert media_analysis.content_rejection_reason(
+        media_analysis.ContentMetrics(config.MIN_MOTION / 2, 0.0, -20.0)).startswith("mostly static")
+    assert media_analysis.content_rejection_reason(
+        media_analysis.ContentMetrics(0.02, 0.0, -90.0)).startswith("silent")
+    assert media_analysis.content_rejection_reason(
+        media_analysis.ContentMetrics(0.02, 0.0, None)) is None
+
+@needs_ffmpeg
+def test_motion_separates_still_from_slow_pan(tmp_path):
+    still = tmp_path / "still.png"
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-f", "lavfi",
+                    "-i", "testsrc2=size=360x640", "-frames:v", "1", str(still)], check=True)
+    def encode(name, video_filter):
+        path = tmp_path / name
+        subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-loop", "1",
+                        "-i", str(still), "-vf", f"{video_filter},format=yuv420p", "-r", "30",
+                        "-t", "10", "-c:v", "libx264", "-preset", "ultrafast", str(path)], check=True)
+        return path
+
+    grainy = media_analysis.analyze_content(encode("grainy.mp4", "noise=alls=6:allf=t"), 10.0, False)
+    # A pan of 4 pixels per second across a 640-pixel frame
+    pan = media_analysis.analyze_content(encode("pan.mp4", "crop=360:360:0:'t*4'"), 10.0, False)
+    assert grainy.motion < config.MIN_MOTION < pan.motion
+    assert grainy.black_fraction == 0.0 and grainy.loudness_db is None
+
+def test_motion_profile_spreads_keyframe_changes_over_bins(monkeypatch, tmp_path):
+    frames = media_analysis.np.array([0, 0, 51, 51], dtype="uint8")[:, None, None]
+    monkeypatch.setattr(media_analysis, "decode_keyframe_proxy", lambda path, size: frames)
+    motion = media_analysis.motion_profile(tmp_path / "clip.mp4", 4.0, 2, [0.0, 1.0, 2.0, 3.0])
+    assert motion.tolist() == [0.0, 0.0, 51.0, 51.0, 0.0, 0.0, 0.0, 0.0]
+
+def test_motion_profile_decodes_proxy_for_sparse_keyframes(monkeypatch, tmp_path):
+    def unexpected(path, size):
+        raise AssertionError("keyframes are too far apart to be decoded alone")
+    proxy = media_analysis.np.array([0, 10, 10], dtype="uint8")[:, None, None]
+    monkeypatch.setattr(media_analysis, "decode_keyframe_proxy", unexpected)
+    monkeypatch.setattr(media_analysis, "decode_proxy", lambda path, duration, rate, size: proxy)
+    motion = media_analysis.motion_profile(tmp_path / "clip.mp4", 6.0, 0.5, [0.0, 4.0])
+    assert motion.tolist() == [0.0, 10.0, 0.0]
+
+@needs_ffmpeg
+@pytest.mark.parametrize("keyint", [30, 250])
+def test_best_window_finds_pan_between_stills(tmp_path, keyint):
+    still = tmp_path / "still.png"
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-f", "lavfi",
+                    "-i", "testsrc2=size=640x640", "-frames:v", "1", str(still)], check=True)
+    clip = tmp_path / "clip.mp4"
+    # Still for 12s, panning from 12s to 20s, still again until 30s
+    pan = "crop=360:640:x='min(max(t-12,0),8)*30':y=0"
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-loop", "1",
+                    "-i", str(still), "-vf", f"{pan},noise=alls=6:allf=t,format=yuv420p",
+                    "-r", "30", "-t", "30", "-c:v", "libx264", "-preset", "ultrafast",
+                    "-g", str(keyint), "-sc_threshold", "0", str(clip)], check=True)
+    assert 10.0 <= media_analysis.best_window_start(clip, 30.0, 10.0, False) <= 13.0
@@ -0,0 +1,59 @@
+"""Tests for the publish quota that bounds pipeline.BatchPipeline."""
+import random
+import threading
+
+from pipeline import PublishQuota
+
+def acquire_in_thread(quota: PublishQuota):
+    """Start acquiring in a thread; returns the thread and the list its result lands in."""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(quota.acquire()), daemon=True)
+    thread.start()
+    return thread, result
+
+def test_acquire_waits_while_slots_could_still_meet_the_quota():
+    quota = PublishQuota(2)
+    assert quota.acquire() and quota.acquire()
+    thread, result = acquire_in_thread(quota)
+    thread.join(0.1)
+    assert thread.is_alive()
+    # A failed video frees its slot for another candidate
+    quota.release(False)
+    thread.join(1)
+    assert result == [True]
+
+def test_waiters_are_turned_away_once_the_quota_is_met():
+    quota = PublishQuota(1)
+    assert quota.acquire()
+    thread, result = acquire_in_thread(quota)
+    thread.join(0.1)
+    assert thread.is_alive()
+    quota.release(True)
+    thread.join(1)
+    assert result == [False]
+    assert quota.met and not quota.acquire()
+
+def test_concurrent_videos_never_exceed_the_quota():
+    quota = PublishQuota(5)
+    lock = threading.Lock()
+    peak = [0]
+    published = [0]
+
+    def worker(seed: int):
+        rng = random.Random(seed)
+        while quota.acquire():
+            with quota.condition:
+                peak[0] = max(peak[0], quota.in_flight + quota.done)
+            success = rng.random() < 0.3
+            with lock:
+                published[0] += success
+            quota.release(success)
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert not any(thread.is_alive() for thread in threads)
+    assert peak[0] <= 5
+    assert published[0] == quota.done == 5 and quota.in_flight == 0
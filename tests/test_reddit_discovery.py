@@ -0,0 +1,231 @@
+"""Tests for reddit_discovery.py, run against a fake Reddit client."""
+import threading
+from types import SimpleNamespace
+
+from prawcore.exceptions import Forbidden, NotFound
+
+import reddit_discovery
+from reddit_discovery import DiscoveryEngine, LISTING_PAGE_SIZE, ListingCache, RateLimiter
+
+def make_submission(submission_id: str, subreddit: str, score: int = 10,
+                    video: bool = True) -> SimpleNamespace:
+    """Stand-in for a PRAW submission, linking to a YouTube video unless video is False."""
+    return SimpleNamespace(
+        id=submission_id, subreddit=SimpleNamespace(display_name=subreddit),
+        title=f"Title of {submission_id}", score=score, created_utc=1700000000.0,
+        over_18=False, is_video=False, media=None,
+        url=f"https://youtu.be/{submission_id}" if video else "https://example.com/a.jpg",
+    )
+
+class FakeReddit:
+    """
+    Serves daily top listings of fixed submissions, one request per page.
+
+    Subreddits in banned raise Forbidden when listed, alone or combined, and
+    NotFound when validated, like a banned subreddit does on Reddit.
+    """
+
+    def __init__(self, submissions, banned=()):
+        self.submissions = submissions
+        self.banned = set(banned)
+        self.requests = []  # (kind, subreddit name) of every request served
+
+    def subreddit(self, name: str) -> "FakeSubreddit":
+        return FakeSubreddit(self, name)
+
+class FakeSubreddit:
+    def __init__(self, reddit: FakeReddit, name: str):
+        self.reddit = reddit
+        self.name = name
+
+    @property
+    def id(self) -> str:
+        self.reddit.requests.append(("about", self.name))
+        if self.name in self.reddit.banned:
+            raise NotFound(SimpleNamespace(status_code=404))
+        return f"t5_{self.name}"
+
+    def top(self, time_filter: str, limit: int):
+        assert time_filter == "day"
+        names = {name.lower() for name in self.name.split("+")}
+        listing = sorted((submission for submission in self.reddit.submissions
+                          if submission.subreddit.display_name.lower() in names),
+                         key=lambda submission: -submission.score)[:limit]
+        for index, submission in enumerate(listing):
+            if index % LISTING_PAGE_SIZE == 0:
+                self.reddit.requests.append(("top", self.name))
+                if names & self.reddit.banned:
+                    raise Forbidden(SimpleNamespace(status_code=403))
+            yield submission
+
+def make_engine(reddit: FakeReddit, **kwargs) -> DiscoveryEngine:
+    """Discovery engine on a fake Reddit whose rate limit never makes tests wait."""
+    kwargs.setdefault("requests_per_minute", 60000)
+    kwargs.setdefault("listing_limit", 1)
+    return DiscoveryEngine(reddit_factory=lambda: reddit, **kwargs)
+
+class FakeClock:
+    """Monotonic clock that only moves when something sleeps on it."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def test_rate_limiter_allows_a_burst_then_spaces_requests(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(reddit_discovery.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(reddit_discovery.time, "sleep", clock.sleep)
+    limiter = RateLimiter(requests_per_minute=60, burst=2)
+    for _ in range(4):
+        limiter.acquire()
+    assert clock.sleeps == [1.0, 1.0]
+    # Idle time refills the bucket, but never beyond the burst
+    clock.now += 10
+    for _ in range(3):
+        limiter.acquire()
+    assert clock.sleeps == [1.0, 1.0, 1.0]
+
+def test_rate_limiter_is_shared_between_threads():
+    limiter = RateLimiter(requests_per_minute=1200, burst=1)
+    acquired = []
+    def worker():
+        for _ in range(3):
+            limiter.acquire()
+            acquired.append(reddit_discovery.time.monotonic())
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Nine requests at 20 per second take at least 8 intervals after the first
+    assert len(acquired) == 9
+    assert max(acquired) - min(acquired) >= 8 / 20 - 0.01
+
+def test_candidates_do_not_trigger_lazy_submission_fetches():
+    class LazySubmission(SimpleNamespace):
+        def __getattr__(self, name):
+            raise AssertionError(f"reading {name} would fetch the whole submission")
+    submission = LazySubmission(**vars(make_submission("clip1", "videos")))
+    candidate = reddit_discovery.candidate_from_submission(submission, "videos")
+    assert candidate.crosspost_parent is None
+
+def test_every_request_waits_for_the_rate_limiter():
+    reddit = FakeReddit([make_submission(f"{name}1", name) for name in ("a", "b", "c", "d")])
+    clients = []
+    def reddit_factory():
+        clients.append(reddit)
+        return reddit
+    engine = DiscoveryEngine(reddit_factory=reddit_factory, workers=2,
+                             requests_per_minute=60000, listing_limit=1, chunk_size=1)
+    acquired = []
+    original_acquire = engine.limiter.acquire
+    engine.limiter.acquire = lambda: (acquired.append(1), original_acquire())
+    assert len(engine.discover(["a", "b", "c", "d"])) == 4
+    assert len(acquired) == len(reddit.requests) == engine.request_count == 8
+    # One client per worker thread, never one per request
+    assert 1 <= len(clients) <= 2
+
+def test_chunk_stops_reading_once_every_subreddit_has_its_share():
+    reddit = FakeReddit([make_submission(f"{name}{index}", name, score=index)
+                         for name in ("first", "second") for index in range(150)])
+    engine = make_engine(reddit)
+    candidates = engine.fetch_chunk(["first", "second"])
+    assert sorted(c.submission_id for c in candidates) == ["first149", "second149"]
+    assert reddit.requests == [("top", "first+second")]
+    assert engine.request_costs == {"first": 0.5, "second": 0.5}
+
+def test_chunk_refetches_subreddits_crowded_out_by_busy_ones():
+    reddit = FakeReddit([make_submission(f"busy{index}", "busy", score=1000 + index)
+                         for index in range(400)]
+                        + [make_submission("quiet1", "quiet", score=5)])
+    engine = make_engine(reddit, max_pages=3)
+    candidates = engine.fetch_chunk(["busy", "quiet", "empty"])
+    assert [c.submission_id for c in candidates] == ["busy399", "quiet1"]
+    assert reddit.requests == [("top", "busy+quiet+empty")] * 3 + [("top", "quiet+empty")]
+    # The busy subreddit pays for the pages it filled, not the quiet ones
+    assert engine.request_costs == {"busy": 3.0, "quiet": 0.5, "empty": 0.5}
+    assert engine.request_count == 4
+
+def test_chunk_falls_back_to_single_fetches_when_a_subreddit_is_banned(tmp_path):
+    reddit = FakeReddit([make_submission("ok1", "ok"), make_submission("gone1", "gone")],
+                        banned={"gone"})
+    cache = ListingCache(tmp_path / "listing_cache.json")
+    engine = make_engine(reddit, cache=cache)
+    candidates = engine.fetch_chunk(["ok", "gone"])
+    assert [c.submission_id for c in candidates] == ["ok1"]
+    assert reddit.requests == [("top", "ok+gone"), ("about", "ok"), ("top", "ok"), ("about", "gone")]
+    assert cache.is_invalid("gone") and not cache.is_invalid("ok")
+    assert engine.request_count == 4
+
+def test_chunk_remembers_non_video_submissions_as_evaluated(tmp_path):
+    reddit = FakeReddit([make_submission("image1", "pics", video=False),
+                         make_submission("clip1", "videos")])
+    cache = ListingCache(tmp_path / "listing_cache.json")
+    candidates = make_engine(reddit, cache=cache).fetch_chunk(["pics", "videos"])
+    assert [c.submission_id for c in candidates] == ["clip1"]
+    assert cache.is_evaluated("image1") and not cache.is_evaluated("clip1")
+
+def test_discover_keeps_subreddit_order_and_ranks_by_score_within():
+    reddit = FakeReddit([make_submission("a", "first", score=5), make_submission("b", "first", score=50),
+                         make_submission("c", "second", score=1000)])
+    engine = make_engine(reddit, workers=2, chunk_size=1, listing_limit=2)
+    ranked = engine.discover(["first", "second"])
+    assert [c.submission_id for c in ranked] == ["b", "a", "c"]
+
+def test_listing_cache_expires_listings_and_invalid_subreddits(monkeypatch, tmp_path, make_candidate):
+    now = [1000000.0]
+    monkeypatch.setattr(reddit_discovery.time, "time", lambda: now[0])
+    cache = ListingCache(tmp_path / "listing_cache.json", ttl_minutes=30, invalid_ttl_hours=1)
+    cache.store_listing("Videos", [make_candidate("a", "Videos")])
+    cache.mark_invalid("Gone", "NotFound")
+    assert [c.submission_id for c in cache.get_listing("videos")] == ["a"]
+    assert cache.is_invalid("gone")
+    now[0] += 30 * 60
+    assert cache.get_listing("Videos") is None
+    assert cache.is_invalid("Gone")
+    now[0] += 30 * 60
+    assert not cache.is_invalid("Gone")
+
+def test_listing_cache_evicts_old_evaluated_ids_when_saved(monkeypatch, tmp_path, make_candidate):
+    now = [1000000.0]
+    monkeypatch.setattr(reddit_discovery.time, "time", lambda: now[0])
+    path = tmp_path / "listing_cache.json"
+    cache = ListingCache(path, evaluated_ttl_hours=48)
+    cache.mark_evaluated("old")
+    now[0] += 47 * 3600
+    cache.mark_evaluated("recent")
+    cache.store_listing("videos", [make_candidate("a")])
+    now[0] += 2 * 3600
+    cache.save()
+
+    reloaded = ListingCache(path, evaluated_ttl_hours=48)
+    assert set(reloaded.evaluated) == {"recent"}
+    assert reloaded.is_evaluated("recent") and not reloaded.is_evaluated("old")
+    assert reloaded.get_listing("videos") is None  # older than the listing TTL
+
+def test_listing_cache_starts_empty_from_unreadable_file(tmp_path):
+    path = tmp_path / "listing_cache.json"
+    path.write_text("{not json", encoding="utf-8")
+    cache = ListingCache(path)
+    assert cache.listings == {} and cache.evaluated == {} and cache.invalid == {}
+
+def test_discover_reuses_cache_and_skips_evaluated_and_invalid(tmp_path):
+    reddit = FakeReddit([make_submission("a1", "a"), make_submission("b1", "b"),
+                         make_submission("gone1", "gone")], banned={"gone"})
+    cache = ListingCache(tmp_path / "listing_cache.json")
+    engine = make_engine(reddit, cache=cache)
+    assert [c.submission_id for c in engine.discover(["a", "b", "gone"])] == ["a1", "b1"]
+    requests = len(reddit.requests)
+
+    cache.mark_evaluated("a1")
+    cache.save()
+    again = make_engine(reddit, cache=ListingCache(tmp_path / "listing_cache.json"))
+    assert [c.submission_id for c in again.discover(["a", "b", "gone"])] == ["b1"]
+    assert len(reddit.requests) == requests and again.request_count == 0
@@ -0,0 +1,75 @@
+"""Tests for step_graph.py."""
+import threading
+
+import pytest
+
+from step_graph import FAILED, OPTIONAL, REQUIRED, SKIPPED, SUCCEEDED, Step, StepGraph
+
+def record(name, calls, result=True):
+    def function(context):
+        calls.append(name)
+        return result
+    return function
+
+def test_rejects_unknown_dependency():
+    with pytest.raises(ValueError):
+        StepGraph([Step("a", lambda context: True, {"missing": REQUIRED})])
+
+def test_rejects_invalid_policy():
+    with pytest.raises(ValueError):
+        StepGraph([Step("a", lambda context: True),
+                   Step("b", lambda context: True, {"a": "sometimes"})])
+
+def test_rejects_cycle():
+    with pytest.raises(ValueError):
+        StepGraph([Step("a", lambda context: True, {"b": REQUIRED}),
+                   Step("b", lambda context: True, {"a": REQUIRED})])
+
+def test_topological_order():
+    graph = StepGraph([Step("c", lambda context: True, {"b": REQUIRED}),
+                       Step("b", lambda context: True, {"a": REQUIRED}),
+                       Step("a", lambda context: True)])
+    assert graph.order == ["a", "b", "c"]
+
+def test_required_failure_skips_dependents_transitively():
+    calls = []
+    graph = StepGraph([Step("a", record("a", calls, False)),
+                       Step("b", record("b", calls), {"a": REQUIRED}),
+                       Step("c", record("c", calls), {"b": REQUIRED})])
+    assert graph.run(None) == {"a": FAILED, "b": SKIPPED, "c": SKIPPED}
+    assert calls == ["a"]
+
+def test_optional_failure_still_runs_dependent():
+    calls = []
+    graph = StepGraph([Step("title", record("title", calls, False)),
+                       Step("upload", record("upload", calls), {"title": OPTIONAL})])
+    assert graph.run(None) == {"title": FAILED, "upload": SUCCEEDED}
+    assert calls == ["title", "upload"]
+
+def test_exception_counts_as_failure():
+    def explode(context):
+        raise RuntimeError("boom")
+    assert StepGraph([Step("a", explode)]).run(None) == {"a": FAILED}
+
+def test_independent_steps_run_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+    def wait_for_other(context):
+        barrier.wait()
+        return True
+    graph = StepGraph([Step("a", wait_for_other), Step("b", wait_for_other)])
+    assert graph.run(None) == {"a": SUCCEEDED, "b": SUCCEEDED}
+
+def test_completed_steps_are_not_rerun():
+    calls, succeeded = [], []
+    graph = StepGraph([Step("a", record("a", calls)),
+                       Step("b", record("b", calls), {"a": REQUIRED})])
+    status = graph.run(None, completed=["a"], on_success=succeeded.append)
+    assert status == {"a": SUCCEEDED, "b": SUCCEEDED}
+    assert calls == ["b"]
+    assert succeeded == ["b"]
+
+def test_context_is_shared():
+    context = []
+    graph = StepGraph([Step("a", lambda steps: steps.append("a") or True),
+                       Step("b", lambda steps: steps == ["a"], {"a": REQUIRED})])
+    assert graph.run(context)["b"] == SUCCEEDED
@@ -0,0 +1,67 @@
+"""Tests for subreddit_scheduler.py."""
+import random
+
+import config
+from subreddit_scheduler import SubredditScheduler
+
+def make_scheduler(tmp_path, reward: str = "download", seed: int = 1) -> SubredditScheduler:
+    return SubredditScheduler(tmp_path / "subreddit_stats.json", reward, random.Random(seed))
+
+def test_default_budget_is_bounded():
+    assert config.DISCOVERY_SUBREDDITS_PER_RUN > 0
+
+def test_statistics_persist(tmp_path):
+    scheduler = make_scheduler(tmp_path)
+    scheduler.record_requests({"Videos": 2.0})
+    scheduler.record_download("Videos", "abc123")
+    scheduler.save()
+
+    reloaded = make_scheduler(tmp_path)
+    entry = reloaded.stats["videos"]
+    assert (entry["name"], entry["requests"], entry["downloads"]) == ("Videos", 2.0, 1)
+    assert reloaded.pending == {"abc123": "Videos"}
+
+def test_unreadable_statistics_start_empty(tmp_path):
+    (tmp_path / "subreddit_stats.json").write_text("{broken", encoding="utf-8")
+    assert make_scheduler(tmp_path).stats == {}
+
+def test_publish_and_rejection_settle_pending_download(tmp_path):
+    scheduler = make_scheduler(tmp_path)
+    scheduler.record_download("videos", "a1")
+    scheduler.record_download("videos", "b2")
+    assert scheduler.record_publish("a1")
+    assert not scheduler.record_publish("a1")
+    assert scheduler.record_rejection("b2")
+    assert not scheduler.record_rejection("unknown")
+    entry = scheduler.stats["videos"]
+    assert (entry["downloads"], entry["publishes"]) == (1, 1)
+    assert scheduler.pending == {}
+
+def test_reward_selects_counted_outcome(tmp_path):
+    for reward, expected in (("download", 2), ("publish", 1)):
+        scheduler = make_scheduler(tmp_path, reward)
+        scheduler.record_download("videos", "a1")
+        scheduler.record_download("videos", "b2")
+        scheduler.record_publish("a1")
+        assert scheduler.successes("videos") == expected
+
+def test_expected_yield_uses_prior(tmp_path):
+    scheduler = make_scheduler(tmp_path)
+    assert scheduler.expected_yield("unseen") == 1.0
+    scheduler.record_requests({"busy": 9.0})
+    scheduler.record_download("busy", "a1")
+    assert scheduler.expected_yield("busy") == 2.0 / 10.0
+
+def test_schedule_favours_productive_subreddits(tmp_path):
+    scheduler = make_scheduler(tmp_path)
+    scheduler.record_requests({"good": 100.0, "bad": 100.0})
+    for index in range(80):
+        scheduler.record_download("good", f"g{index}")
+    first = [scheduler.schedule(["bad", "good"], budget=0)[0] for _ in range(50)]
+    assert first.count("good") == 50
+
+def test_schedule_respects_budget(tmp_path):
+    names = [f"sub{index}" for index in range(10)]
+    scheduler = make_scheduler(tmp_path)
+    assert len(scheduler.schedule(names, budget=3)) == 3
+    assert sorted(scheduler.schedule(names, budget=0)) == sorted(names)
@@ -0,0 +1,36 @@
+"""Tests for utils.py."""
+import pytest
+
+from utils import CropWindow, compute_crop_window
+
+def test_landscape_source_crops_centered_strip():
+    window = compute_crop_window(1920, 1080, 1080, 1920)
+    assert window == CropWindow(x=657, y=0, width=606, height=1080, out_width=1080, out_height=1920)
+
+def test_portrait_source_keeps_full_frame():
+    window = compute_crop_window(1080, 1920, 1080, 1920)
+    assert window == CropWindow(0, 0, 1080, 1920, 1080, 1920)
+
+def test_narrow_source_keeps_full_width():
+    window = compute_crop_window(480, 1080, 1080, 1920)
+    # Rounding to even sizes may trim a pixel on each side
+    assert window.x <= 1 and window.width >= 478
+    assert window.out_width == 852
+
+@pytest.mark.parametrize("width, height", [(1281, 721), (853, 479), (3840, 2160), (641, 361)])
+def test_window_is_even_and_inside_source(width, height):
+    window = compute_crop_window(width, height, 1080, 1920)
+    for value in (window.width, window.height, window.out_width, window.out_height):
+        assert value % 2 == 0
+    assert 0 <= window.x and window.x + window.width <= width
+    assert window.height <= height
+    assert window.out_width <= 1080 and window.out_height == 1920
+
+def test_crop_matches_scale_then_crop_aspect():
+    window = compute_crop_window(1920, 1080, 1080, 1920)
+    scale = 1920 / 1080
+    assert abs(window.width * scale - window.out_width) <= 2 * scale
+
+def test_ffmpeg_filter_crops_before_scaling():
+    window = CropWindow(656, 0, 608, 1080, 1080, 1920)
+    assert window.to_ffmpeg_filter() == "crop=608:1080:656:0,scale=1080:1920:flags=lanczos,setsar=1"
@@ -0,0 +1,28 @@
+"""Tests for the encode path chosen by yt_shorts_processor.VideoProcessor, without ffmpeg."""
+import pytest
+
+from ffmpeg_utils import MediaInfo
+from yt_shorts_processor import PATH_AUDIO, PATH_FULL, PATH_REMUX, PATH_VIDEO, VideoProcessor
+
+def media_info(video_codec="h264", width=1080, height=1920, pix_fmt="yuv420p",
+               audio_codec="aac") -> MediaInfo:
+    return MediaInfo("mov,mp4,m4a,3gp,3g2,mj2", 30.0, video_codec, width, height, pix_fmt,
+                     30.0, audio_codec)
+
+@pytest.fixture
+def processor(tmp_path):
+    return VideoProcessor(input_dir=tmp_path, output_dir=tmp_path / "Clips")
+
+@pytest.mark.parametrize("info, path", [
+    (media_info(), PATH_REMUX),
+    (media_info(audio_codec=None), PATH_REMUX),
+    (media_info(width=1920, height=1080), PATH_VIDEO),
+    (media_info(video_codec="vp9"), PATH_VIDEO),
+    (media_info(pix_fmt="yuv420p10le"), PATH_VIDEO),
+    (media_info(audio_codec="opus"), PATH_AUDIO),
+    (media_info(video_codec="hevc", audio_codec="opus"), PATH_FULL),
+    (media_info(video_codec=None), PATH_FULL),
+    (None, PATH_FULL),
+])
+def test_triage_reencodes_only_what_misses_the_spec(processor, info, path):
+    assert processor.triage(info) == path
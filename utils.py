@@ -3,11 +3,19 @@ Utility functions for the Reddit to YouTube shorts automation project.
 """
 import os
 import re
+import shutil
+import time
 import logging
 from pathlib import Path
-from typing import List, Optional
+from typing import List, NamedTuple, Optional
 import config
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -142,4 +150,206 @@ def get_most_recent_video(directory: Path = config.BASE_DIR) -> Optional[Path]:
     if not video_files:
         return None
         
-    return max(video_files, key=lambda f: f.stat().st_ctime) 
\ No newline at end of file
+    return max(video_files, key=lambda f: f.stat().st_ctime) 
+
+def _directory_size(directory: Path) -> int:
+    """Total size in bytes of the files under a directory."""
+    return sum(f.stat().st_size for f in directory.rglob('*') if f.is_file())
+
+def _last_modified(directory: Path) -> float:
+    """Most recent modification time of a directory or anything in it."""
+    return max([directory.stat().st_mtime] + [f.stat().st_mtime for f in directory.rglob('*')])
+
+OWNER_LOCK_FILE_NAME = "owner.lock"
+
+class DirectoryLock:
+    """
+    Lock file marking a directory as owned by the process working in it.
+    
+    The operating system releases the lock when its holder exits, so the
+    directory of a crashed run can be taken over, while a directory a live
+    run still holds is neither resumed nor deleted by anyone else.
+    """
+    
+    def __init__(self, directory: Path):
+        """
+        Initialize the lock.
+        
+        Args:
+            directory: Directory the lock file is kept in
+        """
+        self.directory = directory
+        self.path = directory / OWNER_LOCK_FILE_NAME
+        self.file = None
+    
+    @property
+    def held(self) -> bool:
+        """True while this lock holds the directory."""
+        return self.file is not None
+    
+    def acquire(self) -> bool:
+        """
+        Take the lock without waiting.
+        
+        Returns:
+            True if the directory is held, False if another holder has it or
+            the directory does not exist
+        """
+        if self.file is not None:
+            return True
+        try:
+            file = open(self.path, "a+b")
+        except OSError:
+            return False
+        try:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            file.close()
+            return False
+        self.file = file
+        return True
+    
+    def release(self) -> None:
+        """Give up the lock, if held."""
+        if self.file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+            else:
+                self.file.seek(0)
+                msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        except OSError as e:
+            logger.warning(f"Failed to unlock {self.path}: {str(e)}")
+        finally:
+            self.file.close()
+            self.file = None
+    
+    def delete_directory(self) -> None:
+        """
+        Delete the directory, which must be held, and release the lock.
+        
+        Everything but the lock file is deleted while the lock is still held,
+        so no other process takes over a half-deleted directory.
+        
+        Raises:
+            OSError: If the directory could not be deleted
+        """
+        try:
+            for entry in self.directory.iterdir():
+                if entry.name == OWNER_LOCK_FILE_NAME:
+                    continue
+                if entry.is_dir() and not entry.is_symlink():
+                    shutil.rmtree(entry)
+                else:
+                    entry.unlink()
+        finally:
+            self.release()
+        shutil.rmtree(self.directory)
+
+def evict_stale_directories(parent: Path, max_age_hours: float, max_mb: float,
+                            label: str = "directory") -> int:
+    """
+    Delete subdirectories that are too old or exceed a total size budget.
+    
+    Subdirectories held with a DirectoryLock are in use and never deleted.
+    
+    Args:
+        parent: Directory holding one subdirectory per entry
+        max_age_hours: Subdirectories untouched for longer than this are deleted
+        max_mb: Oldest subdirectories are deleted until the total is under this size
+        label: What a subdirectory holds, for logging
+        
+    Returns:
+        Number of subdirectories deleted
+    """
+    if not parent.exists():
+        return 0
+    
+    entries = []
+    for entry in parent.iterdir():
+        if entry.is_dir():
+            try:
+                entries.append((_last_modified(entry), _directory_size(entry), entry))
+            except OSError:
+                # Files changing underneath the scan are being written by a live run
+                continue
+    entries.sort()
+    
+    cutoff = time.time() - max_age_hours * 3600
+    total_bytes = sum(size for _, size, _ in entries)
+    evicted = 0
+    for modified, size, entry in entries:
+        if modified >= cutoff and total_bytes <= max_mb * 1024 * 1024:
+            continue
+        owner = DirectoryLock(entry)
+        if not owner.acquire():
+            logger.info(f"Not evicting {label} {entry.name}: another run owns it")
+            continue
+        try:
+            owner.delete_directory()
+            total_bytes -= size
+            evicted += 1
+            logger.info(f"Evicted stale {label}: {entry.name}")
+        except Exception as e:
+            logger.warning(f"Failed to evict {label} {entry}: {str(e)}")
+    return evicted
+
+def get_thumbnail_path(video_file: Path) -> Path:
+    """
+    Get the path of the upload thumbnail extracted for a processed video.
+    
+    Args:
+        video_file: Path to the processed video
+        
+    Returns:
+        Path of the JPEG thumbnail next to the video
+    """
+    return video_file.with_suffix(".jpg")
+
+class CropWindow(NamedTuple):
+    """Region of a source frame to keep, and the size it is scaled to."""
+    x: int
+    y: int
+    width: int
+    height: int
+    out_width: int
+    out_height: int
+
+    def to_ffmpeg_filter(self) -> str:
+        """Return an ffmpeg filter chain that crops, then scales, this window."""
+        return (f"crop={self.width}:{self.height}:{self.x}:{self.y},"
+                f"scale={self.out_width}:{self.out_height}:flags=lanczos,setsar=1")
+
+def _even(value: float) -> int:
+    """Round down to the nearest even integer (required by yuv420p)."""
+    return max(2, int(value) // 2 * 2)
+
+def compute_crop_window(src_width: int, src_height: int,
+                        target_width: int = config.VIDEO_WIDTH,
+                        target_height: int = config.VIDEO_HEIGHT) -> CropWindow:
+    """
+    Work out the centered crop, in source coordinates, for a Shorts frame.
+
+    The result matches scaling the whole frame to target_height and then
+    cropping a centered target_width strip, but only the kept region has to
+    be scaled. Sources narrower than the target aspect keep their full width.
+
+    Args:
+        src_width: Width of the source frame
+        src_height: Height of the source frame
+        target_width: Width of the output frame
+        target_height: Height of the output frame
+
+    Returns:
+        The crop window and the output size
+    """
+    scale = target_height / src_height
+    out_width = min(target_width, _even(src_width * scale))
+    crop_width = min(src_width, _even(out_width / scale))
+    x = (src_width - crop_width) // 2
+    return CropWindow(x, 0, crop_width, _even(src_height), out_width, target_height)
@@ -3,12 +3,23 @@ Processes videos to make them suitable for YouTube Shorts format.
 """
 import os
 import logging
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Optional
 from moviepy.editor import VideoFileClip
 from PIL import Image
 
 import config
+import ffmpeg_utils
+import media_analysis
 import utils
+from dedup_index import DedupIndex
+from encoder_profiles import EncoderProfile, resolve_profile
+from job import Job
+from ledger import Ledger
+from subreddit_scheduler import record_rejection
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -18,6 +29,121 @@ if not hasattr(Image, 'ANTIALIAS'):
     # For Pillow >= 9.0.0
     Image.ANTIALIAS = Image.LANCZOS
 
+# Processing paths chosen by VideoProcessor.triage
+PATH_REMUX = "remux"                # copy both streams
+PATH_VIDEO = "transcode-video"      # re-encode video, copy audio
+PATH_AUDIO = "transcode-audio"      # copy video, re-encode audio
+PATH_FULL = "transcode"             # decode and re-encode everything
+
+class MoviePyBackend:
+    """Renders Shorts by decoding frames into Python with moviepy."""
+    
+    name = "moviepy"
+    
+    def __init__(self, target_width: int = config.VIDEO_WIDTH,
+                 target_height: int = config.VIDEO_HEIGHT):
+        """
+        Initialize the backend.
+        
+        Args:
+            target_width: Width of the rendered video
+            target_height: Height of the rendered video
+        """
+        self.target_width = target_width
+        self.target_height = target_height
+        
+    def crop_and_scale(self, clip: VideoFileClip) -> VideoFileClip:
+        """
+        Crop a clip to the centered 9:16 region and scale it to the target size.
+        
+        Args:
+            clip: Source clip
+            
+        Returns:
+            The transformed clip
+        """
+        window = utils.compute_crop_window(clip.w, clip.h, self.target_width, self.target_height)
+        clip = clip.crop(x1=window.x, y1=window.y, width=window.width, height=window.height)
+        return clip.resize(newsize=(window.out_width, window.out_height))
+        
+    def render(self, src: Path, dest: Path, duration: float,
+               info: Optional[ffmpeg_utils.MediaInfo], profile: EncoderProfile,
+               encode_audio: bool = True, start: float = 0.0) -> None:
+        """
+        Trim, crop and scale a video and encode it to dest.
+        
+        Args:
+            src: Source video
+            dest: Destination for the Shorts video
+            duration: Length of the output in seconds
+            info: ffprobe details of the source (unused; moviepy reads the file itself)
+            profile: Encoder settings for the video stream
+            encode_audio: Ignored; moviepy always re-encodes audio to AAC
+            start: Offset into the source in seconds
+        """
+        clip = VideoFileClip(str(src))
+        
+        # Trim the video to the requested window if it's longer
+        if start > 0 or clip.duration > duration:
+            clip = clip.subclip(start, min(clip.duration, start + duration))
+        
+        # Crop the centered Shorts region in source coordinates, then scale
+        # only that region up to the target size
+        clip = self.crop_and_scale(clip)
+        
+        clip.write_videofile(str(dest), codec="libx264", audio_codec="aac",
+                             preset=profile.preset, threads=profile.threads or None,
+                             ffmpeg_params=["-crf", str(profile.crf)])
+        
+        # Close the clip to release resources
+        clip.close()
+
+class FFmpegBackend:
+    """Renders Shorts with a single ffmpeg process; frames never enter Python."""
+    
+    name = "ffmpeg"
+    
+    def __init__(self, target_width: int = config.VIDEO_WIDTH,
+                 target_height: int = config.VIDEO_HEIGHT):
+        """
+        Initialize the backend.
+        
+        Args:
+            target_width: Width of the rendered video
+            target_height: Height of the rendered video
+        """
+        self.target_width = target_width
+        self.target_height = target_height
+        
+    def render(self, src: Path, dest: Path, duration: float,
+               info: Optional[ffmpeg_utils.MediaInfo], profile: EncoderProfile,
+               encode_audio: bool = True, start: float = 0.0) -> None:
+        """
+        Trim, crop and scale a video with a native ffmpeg filter graph.
+        
+        Args:
+            src: Source video
+            dest: Destination for the Shorts video
+            duration: Length of the output in seconds
+            info: ffprobe details of the source, used to place the crop window
+            profile: Encoder settings for the video stream
+            encode_audio: Re-encode audio to AAC if True, otherwise copy it
+            start: Offset into the source in seconds
+        """
+        if info is None:
+            raise ValueError(f"ffmpeg backend needs probe details for {src.name}")
+        window = utils.compute_crop_window(info.width, info.height,
+                                           self.target_width, self.target_height)
+        ffmpeg_utils.transcode(src, dest, duration, video_filter=window.to_ffmpeg_filter(),
+                               encode_audio=encode_audio, encoder_args=profile.ffmpeg_args(),
+                               start=start)
+
+# Backends selectable through config.VIDEO_BACKEND
+BACKENDS = {
+    MoviePyBackend.name: MoviePyBackend,
+    FFmpegBackend.name: FFmpegBackend,
+}
+
 class VideoProcessor:
     """Class for processing videos for YouTube Shorts format."""
     
@@ -25,7 +151,15 @@ class VideoProcessor:
                  output_dir: Path = config.CLIPS_DIR,
                  target_height: int = config.VIDEO_HEIGHT,
                  target_width: int = config.VIDEO_WIDTH,
-                 max_duration: int = config.MAX_VIDEO_DURATION):
+                 max_duration: int = config.MAX_VIDEO_DURATION,
+                 parallel: bool = config.PARALLEL_ENCODING,
+                 workers: int = config.PARALLEL_WORKERS,
+                 min_segment_seconds: float = config.PARALLEL_MIN_SEGMENT_SECONDS,
+                 backend: str = config.VIDEO_BACKEND,
+                 encoder_profile: str = config.ENCODER_PROFILE,
+                 time_budget: float = config.ENCODE_TIME_BUDGET,
+                 content_gate: bool = config.CONTENT_GATE,
+                 trim_mode: str = config.TRIM_MODE):
         """
         Initialize the VideoProcessor.
         
@@ -35,22 +169,268 @@ class VideoProcessor:
             target_height: Target height for the processed video
             target_width: Target width for the processed video
             max_duration: Maximum video duration in seconds
+            parallel: Encode keyframe-aligned segments concurrently
+            workers: Number of segments encoded at once in parallel mode
+            min_segment_seconds: Shortest segment worth encoding on its own
+            backend: Name of the renderer used for re-encodes ("ffmpeg" or "moviepy")
+            encoder_profile: Name of an encoder profile, or "auto" to choose one per
+                video from calibrated throughput and time_budget
+            time_budget: Seconds allowed for encoding one video in "auto" mode
+            content_gate: Reject static, black or silent clips before encoding
+            trim_mode: "start" to keep the beginning of long clips, or "best" to
+                keep their most active window
         """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown video backend '{backend}'. Choose from: {', '.join(BACKENDS)}")
+
         self.input_dir = input_dir
         self.output_dir = output_dir
         self.target_height = target_height
         self.target_width = target_width
         self.max_duration = max_duration
+        self.parallel = parallel
+        self.workers = max(1, workers)
+        self.min_segment_seconds = min_segment_seconds
+        self.backend = BACKENDS[backend](target_width, target_height)
+        self.encoder_profile = encoder_profile
+        self.time_budget = time_budget
+        self.content_gate = content_gate
+        self.trim_mode = trim_mode
         
         # Create the output directory if it doesn't exist
         utils.ensure_directory_exists(output_dir)
         
-    def process_video(self, file_path: Path) -> bool:
+    def triage(self, info: Optional[ffmpeg_utils.MediaInfo]) -> str:
+        """
+        Decide which streams of a source need re-encoding for the Shorts spec.
+        
+        Args:
+            info: ffprobe details of the source, or None if probing failed
+            
+        Returns:
+            One of PATH_REMUX, PATH_VIDEO, PATH_AUDIO or PATH_FULL
+        """
+        if info is None or not info.video_codec:
+            return PATH_FULL
+        
+        video_ok = (info.video_codec == "h264"
+                    and info.pix_fmt == "yuv420p"
+                    and info.width == self.target_width
+                    and info.height == self.target_height)
+        # A missing audio track is fine; a present one must already be AAC
+        audio_ok = info.audio_codec in (None, "aac")
+        
+        if video_ok and audio_ok:
+            return PATH_REMUX
+        if audio_ok:
+            return PATH_VIDEO
+        if video_ok:
+            return PATH_AUDIO
+        return PATH_FULL
+        
+    def choose_profile(self, info: Optional[ffmpeg_utils.MediaInfo],
+                       duration: float) -> EncoderProfile:
+        """
+        Choose the encoder profile for a video.
+        
+        Args:
+            info: ffprobe details of the source, or None if probing failed
+            duration: Length of the output in seconds
+            
+        Returns:
+            The configured profile, or in "auto" mode the best-quality profile
+            expected to finish within the time budget
+        """
+        frame_rate = info.frame_rate if info and info.frame_rate else 30.0
+        return resolve_profile(self.encoder_profile, duration * frame_rate, self.time_budget)
+        
+    def reject(self, file_path: Path, submission_id: Optional[str], reason: str) -> None:
+        """
+        Record why a clip was rejected before encoding.
+        
+        The reason is stored in the ledger, and the clip's download no longer
+        counts towards its subreddit's yield. The submission itself is already
+        in the dedup index, so reposts of it are skipped during discovery.
+        
+        Args:
+            file_path: Source video
+            submission_id: Reddit submission ID of the clip, if known
+            reason: Human-readable rejection reason
+        """
+        logger.info(f"Rejected {file_path.name}: {reason}")
+        if not submission_id:
+            return
+        ledger = Ledger()
+        try:
+            ledger.record_rejected(submission_id, reason)
+        finally:
+            ledger.close()
+        record_rejection(submission_id)
+        
+    def check_content(self, file_path: Path, info: ffmpeg_utils.MediaInfo) -> Optional[str]:
+        """
+        Run the low-value content gate on a clip.
+        
+        Args:
+            file_path: Source video
+            info: ffprobe details of the source
+            
+        Returns:
+            Why the clip is low-value, or None if it should be encoded
+        """
+        try:
+            start = time.perf_counter()
+            duration = min(info.duration, self.max_duration)
+            metrics = media_analysis.analyze_content(file_path, duration, info.audio_codec is not None)
+            loudness = f"{metrics.loudness_db:.1f} dBFS" if metrics.loudness_db is not None else "no audio"
+            logger.info(f"Analyzed {file_path.name} in {time.perf_counter() - start:.2f}s: "
+                        f"motion {metrics.motion:.4f}, black {metrics.black_fraction:.0%}, {loudness}")
+        except Exception as e:
+            logger.warning(f"Could not analyze {file_path.name}: {e}")
+            return None
+        return media_analysis.content_rejection_reason(metrics)
+        
+    def find_published_duplicate(self, file_path: Path, info: ffmpeg_utils.MediaInfo,
+                                 submission_id: Optional[str]) -> Optional[str]:
+        """
+        Check a clip's perceptual fingerprint against every published clip.
+        
+        The fingerprint of a unique clip is stored so that it counts against
+        later clips once it has been published.
+        
+        Args:
+            file_path: Source video
+            info: ffprobe details of the source
+            submission_id: Reddit submission ID of the clip, if known
+            
+        Returns:
+            Submission ID of the published clip this one duplicates, or None
+        """
+        try:
+            start = time.perf_counter()
+            fingerprint = media_analysis.video_fingerprint(file_path, info.duration)
+            logger.info(f"Fingerprinted {file_path.name} in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            logger.warning(f"Could not fingerprint {file_path.name}: {e}")
+            return None
+        
+        dedup_index = DedupIndex()
+        try:
+            match = dedup_index.find_similar_video(fingerprint, exclude=submission_id)
+            if match:
+                logger.info(f"{file_path.name} matches published clip {match[0]} "
+                            f"({match[1]} bits apart)")
+                return match[0]
+            if submission_id:
+                dedup_index.add_video(submission_id, fingerprint)
+            return None
+        finally:
+            dedup_index.close()
+        
+    def choose_start(self, file_path: Path, info: Optional[ffmpeg_utils.MediaInfo]) -> float:
+        """
+        Choose where the kept window of a clip starts.
+        
+        In "best" mode the most active window is found on a proxy decode and
+        its start is moved back to the preceding keyframe, so stream-copied and
+        re-encoded outputs cut at exactly the same point.
+        
+        Args:
+            file_path: Source video
+            info: ffprobe details of the source, or None if probing failed
+            
+        Returns:
+            Offset into the source in seconds
+        """
+        if self.trim_mode != "best" or info is None or info.duration <= self.max_duration:
+            return 0.0
+        try:
+            analysis_start = time.perf_counter()
+            keyframes = ffmpeg_utils.keyframe_times(file_path)
+            start = media_analysis.best_window_start(file_path, info.duration, self.max_duration,
+                                                     info.audio_codec is not None, keyframes)
+            start = max((keyframe for keyframe in keyframes if keyframe <= start), default=0.0)
+            logger.info(f"Best {self.max_duration}s window of {file_path.name} starts at "
+                        f"{start:.1f}s (found in {time.perf_counter() - analysis_start:.2f}s)")
+            return start
+        except Exception as e:
+            logger.warning(f"Could not find the best window of {file_path.name}: {e}")
+            return 0.0
+        
+    def extract_thumbnail(self, file_path: Path, duration: float) -> None:
+        """
+        Save the upload thumbnail from a processed video next to it.
+        
+        Args:
+            file_path: Processed Shorts video
+            duration: Length of the video in seconds
+        """
+        thumbnail = utils.get_thumbnail_path(file_path)
+        try:
+            start = time.perf_counter()
+            timestamp = media_analysis.extract_thumbnail(file_path, duration, thumbnail)
+            logger.info(f"Saved thumbnail from {timestamp:.1f}s of {file_path.name} "
+                        f"in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            thumbnail.unlink(missing_ok=True)
+            logger.warning(f"Could not extract a thumbnail from {file_path.name}: {e}")
+        
+    def _render_parallel(self, file_path: Path, output_path: Path, video_filter: str,
+                         duration: float, profile: EncoderProfile, encode_audio: bool,
+                         start: float = 0.0) -> None:
+        """
+        Encode keyframe-aligned segments of a video concurrently and join them.
+        
+        Segments are cut and concatenated with stream copy, so the video is
+        encoded exactly once. Audio is handled in a single pass at the end to
+        avoid gaps at segment boundaries. Each segment is encoded by its own
+        ffmpeg process, so a thread pool is enough to keep every core busy.
+        
+        Args:
+            file_path: Source video
+            output_path: Destination for the Shorts video
+            video_filter: ffmpeg filter chain applied to each segment
+            duration: Length of the output in seconds
+            profile: Encoder settings for the video stream
+            encode_audio: Re-encode audio to AAC if True, otherwise copy it
+            start: Offset into the source in seconds, on a keyframe
+        """
+        segment_seconds = max(self.min_segment_seconds, duration / self.workers)
+        threads_per_worker = max(1, (os.cpu_count() or 1) // self.workers)
+        
+        with tempfile.TemporaryDirectory(dir=file_path.parent) as tmp:
+            work_dir = Path(tmp)
+            segments = ffmpeg_utils.split_at_keyframes(file_path, work_dir, duration,
+                                                       segment_seconds, start=start)
+            encoded = [work_dir / f"encoded_{segment.name}" for segment in segments]
+            logger.info(f"Encoding {len(segments)} segments with {self.workers} workers")
+            
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = [
+                    pool.submit(ffmpeg_utils.transcode, segment, target, duration,
+                                video_filter=video_filter, include_audio=False,
+                                threads=threads_per_worker,
+                                encoder_args=profile.ffmpeg_args())
+                    for segment, target in zip(segments, encoded)
+                ]
+                for future in futures:
+                    future.result()
+            
+            ffmpeg_utils.concat_segments(encoded, file_path, output_path, duration,
+                                         encode_audio=encode_audio, audio_start=start)
+        
+    def process_video(self, file_path: Path, submission_id: Optional[str] = None) -> bool:
         """
         Process a single video file.
         
+        The source is probed first so that streams which already meet the
+        Shorts spec are copied rather than decoded and re-encoded, and clips
+        that are low-value or duplicate a published video are rejected before
+        any encoding.
+        
         Args:
             file_path: Path to the video file
+            submission_id: Reddit submission ID of the video, if known
             
         Returns:
             True if successful, False otherwise
@@ -58,48 +438,90 @@ class VideoProcessor:
         try:
             logger.info(f"Processing {file_path.name} ...")
             
-            # Load the video clip
-            clip = VideoFileClip(str(file_path))
+            info = ffmpeg_utils.probe_media(file_path)
+            processing_path = self.triage(info)
+            logger.info(f"Processing path for {file_path.name}: {processing_path}")
             
-            # Trim the video to max_duration seconds if it's longer
-            if clip.duration > self.max_duration:
-                clip = clip.subclip(0, self.max_duration)
+            if info is not None:
+                reason = self.check_content(file_path, info) if self.content_gate else None
+                if reason is None:
+                    duplicate_of = self.find_published_duplicate(file_path, info, submission_id)
+                    reason = f"duplicate of {duplicate_of}" if duplicate_of else None
+                if reason:
+                    self.reject(file_path, submission_id, reason)
+                    return False
             
-            # Save a copy of the trimmed clip to the output folder
-            dest_file_path = self.output_dir / file_path.name
-            clip.write_videofile(str(dest_file_path), codec="libx264", audio_codec="aac")
+            # Save a trimmed copy to the output folder using a lossless stream copy,
+            # so at most the Shorts output below needs a decode and encode pass.
+            # The folder is shared by all jobs, so the copy is named by submission
+            # ID; titles can sanitize to the same file name
+            archive_name = f"{submission_id}{file_path.suffix}" if submission_id else file_path.name
+            dest_file_path = self.output_dir / archive_name
+            duration = min(info.duration, self.max_duration) if info else self.max_duration
+            start = self.choose_start(file_path, info)
+            ffmpeg_utils.stream_copy_trim(file_path, dest_file_path, duration, start)
             logger.info(f"Saved copy to {dest_file_path}")
             
-            # Resize the video to match target height
-            clip = clip.resize(height=self.target_height)
-            
-            # Crop the clip to get a centered region with target width
-            clip = clip.crop(x_center=clip.w/2, width=self.target_width)
-            
             # Define a temporary output file path in the same directory
             temp_output_path = file_path.parent / f"temp_{file_path.name}"
             
-            # Write the processed video to the temporary file
-            clip.write_videofile(str(temp_output_path), codec="libx264", audio_codec="aac")
+            profile = self.choose_profile(info, duration)
+            encode_start = time.perf_counter()
+            use_parallel = (self.parallel
+                            and self.workers > 1
+                            and processing_path in (PATH_VIDEO, PATH_FULL)
+                            and info is not None
+                            and duration >= 2 * self.min_segment_seconds)
             
-            # Close the clip to release resources
-            clip.close()
+            if use_parallel:
+                window = utils.compute_crop_window(info.width, info.height,
+                                                   self.target_width, self.target_height)
+                self._render_parallel(file_path, temp_output_path, window.to_ffmpeg_filter(),
+                                      duration, profile,
+                                      encode_audio=processing_path == PATH_FULL, start=start)
+                renderer = "segment-parallel"
+            elif processing_path in (PATH_VIDEO, PATH_FULL):
+                backend = self.backend
+                if info is None and not isinstance(backend, MoviePyBackend):
+                    logger.warning(f"No probe details for {file_path.name}; falling back to moviepy")
+                    backend = MoviePyBackend(self.target_width, self.target_height)
+                backend.render(file_path, temp_output_path, duration, info, profile,
+                               encode_audio=processing_path == PATH_FULL, start=start)
+                renderer = backend.name
+            else:
+                # Only the audio needs re-encoding, or nothing at all
+                ffmpeg_utils.transcode(file_path, temp_output_path, duration,
+                                       encode_audio=processing_path == PATH_AUDIO, start=start)
+                renderer = "stream copy"
+            logger.info(f"Encoded {file_path.name} in {time.perf_counter() - encode_start:.1f}s "
+                        f"({renderer}, profile '{profile.name}')")
             
             # Replace the original file with the processed file
             file_path.unlink()
             temp_output_path.rename(file_path)
             
             logger.info(f"Converted and replaced {file_path.name}")
+            
+            self.extract_thumbnail(file_path, duration)
+            if submission_id:
+                ledger = Ledger()
+                try:
+                    ledger.record_processed(submission_id)
+                finally:
+                    ledger.close()
             return True
             
         except Exception as e:
             logger.error(f"Error processing {file_path.name}: {e}")
             return False
             
-    def process_all_videos(self) -> int:
+    def process_all_videos(self, submission_id: Optional[str] = None) -> int:
         """
         Process only the most recently downloaded video file.
         
+        Args:
+            submission_id: Reddit submission ID of the video, if known
+            
         Returns:
             Number of successfully processed videos (0 or 1)
         """
@@ -111,25 +533,32 @@ class VideoProcessor:
             
         logger.info(f"Processing most recently downloaded video: {most_recent_video.name}")
         
-        if self.process_video(most_recent_video):
+        if self.process_video(most_recent_video, submission_id):
             return 1
         else:
             return 0
 
-def process_videos():
+def process_videos(job: Job) -> bool:
     """
-    Process videos in the input directory for YouTube Shorts format.
+    Process a job's downloaded video for YouTube Shorts format.
     
+    Args:
+        job: Job of the downloaded video
+        
     Returns:
-        True if at least one video was processed successfully, False otherwise
+        True if the video was processed successfully, False otherwise
     """
+    if job.video_file is None:
+        logger.info("No video file to process")
+        return False
     try:
         processor = VideoProcessor()
-        processed_count = processor.process_all_videos()
-        return processed_count > 0
+        # The thumbnail is written next to the video, in the job's scratch directory
+        job.register_artifact(utils.get_thumbnail_path(job.video_file))
+        return processor.process_video(job.video_file, job.submission_id or None)
     except Exception as e:
         logger.error(f"Error in video processing: {str(e)}")
         return False
 
 if __name__ == "__main__":
-    process_videos()
+    process_videos(Job.from_debug_files())